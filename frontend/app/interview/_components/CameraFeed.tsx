@@ -1,8 +1,12 @@
 "use client";
 
-import { useEffect } from "react";
+import { useCallback, useEffect, useRef } from "react";
 import React from "react";
 
+// 5 fps while the candidate answers; the server re-detects the face every
+// 10th frame and tracks it in between
+const CAPTURE_INTERVAL_MS = 200;
+
 type CameraFeedProps = {
   active: boolean;
   videoRef: React.RefObject<HTMLVideoElement>;
@@ -25,16 +29,82 @@ export async function captureFrame(
   );
 }
 
-export async function sendFrame(frame: Blob) {
+export async function sendFrame(frame: Blob, sessionId?: string) {
   const formData = new FormData();
   formData.append("frame", frame);
+  if (sessionId) formData.append("session_id", sessionId); // enables face tracking
 
-  await fetch("http://localhost:8000/camera/analyze", {
+  const res = await fetch("http://localhost:8000/camera/analyze", {
     method: "POST",
     body: formData,
   });
+  if (!res.ok) console.warn("Camera frame skipped", res.status);
+}
+
+// Frames per /camera/analyze/batch request (~1 s of capture)
+const BATCH_SIZE = 5;
+
+// Streams frames of the answer being recorded to the session's analyzer,
+// BATCH_SIZE at a time. The server aggregates them per answer and attaches
+// them on /answer, so await the returned flush() before posting the answer.
+export function useFrameCapture(
+  videoRef: React.RefObject<HTMLVideoElement>,
+  sessionId: string | null,
+  capturing: boolean
+) {
+  const bufferRef = useRef<Blob[]>([]);
+  const sendingRef = useRef<Promise<void>>(Promise.resolve());
+
+  // Sends are chained so frames reach the server in capture order
+  const send = useCallback((id: string) => {
+    const frames = bufferRef.current.splice(0);
+    if (!frames.length) return sendingRef.current;
+
+    sendingRef.current = sendingRef.current
+      .then(() => (frames.length === 1 ? sendFrame(frames[0], id) : sendFrameBatch(frames, id)))
+      .catch((err) => console.warn("Camera frames skipped", err));
+    return sendingRef.current;
+  }, []);
+
+  useEffect(() => {
+    if (!capturing || !sessionId) return;
+
+    let busy = false;
+    const timer = setInterval(async () => {
+      const video = videoRef.current;
+      if (busy || !video || video.readyState < 2) return;
+
+      busy = true;
+      try {
+        const frame = await captureFrame(video);
+        if (frame) bufferRef.current.push(frame);
+        if (bufferRef.current.length >= BATCH_SIZE) send(sessionId);
+      } catch (err) {
+        console.warn("Camera frame skipped", err);
+      } finally {
+        busy = false;
+      }
+    }, CAPTURE_INTERVAL_MS);
+
+    return () => clearInterval(timer);
+  }, [videoRef, sessionId, capturing, send]);
 
-  console.warn("Camera frame skipped");
+  return useCallback(async () => {
+    if (sessionId) await send(sessionId);
+  }, [sessionId, send]);
+}
+
+// One request for a burst of frames (capture order) instead of one per frame
+export async function sendFrameBatch(frames: Blob[], sessionId?: string) {
+  const formData = new FormData();
+  frames.forEach((frame, i) => formData.append("frames", frame, `frame-${i}.jpg`));
+  if (sessionId) formData.append("session_id", sessionId);
+
+  const res = await fetch("http://localhost:8000/camera/analyze/batch", {
+    method: "POST",
+    body: formData,
+  });
+  if (!res.ok) console.warn("Camera batch skipped", res.status);
 }
 
 export default function CameraFeed({ active, videoRef }: CameraFeedProps) {
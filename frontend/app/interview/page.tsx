@@ -7,6 +7,7 @@ import { useEffect, useRef, useState, useCallback } from "react";
 import { Mic, MicOff, Video, VideoOff, Phone, Settings, MoreVertical, User } from "lucide-react";
 
 import Interviewer from "./_components/Interviewer";
+import { useFrameCapture } from "./_components/CameraFeed";
 // 3D Interviewer Avatar Component
 // function InterviewerAvatar() {
 //   const meshRef = useRef<THREE.Group>(null);
@@ -150,6 +151,9 @@ export default function InterviewPage() {
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const audioChunksRef = useRef<Blob[]>([]);
 
+  // Camera frames of the current answer → per-session analyzer
+  const flushFrames = useFrameCapture(videoRef, sessionId, recording && cameraOn);
+
 
   // Timer for call duration
   useEffect(() => {
@@ -211,12 +215,21 @@ export default function InterviewPage() {
 
     mediaRecorderRef.current.onstop = async () => {
       mediaRecorderRef.current?.stream.getTracks().forEach(track => track.stop());
+      if (!sessionId) {
+        console.warn("No session yet, skipping answer upload");
+        audioChunksRef.current = [];
+        return;
+      }
+      // The answer's last frames must reach the server before /answer reads them
+      const framesSent = flushFrames();
 
       const audioBlob = new Blob(audioChunksRef.current, { type: "audio/webm" });
       audioChunksRef.current = [];
 
       const formData = new FormData();
       formData.append("audio", audioBlob);
+      // Lets the server start audio emotion on the clip it already decoded
+      formData.append("session_id", sessionId);
 
       const res = await fetch("http://localhost:8000/stt/live", {
         method: "POST",
@@ -232,7 +245,7 @@ export default function InterviewPage() {
       console.log("LIVE STT:", data.text);
 
       const answerForm = new FormData();
-      answerForm.append("session_id", sessionId!);   // VERY IMPORTANT
+      answerForm.append("session_id", sessionId);   // VERY IMPORTANT
       answerForm.append("answer", data.text);        // STT text
       answerForm.append("metrics", JSON.stringify({}));
   const sttText = data.text; // jo STT se aa raha hai
@@ -241,6 +254,7 @@ export default function InterviewPage() {
     console.warn("Empty STT text, skipping answer");
     return; // 👈 YAHI
   }
+      await framesSent;
       const res2 = await fetch("http://localhost:8000/answer", {
         method: "POST",
         body: answerForm,
@@ -257,7 +271,7 @@ export default function InterviewPage() {
 }
 
     };
-  }, [recording, sessionId]);
+  }, [recording, sessionId, flushFrames]);
 
 
 
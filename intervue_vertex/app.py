@@ -1,20 +1,49 @@
-from fastapi import FastAPI, Form, UploadFile, File, HTTPException
+from fastapi import FastAPI, Form, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response
 from dotenv import load_dotenv
-import uuid, json, traceback
+import uuid, json, asyncio, traceback
 
 load_dotenv()
 
 # ===== SERVICES =====
-from services.gemini_client import gemini_generate
-from services.elevenlab_tts import stream_tts
-from services.elevenlab_stt import speech_to_text
-from services.session_manager import start_session, add_message, get_session
-from services.github_parser import fetch_github_profile
+from services.gemini_client import gemini_generate_async
+from services.elevenlab_tts import open_tts, TTSUnavailable
+from services.elevenlab_stt import speech_to_text_pcm
+from services.audio_utils import decode_pcm_async
+from services import stt_queue, emotion_pool, tts_cache
+from services.stt_stream import StreamingTranscriber, StreamTooLarge
+from services.session_manager import (
+    start_session_async,
+    add_message_async,
+    get_session,
+    get_session_async,
+    update_message_async,
+)
+from services import session_manager
+from services import github_parser
+from services.github_parser import fetch_github_profile_async
+from services import conversation_memory
+from services.question_prefetch import (
+    schedule_first_question,
+    take_first_question,
+    schedule_followups,
+    take_followups,
+)
 from services.context_builder import build_candidate_context
 from services.emotion import text_emotion
-from services.vertex_wrapper import evaluate_answer  # Gemini inside
+from services import camera
+from services.vertex_wrapper import (  # Gemini inside
+    evaluate_answer_async,
+    select_followup_async,
+    stream_evaluation,
+)
+from services.ai_fallback import close_clients, provider_stats, open_quotas
+from services.report import make_report, summarize
+from services import report_pdf
+
+REPEAT_PROMPT = "I couldn't hear that clearly. Could you repeat?"
+FOLLOW_UP_PROMPT = "Thanks. Can you explain that in more detail?"
 
 # ===== APP =====
 app = FastAPI()
@@ -27,44 +56,205 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("startup")
+async def startup():
+    # Rebuild in-flight interviews from the session write-ahead log
+    await asyncio.get_running_loop().run_in_executor(None, session_manager.recover)
+    # Shared AI quota file (SQLite); opened here so importing the app has no side effects
+    await asyncio.get_running_loop().run_in_executor(None, open_quotas)
+    # Spawning + importing librosa takes seconds; do it before the first answer
+    await asyncio.get_running_loop().run_in_executor(None, emotion_pool.warm)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await github_parser.close_clients()
+    loop = asyncio.get_running_loop()
+    for close in (close_clients, emotion_pool.close, session_manager.close):
+        await loop.run_in_executor(None, close)
+
+# ================== AI HEALTH ==================
+@app.get("/ai/health")
+def ai_health():
+    return provider_stats()
+
+
+@app.get("/sessions/wal")
+def sessions_wal():
+    return session_manager.wal_stats()
+
+
 # ================== TTS ==================
+@app.get("/tts/stats")
+def tts_stats():
+    return tts_cache.stats()
+
+
 @app.get("/tts")
 def tts(text: str):
+    try:
+        chunks, hit = open_tts(text)
+    except TTSUnavailable as e:
+        raise HTTPException(502, str(e))
     return StreamingResponse(
-        stream_tts(text),
+        chunks,
         media_type="audio/mpeg",
         headers={
             "Cache-Control": "no-store",
-            "Accept-Ranges": "bytes"
+            "Accept-Ranges": "bytes",
+            "X-TTS-Cache": "hit" if hit else "miss"
         }
     )
 
 
 # ================== STT ==================
 @app.post("/stt/live")
-async def live_stt(audio: UploadFile = File(...)):
+async def live_stt(
+    audio: UploadFile = File(...),
+    session_id: str | None = Form(None),
+):
+    """
+    Transcribe a recorded answer. The clip is decoded to PCM once; with a
+    session_id the audio-emotion job starts on that same PCM and the next
+    /answer of the session attaches it, so the clip is not re-uploaded.
+    """
     try:
-        audio_bytes = await audio.read()
-        text = speech_to_text(audio_bytes)
+        pcm = await decode_pcm_async(await audio.read())
+        if session_id:
+            emotion_pool.start_for_answer(session_id, pcm)
+        text = await stt_queue.submit(speech_to_text_pcm, pcm)
+        if session_id and not (text or "").strip():
+            emotion_pool.discard_answer(session_id)  # no /answer will follow
         return {"text": text or ""}
+    except stt_queue.STTBusy as e:
+        if session_id:
+            emotion_pool.discard_answer(session_id)  # the client retries
+        raise HTTPException(
+            503,
+            "Speech recognition is busy, please retry",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception:
         traceback.print_exc()
         return {"text": ""}
 
+
+@app.websocket("/stt/ws")
+async def stt_ws(ws: WebSocket):
+    """
+    Streaming STT. The client sends binary audio chunks (MediaRecorder
+    webm/opus) while the candidate speaks, then the text message "end".
+    The server pushes {"type": "partial", "text"} while audio arrives,
+    {"type": "emotion", "t", "emotion", "score", "features"} for each
+    audio-emotion window, and {"type": "final", "text", "audio_emotion"}
+    after "end".
+    """
+    await ws.accept()
+
+    async def send(message: dict):
+        try:
+            await ws.send_json(message)
+        except Exception:
+            pass  # client already gone
+
+    async def send_partial(text: str):
+        await send({"type": "partial", "text": text})
+
+    async def send_emotion(point: dict):
+        await send({"type": "emotion", **point})
+
+    transcriber = StreamingTranscriber(on_partial=send_partial, on_emotion=send_emotion)
+    try:
+        await transcriber.start()
+        while True:
+            msg = await ws.receive()
+            if msg["type"] == "websocket.disconnect":
+                break
+            if msg.get("bytes"):
+                await transcriber.feed(msg["bytes"])
+            elif msg.get("text") == "end":
+                text = await transcriber.finish()
+                await ws.send_json({
+                    "type": "final",
+                    "text": text,
+                    "audio_emotion": transcriber.audio_emotion
+                })
+                await ws.close()
+                break
+    except WebSocketDisconnect:
+        pass
+    except StreamTooLarge as e:
+        await ws.close(code=1009, reason=str(e))
+    except Exception:
+        traceback.print_exc()
+        try:
+            await ws.send_json({"type": "final", "text": ""})
+            await ws.close()
+        except Exception:
+            pass
+    finally:
+        await transcriber.close()
+
+
+@app.get("/stt/stats")
+def stt_stats():
+    return stt_queue.stats()
+
+
+# ================== AUDIO EMOTION ==================
+@app.post("/emotion/audio")
+async def audio_emotion_endpoint(audio: UploadFile = File(...)):
+    try:
+        return await emotion_pool.analyze(await audio.read())
+    except emotion_pool.EmotionBusy as e:
+        raise HTTPException(
+            503,
+            "Audio analysis is busy, please retry",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+@app.get("/emotion/stats")
+def emotion_stats():
+    return emotion_pool.stats()
+
+# ================== CAMERA ==================
+@app.post("/camera/analyze")
+async def camera_analyze(
+    frame: UploadFile = File(...),
+    session_id: str | None = Form(None),
+):
+    # session_id keeps the face tracked across frames; without it every
+    # frame runs full detection
+    return await camera.analyze_camera_frame(frame, session_id)
+
+
+@app.post("/camera/analyze/batch")
+async def camera_analyze_batch(
+    frames: list[UploadFile] = File(...),
+    session_id: str | None = Form(None),
+):
+    """Several frames (multipart field "frames", capture order) per request."""
+    if len(frames) > camera.CAMERA_MAX_BATCH:
+        raise HTTPException(413, f"At most {camera.CAMERA_MAX_BATCH} frames per batch")
+    return await camera.analyze_camera_batch(frames, session_id)
+
+
+@app.get("/camera/stats")
+def camera_stats():
+    return camera.stats()
+
 # ================== START INTERVIEW ==================
 @app.get("/start-interview/{username}")
-def start_interview(username: str):
+async def start_interview(username: str):
     try:
+        # GitHub fetch and greeting are independent — run them together
         # 🔥 GitHub OPTIONAL
-        profile = fetch_github_profile(username)
-        github_context = (
-            build_candidate_context(profile)
-            if profile else
-            "No GitHub data available."
-        )
-
-        greeting = gemini_generate(
-            f"""
+        profile, greeting = await asyncio.gather(
+            fetch_github_profile_async(username),
+            gemini_generate_async(
+                f"""
 You are a professional technical interviewer.
 
 Candidate background:
@@ -74,25 +264,39 @@ Greet the candidate.
 Explain interview flow briefly.
 Do not ask technical questions yet.
 also donot give big para try to keep sentence small and concise
-"""
+""",
+                memo=True,
+                critical=True,  # the candidate is waiting on it
+            ),
+        )
+        github_context = (
+            build_candidate_context(profile)
+            if profile else
+            "No GitHub data available."
         )
 
         if not greeting:
             raise Exception("Gemini returned empty greeting")
 
         session_id = str(uuid.uuid4())
+        skill, project = "Fullstack", "AI Interviewer"
 
-        start_session(
+        await start_session_async(
             session_id=session_id,
             github_context=github_context,
-            skill="Fullstack",
-            project="AI Interviewer",
-            first_message=greeting
+            skill=skill,
+            project=project,
+            first_message=greeting,
+            username=username
         )
 
+        # Generated while the greeting is spoken; used by the first /answer
+        schedule_first_question(session_id, github_context, skill, project)
+
         return {
             "session_id": session_id,
-            "question": greeting
+            "question": greeting,
+            "github_source": profile.get("source") if profile else None
         }
 
     except Exception:
@@ -100,14 +304,60 @@ also donot give big para try to keep sentence small and concise
         raise HTTPException(500, "Failed to start interview")
 
 # ================== ANSWER ==================
+async def _record_answer(
+    session_id: str,
+    transcript: str,
+    metrics: str | None,
+    audio_bytes: bytes | None = None,
+    record: bool = True,
+):
+    text_em = text_emotion(transcript)
+
+    # Server-side aggregate of the frames seen during this answer; the
+    # client-sent metrics are only a fallback when no frames were posted.
+    # A retry reuses what the first submission recorded.
+    if record:
+        camera_metrics = camera.take_answer_metrics(session_id)
+    else:
+        messages = (await get_session_async(session_id))["messages"]
+        index = len(messages) - 1
+        camera_metrics = messages[index].get("camera_metrics")
+    if not camera_metrics:
+        camera_metrics = json.loads(metrics) if metrics else {}
+
+    if record:
+        index = await add_message_async(
+            session_id=session_id,
+            role="candidate",
+            text=transcript,
+            text_emotion=text_em,
+            camera_metrics=camera_metrics
+        )
+        # Audio emotion lands on the candidate message when the pool
+        # finishes: preferably the job /stt/live started on its decoded PCM,
+        # else from audio uploaded with the answer
+        if index is not None and not emotion_pool.attach_answer(session_id, index) \
+                and audio_bytes:
+            emotion_pool.schedule_attach(session_id, index, audio_bytes)
+    return text_em, camera_metrics, index
+
+
+def _is_retry(session: dict, transcript: str) -> bool:
+    """Same answer re-submitted while the first submission is still in flight."""
+    messages = session.get("messages") or []
+    return bool(messages) and messages[-1]["role"] == "candidate" \
+        and messages[-1]["text"] == transcript
+
+
 @app.post("/answer")
 async def answer(
     session_id: str = Form(...),
     answer: str = Form(""),
     metrics: str | None = Form(None),
+    audio: UploadFile | None = File(None),
 ):
     try:
-        session = get_session(session_id)
+        session = await get_session_async(session_id)
         if not session:
             raise HTTPException(400, "No active session")
 
@@ -115,37 +365,62 @@ async def answer(
         if transcript == "":
             return {
                 "evaluation": None,
-                "next_question": "I couldn't hear that clearly. Could you repeat?"
+                "next_question": REPEAT_PROMPT
             }
 
-        text_em = text_emotion(transcript)
-        camera_metrics = json.loads(metrics) if metrics else {}
-
-        add_message(
-            session_id=session_id,
-            role="candidate",
-            text=transcript,
-            text_emotion=text_em,
-            camera_metrics=camera_metrics
+        # A client-timeout retry rebuilds the original prompt, so memo
+        # single-flight joins the in-flight evaluation instead of a new call
+        retry = _is_retry(session, transcript)
+        first_q = None if retry else await take_first_question(session_id, session)
+        options = take_followups(session)
+        history = conversation_memory.render(session, upto=-1 if retry else None)
+        audio_bytes = await audio.read() if audio else None
+        text_em, camera_metrics, answer_index = await _record_answer(
+            session_id, transcript, metrics, audio_bytes, record=not retry
         )
 
-        result = evaluate_answer(
+        if first_q:
+            await add_message_async(
+                session_id=session_id,
+                role="interviewer",
+                text=first_q
+            )
+            schedule_followups(session_id, session, first_q, transcript)
+            return {
+                "evaluation": None,
+                "next_question": first_q
+            }
+
+        eval_kwargs = dict(
             answer=transcript,
             skill=session["skill"],
             project=session.get("project"),
             github_summary=session["github_context"],
             camera_metrics=camera_metrics,
-            text_emotion=text_em
+            text_emotion=text_em,
+            history=history,
+            hedge=True,
+            memo=True,
         )
+        # Follow-ups speculated while the candidate spoke → select + score only
+        if options:
+            result = await select_followup_async(options=options, **eval_kwargs)
+        else:
+            result = await evaluate_answer_async(**eval_kwargs)
 
-        next_q = result.get("next_question") or \
-            "Thanks. Can you explain that in more detail?"
+        next_q = result.get("next_question") or FOLLOW_UP_PROMPT
+        # Idempotent: a retry replaces the same evaluation
+        await update_message_async(session_id, answer_index, evaluation=result)
 
-        add_message(
-            session_id=session_id,
-            role="interviewer",
-            text=next_q
-        )
+        latest = await get_session_async(session_id)
+        if not (retry and latest["messages"][-1]["role"] == "interviewer"):
+            await add_message_async(
+                session_id=session_id,
+                role="interviewer",
+                text=next_q
+            )
+            schedule_followups(session_id, session, next_q, transcript)
+            conversation_memory.schedule_fold(session_id, await get_session_async(session_id))
 
         return {
             "evaluation": result,
@@ -157,3 +432,149 @@ async def answer(
     except Exception:
         traceback.print_exc()
         raise HTTPException(500, "Answer processing failed")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/answer/stream")
+async def answer_stream(
+    session_id: str = Form(...),
+    answer: str = Form(""),
+    metrics: str | None = Form(None),
+    audio: UploadFile | None = File(None),
+):
+    """
+    Server-sent events variant of /answer:
+      event: next_question  → {"next_question": ...} as soon as it is generated
+      event: evaluation     → {"evaluation": {...}, "next_question": ...}
+      event: error          → {"detail": ...}
+    """
+    session = await get_session_async(session_id)
+    if not session:
+        raise HTTPException(400, "No active session")
+
+    transcript = answer.strip()
+    # Read before streaming starts; the upload is closed once the handler returns
+    audio_bytes = await audio.read() if audio else None
+
+    async def events():
+        if transcript == "":
+            yield _sse("next_question", {"next_question": REPEAT_PROMPT})
+            yield _sse("evaluation", {"evaluation": None, "next_question": REPEAT_PROMPT})
+            return
+
+        next_q = None
+        duplicate = False
+        try:
+            # A client retrying after a dropped stream re-sends the same
+            # answer: reuse the recorded turn instead of appending another
+            retry = _is_retry(session, transcript)
+            first_q = None if retry else await take_first_question(session_id, session)
+            options = take_followups(session)
+            history = conversation_memory.render(session, upto=-1 if retry else None)
+            text_em, camera_metrics, answer_index = await _record_answer(
+                session_id, transcript, metrics, audio_bytes, record=not retry
+            )
+
+            if first_q:
+                await add_message_async(
+                    session_id=session_id,
+                    role="interviewer",
+                    text=first_q
+                )
+                schedule_followups(session_id, session, first_q, transcript)
+                yield _sse("next_question", {"next_question": first_q})
+                yield _sse("evaluation", {"evaluation": None, "next_question": first_q})
+                return
+
+            async for kind, payload in stream_evaluation(
+                answer=transcript,
+                skill=session["skill"],
+                project=session.get("project"),
+                github_summary=session["github_context"],
+                camera_metrics=camera_metrics,
+                text_emotion=text_em,
+                history=history,
+                options=options,
+            ):
+                if kind == "next_question":
+                    next_q = payload or FOLLOW_UP_PROMPT
+                    latest = await get_session_async(session_id)
+                    duplicate = retry and latest["messages"][-1]["role"] == "interviewer"
+                    if not duplicate:
+                        await add_message_async(
+                            session_id=session_id,
+                            role="interviewer",
+                            text=next_q
+                        )
+                        schedule_followups(session_id, session, next_q, transcript)
+                    yield _sse("next_question", {"next_question": next_q})
+                else:
+                    # Idempotent: a retry replaces the same evaluation
+                    await update_message_async(session_id, answer_index, evaluation=payload)
+                    yield _sse("evaluation", {"evaluation": payload, "next_question": next_q})
+
+            if not duplicate:
+                conversation_memory.schedule_fold(session_id, await get_session_async(session_id))
+
+        except Exception:
+            traceback.print_exc()
+            yield _sse("error", {"detail": "Answer processing failed"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+# ================== REPORT ==================
+@app.get("/report/{session_id}")
+def report(session_id: str):
+    session = get_session(session_id)
+    if not session:
+        raise HTTPException(404, "Unknown session")
+    return make_report(session)
+
+
+@app.get("/report/{session_id}/summary")
+def report_summary(session_id: str):
+    """Running totals only — cheap enough for a live dashboard to poll."""
+    session = get_session(session_id)
+    if not session:
+        raise HTTPException(404, "Unknown session")
+    return summarize(session)
+
+
+@app.get("/report/{session_id}/pdf")
+async def report_pdf_download(session_id: str, request: Request):
+    session = await get_session_async(session_id)
+    if not session:
+        raise HTTPException(404, "Unknown session")
+
+    etag = '"%s-%s"' % report_pdf.cache_key(session_id, session)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    try:
+        pdf = await report_pdf.get_pdf(session_id, session)
+    except Exception:
+        traceback.print_exc()
+        raise HTTPException(500, "Report rendering failed")
+
+    chunk = 64 * 1024
+    return StreamingResponse(
+        (pdf[i:i + chunk] for i in range(0, len(pdf), chunk)),
+        media_type="application/pdf",
+        headers={
+            "Content-Length": str(len(pdf)),
+            "Content-Disposition": f'attachment; filename="report-{session_id}.pdf"',
+            "ETag": etag,
+            "Cache-Control": "private, no-cache",
+        }
+    )
@@ -7,87 +7,327 @@ Order of priority:
   3. HuggingFace (Llama 3 8B)  — unlimited but slower
   4. Static fallback            — always works, returns a safe default
 
+All provider calls are asyncio-native and run on one dedicated engine loop
+that owns long-lived, connection-pooled clients (one per provider). The
+async API can be awaited from any event loop; the sync API submits to the
+engine loop and blocks the calling thread only.
+
+Providers are ranked at runtime by provider_health (EWMA latency and success
+ratio) and guarded by per-provider circuit breakers, so a degraded provider
+is skipped instantly instead of adding its timeout to every request.
+
+Quotas: provider_quota keeps per-minute and per-day token buckets for the
+providers above that have free-tier limits. A provider's rank is scaled by
+how drained its buckets are, so load spreads to the next provider before
+the quota runs out. Calls a candidate is waiting on (critical=True,
+hedge=True, and streaming) may use the last AI_QUOTA_RESERVE of each
+bucket; background calls may not. The buckets are shared by every worker
+process through AI_QUOTA_PATH.
+
+Hedging (opt-in, hedge=True): if the current provider has not answered
+within the AI_HEDGE_PERCENTILE of its recent latency, the next provider is
+started in parallel; the first valid response wins and the loser is
+cancelled. Hedge and win counters are reported by provider_stats().
+
+Memoization (opt-in, memo=True): results are cached by a normalized hash of
+(system, prompt, want_json, temperature) in an LRU with TTL, optionally
+backed by files under AI_MEMO_DIR. Concurrent identical requests share one
+upstream call (single-flight). Static fallbacks are never memoized.
+
 Usage:
     from services.ai_fallback import ai_generate, ai_generate_json
+    from services.ai_fallback import ai_generate_async, ai_generate_json_async
+    from services.ai_fallback import ai_stream_async
 """
 
 import os
+import copy
 import json
+import asyncio
+import hashlib
+import threading
 import time
-import requests
+import httpx
+from collections import OrderedDict
 from dotenv import load_dotenv
+from services import provider_health, provider_quota
 
 load_dotenv()
 
+# ─────────────────────────────────────────────
+# Engine loop + pooled clients
+# ─────────────────────────────────────────────
+
+# (connect, read) timeouts in seconds, per provider
+_TIMEOUTS = {
+    "groq":        (float(os.getenv("AI_GROQ_CONNECT_TIMEOUT", "3")),
+                    float(os.getenv("AI_GROQ_READ_TIMEOUT", "15"))),
+    "gemini":      (float(os.getenv("AI_GEMINI_CONNECT_TIMEOUT", "3")),
+                    float(os.getenv("AI_GEMINI_READ_TIMEOUT", "20"))),
+    "huggingface": (float(os.getenv("AI_HF_CONNECT_TIMEOUT", "3")),
+                    float(os.getenv("AI_HF_READ_TIMEOUT", "30"))),
+}
+
+# Hedge delay = this percentile of the provider's recent latency, clamped
+_HEDGE_PERCENTILE = float(os.getenv("AI_HEDGE_PERCENTILE", "90"))
+_HEDGE_MIN_DELAY  = float(os.getenv("AI_HEDGE_MIN_DELAY", "0.5"))
+_HEDGE_MAX_DELAY  = float(os.getenv("AI_HEDGE_MAX_DELAY", "8"))
+_HEDGE_MIN_SAMPLES = 5
+
+_MEMO_TTL_S = float(os.getenv("AI_MEMO_TTL_S", "600"))
+_MEMO_MAX   = int(os.getenv("AI_MEMO_MAX", "512"))
+_MEMO_DIR   = os.getenv("AI_MEMO_DIR", "")   # empty → memory tier only
+
+_POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("AI_POOL_MAX_CONNECTIONS", "50")),
+    max_keepalive_connections=int(os.getenv("AI_POOL_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=60.0,
+)
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_clients: dict = {}
+
+
+def _engine_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="ai-engine", daemon=True
+            ).start()
+            _loop = loop
+    return _loop
+
+
+def _http_timeout(name: str) -> httpx.Timeout:
+    connect, read = _TIMEOUTS[name]
+    return httpx.Timeout(read, connect=connect)
+
+
+def _total_timeout(name: str) -> float:
+    connect, read = _TIMEOUTS[name]
+    return connect + read
+
+
+def _client(name: str):
+    """
+    Lazily build the pooled client for a provider. Only ever called on the
+    engine loop, so the clients (and their connection pools) stay bound to it.
+    """
+    if name in _clients:
+        return _clients[name]
+
+    if name == "groq":
+        from groq import AsyncGroq
+        client = AsyncGroq(
+            api_key=os.getenv("GROQ_API_KEY", ""),
+            timeout=_http_timeout(name),
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                timeout=_http_timeout(name), limits=_POOL_LIMITS
+            ),
+        )
+    elif name == "gemini":
+        from google import genai
+        from google.genai import types
+        client = genai.Client(
+            api_key=os.getenv("GEMINI_API_KEY", ""),
+            http_options=types.HttpOptions(
+                timeout=int(_total_timeout(name) * 1000)
+            ),
+        )
+    else:
+        client = httpx.AsyncClient(
+            base_url="https://api-inference.huggingface.co",
+            timeout=_http_timeout(name),
+            limits=_POOL_LIMITS,
+        )
+
+    _clients[name] = client
+    return client
+
+
+async def _close_clients():
+    for name, client in list(_clients.items()):
+        try:
+            if name == "gemini":
+                continue  # genai.Client has no async close
+            if name == "groq":
+                await client.close()
+            else:
+                await client.aclose()
+        except Exception as e:
+            print(f"[AI] Closing {name} client failed: {e}")
+    _clients.clear()
+
+
+def open_quotas():
+    """Attach to the shared provider quotas (blocking; call on app startup)."""
+    provider_quota.open()
+
+
+def close_clients():
+    """Close all pooled provider clients and the quota store (call on app shutdown)."""
+    if _loop is not None and not _loop.is_closed():
+        asyncio.run_coroutine_threadsafe(_close_clients(), _loop).result(timeout=5)
+    provider_quota.close()
+
+
+async def _on_engine(coro):
+    """Await a coroutine on the engine loop from any event loop."""
+    loop = _engine_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+async def _on_engine_stream(agen):
+    """Iterate an async generator on the engine loop from any event loop."""
+    loop = _engine_loop()
+    caller = asyncio.get_running_loop()
+    if caller is loop:
+        async for item in agen:
+            yield item
+        return
+
+    queue = asyncio.Queue()
+    end = object()
+
+    async def pump():
+        try:
+            async for item in agen:
+                caller.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            caller.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            caller.call_soon_threadsafe(queue.put_nowait, end)
+
+    fut = asyncio.run_coroutine_threadsafe(pump(), loop)
+    try:
+        while True:
+            item = await queue.get()
+            if item is end:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        fut.cancel()
+
+
+def _run_sync(coro):
+    """Run a coroutine on the engine loop and block this thread for the result."""
+    return asyncio.run_coroutine_threadsafe(coro, _engine_loop()).result()
+
+
+def _temperature(want_json: bool) -> float:
+    return 0.4 if want_json else 0.7
+
+
 # ─────────────────────────────────────────────
 # Provider 1 — Groq
 # ─────────────────────────────────────────────
 
-def _try_groq(prompt: str, system: str, want_json: bool) -> str | None:
-    api_key = os.getenv("GROQ_API_KEY", "")
-    if not api_key:
+def _groq_kwargs(prompt: str, system: str, want_json: bool) -> dict:
+    kwargs = dict(
+        model="llama-3.3-70b-versatile",
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user",   "content": prompt},
+        ],
+        temperature=_temperature(want_json),
+        max_tokens=1024,
+    )
+    if want_json:
+        kwargs["response_format"] = {"type": "json_object"}
+    return kwargs
+
+
+async def _try_groq(prompt: str, system: str, want_json: bool) -> str | None:
+    if not os.getenv("GROQ_API_KEY", ""):
         return None
 
     try:
-        from groq import Groq
-        client = Groq(api_key=api_key)
-        kwargs = dict(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user",   "content": prompt},
-            ],
-            temperature=0.4 if want_json else 0.7,
-            max_tokens=1024,
+        resp = await asyncio.wait_for(
+            _client("groq").chat.completions.create(
+                **_groq_kwargs(prompt, system, want_json)
+            ),
+            timeout=_total_timeout("groq"),
         )
-        if want_json:
-            kwargs["response_format"] = {"type": "json_object"}
-
-        resp = client.chat.completions.create(**kwargs)
         return resp.choices[0].message.content.strip()
     except Exception as e:
-        print(f"[AI] Groq failed: {e}")
+        print(f"[AI] Groq failed: {e!r}")
         return None
 
 
+async def _stream_groq(prompt: str, system: str, want_json: bool):
+    stream = await _client("groq").chat.completions.create(
+        **_groq_kwargs(prompt, system, want_json), stream=True
+    )
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
+
 # ─────────────────────────────────────────────
 # Provider 2 — Gemini Flash
 # ─────────────────────────────────────────────
 
-def _try_gemini(prompt: str, system: str, want_json: bool) -> str | None:
-    api_key = os.getenv("GEMINI_API_KEY", "")
-    if not api_key:
-        return None
+def _gemini_kwargs(prompt: str, system: str, want_json: bool) -> dict:
+    from google.genai import types
 
-    try:
-        from google import genai
-        from google.genai import types
+    full_prompt = f"{system}\n\n{prompt}"
+    if want_json:
+        full_prompt += "\n\nRespond with ONLY valid JSON, no markdown."
 
-        client = genai.Client(api_key=api_key)
+    return dict(
+        model="gemini-2.0-flash",
+        contents=full_prompt,
+        config=types.GenerateContentConfig(
+            temperature=_temperature(want_json),
+            max_output_tokens=1024,
+        ),
+    )
 
-        full_prompt = f"{system}\n\n{prompt}"
-        if want_json:
-            full_prompt += "\n\nRespond with ONLY valid JSON, no markdown."
-
-        resp = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=full_prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.4 if want_json else 0.7,
-                max_output_tokens=1024,
+
+async def _try_gemini(prompt: str, system: str, want_json: bool) -> str | None:
+    if not os.getenv("GEMINI_API_KEY", ""):
+        return None
+
+    try:
+        resp = await asyncio.wait_for(
+            _client("gemini").aio.models.generate_content(
+                **_gemini_kwargs(prompt, system, want_json)
             ),
+            timeout=_total_timeout("gemini"),
         )
         return resp.text.strip()
     except Exception as e:
-        print(f"[AI] Gemini failed: {e}")
+        print(f"[AI] Gemini failed: {e!r}")
         return None
 
 
+async def _stream_gemini(prompt: str, system: str, want_json: bool):
+    stream = await _client("gemini").aio.models.generate_content_stream(
+        **_gemini_kwargs(prompt, system, want_json)
+    )
+    async for chunk in stream:
+        if chunk.text:
+            yield chunk.text
+
+
 # ─────────────────────────────────────────────
 # Provider 3 — HuggingFace Inference API
 # ─────────────────────────────────────────────
 
-def _try_huggingface(prompt: str, system: str, want_json: bool) -> str | None:
+async def _try_huggingface(prompt: str, system: str, want_json: bool) -> str | None:
     api_key = os.getenv("HF_API_KEY", "")
     # HuggingFace has some models available without a key too
     headers = {"Content-Type": "application/json"}
@@ -103,15 +343,14 @@ def _try_huggingface(prompt: str, system: str, want_json: bool) -> str | None:
             "inputs": full_prompt,
             "parameters": {
                 "max_new_tokens": 512,
-                "temperature": 0.4 if want_json else 0.7,
+                "temperature": _temperature(want_json),
                 "return_full_text": False,
             },
         }
-        resp = requests.post(
-            "https://api-inference.huggingface.co/models/meta-llama/Llama-3.2-3B-Instruct",
+        resp = await _client("huggingface").post(
+            "/models/meta-llama/Llama-3.2-3B-Instruct",
             headers=headers,
             json=payload,
-            timeout=30,
         )
         resp.raise_for_status()
         data = resp.json()
@@ -123,66 +362,476 @@ def _try_huggingface(prompt: str, system: str, want_json: bool) -> str | None:
             return text
         return None
     except Exception as e:
-        print(f"[AI] HuggingFace failed: {e}")
+        print(f"[AI] HuggingFace failed: {e!r}")
         return None
 
 
+# ─────────────────────────────────────────────
+# Chain
+# ─────────────────────────────────────────────
+
+_PROVIDERS = {
+    "groq":        _try_groq,
+    "gemini":      _try_gemini,
+    "huggingface": _try_huggingface,
+}
+
+# Token streaming; providers without an entry return their whole output at once
+_STREAMS = {
+    "groq":   _stream_groq,
+    "gemini": _stream_gemini,
+}
+
+# Static priority; provider_health re-ranks these at runtime
+_PROVIDERS_TEXT = ["groq", "gemini", "huggingface"]
+_PROVIDERS_JSON = ["groq", "gemini", "huggingface"]
+
+# Prior latencies (seconds) used to rank providers before any data exists
+for _name, _prior in (("groq", 1.0), ("gemini", 2.0), ("huggingface", 6.0)):
+    provider_health.register(_name, _prior)
+
+# Free-tier request quotas (0 = unlimited); HuggingFace has none
+provider_quota.register("groq",
+                        int(os.getenv("AI_GROQ_RPM", "30")),
+                        int(os.getenv("AI_GROQ_RPD", "14400")))
+provider_quota.register("gemini",
+                        int(os.getenv("AI_GEMINI_RPM", "15")),
+                        int(os.getenv("AI_GEMINI_RPD", "1500")))
+
+
+def _configured(name: str) -> bool:
+    if name == "groq":
+        return bool(os.getenv("GROQ_API_KEY", ""))
+    if name == "gemini":
+        return bool(os.getenv("GEMINI_API_KEY", ""))
+    return True
+
+
+TEXT_FALLBACK = "Let's continue. Could you tell me more about your technical background?"
+JSON_FALLBACK = {
+    "score": 5,
+    "confidence_level": "medium",
+    "communication_feedback": "Could not evaluate at this time.",
+    "technical_feedback": "Could not evaluate at this time.",
+    "strengths": [],
+    "weaknesses": [],
+    "next_question": "Could you elaborate on your previous answer?",
+    "interviewer_tone": "neutral",
+}
+
+
+def parse_json_output(raw: str) -> dict | None:
+    try:
+        # Extract JSON even if there's surrounding text
+        start = raw.find("{")
+        end   = raw.rfind("}") + 1
+        if start != -1 and end > start:
+            return json.loads(raw[start:end])
+    except Exception as e:
+        print(f"[AI] JSON parse failed for provider output: {e}")
+    return None
+
+
+async def _attempt(name: str, prompt: str, system: str, want_json: bool):
+    """
+    One provider attempt, recorded in provider_health.
+    Returns the text (or parsed dict when want_json), or None on failure.
+    """
+    start = time.monotonic()
+    try:
+        raw = await _PROVIDERS[name](prompt, system, want_json=want_json)
+    except asyncio.CancelledError:
+        provider_health.release(name)
+        raise
+
+    result = raw or None
+    if result and want_json:
+        result = parse_json_output(raw)
+
+    provider_health.record(name, result is not None, time.monotonic() - start)
+    return result
+
+
+async def _candidates(names: list[str], critical: bool):
+    """
+    Yield providers best-first. Lazy, so a half-open breaker only hands out
+    its probe slot, and a quota its token, when the provider is actually
+    about to be called.
+    """
+    for name in provider_health.ordered(names, provider_quota.pressure):
+        if not _configured(name) or not provider_health.allow(name):
+            continue
+        try:
+            granted = await provider_quota.acquire_async(name, critical)
+        except BaseException:
+            provider_health.release(name)
+            raise
+        if not granted:
+            provider_health.release(name)
+            continue
+        yield name
+
+
+def _hedge_delay(name: str) -> float:
+    health = provider_health.get(name)
+    if len(health.recent) < _HEDGE_MIN_SAMPLES:
+        delay = health.latency * 2
+    else:
+        delay = health.latency_percentile(_HEDGE_PERCENTILE)
+    return min(max(delay, _HEDGE_MIN_DELAY), _HEDGE_MAX_DELAY)
+
+
+async def _run_chain(names: list[str], prompt: str, system: str,
+                     want_json: bool, hedge: bool, critical: bool):
+    """
+    Walk the provider chain. Without hedging this is a plain sequential
+    fallback; with hedging the next provider is also started when the
+    current one is slower than its recent latency percentile.
+    Returns the first valid result, or None if every provider failed.
+    """
+    candidates = _candidates(names, critical)
+    owner = {}
+    pending = set()
+    hedged = False
+
+    def launch(name: str | None):
+        if name is None:
+            return
+        task = asyncio.create_task(_attempt(name, prompt, system, want_json))
+        owner[task] = name
+        pending.add(task)
+
+    launch(await anext(candidates, None))
+    last = next(iter(owner.values()), None)
+
+    try:
+        while pending:
+            delay = _hedge_delay(last) if hedge and last else None
+            done, _ = await asyncio.wait(
+                pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if not done:
+                # Slow tail — start the next provider alongside
+                nxt = await anext(candidates, None)
+                if nxt is None:
+                    last = None
+                    continue
+                for task in pending:
+                    provider_health.get(owner[task]).hedged += 1
+                provider_health.get(nxt).hedge_launches += 1
+                print(f"[AI] Hedging {last} with {nxt}")
+                hedged = True
+                launch(nxt)
+                last = nxt
+                continue
+
+            for task in done:
+                pending.discard(task)
+                result = task.result()
+                if result is not None:
+                    if hedged:
+                        provider_health.get(owner[task]).hedge_wins += 1
+                    return result
+
+            if not pending:
+                # Plain fallback: everything in flight failed
+                last = await anext(candidates, None)
+                launch(last)
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        await candidates.aclose()
+
+
+async def _stream_chain(names: list[str], prompt: str, system: str, want_json: bool):
+    """
+    Yield text deltas from the first provider that produces output. A
+    provider that fails before its first token falls through to the next;
+    once tokens have been sent there is nothing to fall back to.
+    """
+    async for name in _candidates(names, critical=True):
+        stream = _STREAMS.get(name)
+        start = time.monotonic()
+        emitted = False
+        ok = False
+        try:
+            if stream is None:
+                raw = await _PROVIDERS[name](prompt, system, want_json=want_json)
+                if raw:
+                    emitted = True
+                    yield raw
+            else:
+                async for delta in stream(prompt, system, want_json):
+                    emitted = True
+                    yield delta
+            ok = emitted
+        except (asyncio.CancelledError, GeneratorExit):
+            provider_health.release(name)
+            raise
+        except Exception as e:
+            print(f"[AI] {name} stream failed: {e!r}")
+
+        provider_health.record(name, ok, time.monotonic() - start)
+        if emitted:
+            return
+
+    print("[AI] ⚠️  All providers failed to stream.")
+
+
+async def _generate_text(prompt: str, system: str, hedge: bool, critical: bool) -> str:
+    result = await _run_chain(_PROVIDERS_TEXT, prompt, system, False, hedge, critical)
+    if result:
+        return result
+
+    # All providers failed — return a safe fallback
+    print("[AI] ⚠️  All providers failed. Using static fallback.")
+    return TEXT_FALLBACK
+
+
+async def _generate_json(prompt: str, system: str, hedge: bool, critical: bool) -> dict:
+    result = await _run_chain(_PROVIDERS_JSON, prompt, system, True, hedge, critical)
+    if result is not None:
+        return result
+
+    # All providers failed — return a safe evaluation default
+    print("[AI] ⚠️  All providers failed. Using static JSON fallback.")
+    return dict(JSON_FALLBACK)
+
+
+# ─────────────────────────────────────────────
+# Memoization (engine loop only)
+# ─────────────────────────────────────────────
+
+_memo: OrderedDict[str, tuple[float, object]] = OrderedDict()
+_inflight: dict[str, dict] = {}   # key → {"task", "waiters"}
+_memo_stats = {"hits": 0, "disk_hits": 0, "shared": 0, "misses": 0}
+
+
+def _memo_key(system: str, prompt: str, want_json: bool) -> str:
+    normalized = json.dumps([
+        " ".join(system.split()),
+        " ".join(prompt.split()),
+        want_json,
+        _temperature(want_json),
+    ])
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _memo_path(key: str) -> str:
+    return os.path.join(_MEMO_DIR, f"{key}.json")
+
+
+def _disk_load(key: str):
+    try:
+        with open(_memo_path(key), "r", encoding="utf-8") as f:
+            stored_at, value = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return (stored_at, value) if time.time() - stored_at < _MEMO_TTL_S else None
+
+
+def _disk_store(key: str, stored_at: float, value):
+    try:
+        os.makedirs(_MEMO_DIR, exist_ok=True)
+        tmp = _memo_path(key) + ".part"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump([stored_at, value], f)
+        os.replace(tmp, _memo_path(key))
+    except OSError as e:
+        print(f"[AI] Memo disk write failed: {e}")
+
+
+def _memo_put(key: str, stored_at: float, value):
+    _memo[key] = (stored_at, value)
+    _memo.move_to_end(key)
+    while len(_memo) > _MEMO_MAX:
+        _memo.popitem(last=False)
+
+
+async def _produce(key: str, produce, is_fallback):
+    if _MEMO_DIR:
+        entry = await asyncio.to_thread(_disk_load, key)
+        if entry:
+            _memo_stats["disk_hits"] += 1
+            _memo_put(key, *entry)
+            return entry[1]
+
+    _memo_stats["misses"] += 1
+    value = await produce()
+    if not is_fallback(value):
+        stored_at = time.time()
+        _memo_put(key, stored_at, value)
+        if _MEMO_DIR:
+            await asyncio.to_thread(_disk_store, key, stored_at, value)
+    return value
+
+
+async def _memoized(key: str, produce, is_fallback):
+    """
+    Return a cached value for key, join an in-flight call for it, or run
+    produce() once and cache the result unless is_fallback(result).
+
+    The call runs in its own task, so a caller that is cancelled (client
+    gone, hedge lost) only stops waiting; the call is cancelled once no
+    caller is waiting on it any more.
+    """
+    entry = _memo.get(key)
+    if entry and time.time() - entry[0] < _MEMO_TTL_S:
+        _memo.move_to_end(key)
+        _memo_stats["hits"] += 1
+        return copy.deepcopy(entry[1])
+
+    flight = _inflight.get(key)
+    if flight:
+        _memo_stats["shared"] += 1
+    else:
+        task = asyncio.create_task(_produce(key, produce, is_fallback))
+        flight = _inflight[key] = {"task": task, "waiters": 0}
+
+        def done(t, flight=flight):
+            if _inflight.get(key) is flight:
+                del _inflight[key]
+            if not t.cancelled():
+                t.exception()  # retrieved by waiters; silence the unawaited warning
+
+        task.add_done_callback(done)
+
+    flight["waiters"] += 1
+    try:
+        value = await asyncio.shield(flight["task"])
+    finally:
+        flight["waiters"] -= 1
+        if flight["waiters"] == 0 and not flight["task"].done():
+            # Last waiter gone: stop the call, and never let a new caller
+            # join a task that is being cancelled
+            if _inflight.get(key) is flight:
+                del _inflight[key]
+            flight["task"].cancel()
+    return copy.deepcopy(value)
+
+
+async def _text(prompt: str, system: str, hedge: bool, memo: bool, critical: bool) -> str:
+    # Hedged calls always have a candidate waiting on them
+    critical = critical or hedge
+    if not memo:
+        return await _generate_text(prompt, system, hedge, critical)
+    return await _memoized(
+        _memo_key(system, prompt, False),
+        lambda: _generate_text(prompt, system, hedge, critical),
+        lambda value: value == TEXT_FALLBACK,
+    )
+
+
+async def _json(prompt: str, system: str, hedge: bool, memo: bool, critical: bool) -> dict:
+    critical = critical or hedge
+    if not memo:
+        return await _generate_json(prompt, system, hedge, critical)
+    return await _memoized(
+        _memo_key(system, prompt, True),
+        lambda: _generate_json(prompt, system, hedge, critical),
+        lambda value: value == JSON_FALLBACK,
+    )
+
+
 # ─────────────────────────────────────────────
 # Public API
 # ─────────────────────────────────────────────
 
-_PROVIDERS_TEXT = [_try_groq, _try_gemini, _try_huggingface]
-_PROVIDERS_JSON = [_try_groq, _try_gemini, _try_huggingface]
+_DEFAULT_SYSTEM_TEXT = "You are a helpful, concise assistant."
+_DEFAULT_SYSTEM_JSON = "You are a helpful assistant. Always respond with valid JSON only."
 
 
-def ai_generate(
+async def ai_generate_async(
     prompt: str,
-    system: str = "You are a helpful, concise assistant.",
+    system: str = _DEFAULT_SYSTEM_TEXT,
+    hedge: bool = False,
+    memo: bool = False,
+    critical: bool = False,
 ) -> str:
     """
-    Generate plain text. Tries each provider in order until one succeeds.
+    Generate plain text without blocking the caller's event loop.
+    Tries each provider in order until one succeeds; hedge=True races the
+    next provider against a slow one, memo=True serves repeats from cache,
+    critical=True (implied by hedge) may use the quota reserve.
     """
-    for provider in _PROVIDERS_TEXT:
-        result = provider(prompt, system, want_json=False)
-        if result:
-            return result
+    return await _on_engine(_text(prompt, system, hedge, memo, critical))
 
-    # All providers failed — return a safe fallback
-    print("[AI] ⚠️  All providers failed. Using static fallback.")
-    return "Let's continue. Could you tell me more about your technical background?"
+
+async def ai_generate_json_async(
+    prompt: str,
+    system: str = _DEFAULT_SYSTEM_JSON,
+    hedge: bool = False,
+    memo: bool = False,
+    critical: bool = False,
+) -> dict:
+    """
+    Generate structured JSON without blocking the caller's event loop.
+    Tries each provider in order until one succeeds; hedge=True races the
+    next provider against a slow one, memo=True serves repeats from cache,
+    critical=True (implied by hedge) may use the quota reserve.
+    Automatically cleans and parses the JSON.
+    """
+    return await _on_engine(_json(prompt, system, hedge, memo, critical))
+
+
+async def ai_stream_async(
+    prompt: str,
+    system: str = _DEFAULT_SYSTEM_TEXT,
+    want_json: bool = False,
+):
+    """
+    Stream raw text deltas from the best available provider (Groq and Gemini
+    stream tokens; HuggingFace yields its whole output at once). Yields
+    nothing if every provider failed — callers keep their own fallback.
+    """
+    async for delta in _on_engine_stream(_stream_chain(
+        _PROVIDERS_JSON if want_json else _PROVIDERS_TEXT,
+        prompt, system, want_json,
+    )):
+        yield delta
+
+
+def ai_generate(
+    prompt: str,
+    system: str = _DEFAULT_SYSTEM_TEXT,
+    hedge: bool = False,
+    memo: bool = False,
+    critical: bool = False,
+) -> str:
+    """
+    Generate plain text. Sync wrapper around ai_generate_async().
+    """
+    return _run_sync(_text(prompt, system, hedge, memo, critical))
 
 
 def ai_generate_json(
     prompt: str,
-    system: str = "You are a helpful assistant. Always respond with valid JSON only.",
+    system: str = _DEFAULT_SYSTEM_JSON,
+    hedge: bool = False,
+    memo: bool = False,
+    critical: bool = False,
 ) -> dict:
     """
-    Generate structured JSON. Tries each provider in order until one succeeds.
-    Automatically cleans and parses the JSON.
+    Generate structured JSON. Sync wrapper around ai_generate_json_async().
     """
-    for provider in _PROVIDERS_JSON:
-        raw = provider(prompt, system, want_json=True)
-        if not raw:
-            continue
-        try:
-            # Extract JSON even if there's surrounding text
-            start = raw.find("{")
-            end   = raw.rfind("}") + 1
-            if start != -1 and end > start:
-                return json.loads(raw[start:end])
-        except Exception as e:
-            print(f"[AI] JSON parse failed for provider output: {e}")
-            continue
+    return _run_sync(_json(prompt, system, hedge, memo, critical))
 
-    # All providers failed — return a safe evaluation default
-    print("[AI] ⚠️  All providers failed. Using static JSON fallback.")
+
+async def _provider_stats() -> dict:
     return {
-        "score": 5,
-        "confidence_level": "medium",
-        "communication_feedback": "Could not evaluate at this time.",
-        "technical_feedback": "Could not evaluate at this time.",
-        "strengths": [],
-        "weaknesses": [],
-        "next_question": "Could you elaborate on your previous answer?",
-        "interviewer_tone": "neutral",
+        "order": provider_health.ordered(_PROVIDERS_TEXT, provider_quota.pressure),
+        "providers": provider_health.snapshot(),
+        "quota": provider_quota.snapshot(),
+        "memo": {**_memo_stats, "entries": len(_memo)},
     }
+
+
+def provider_stats() -> dict:
+    """
+    Breaker state, EWMA latency / success, hedge, quota and memo counters,
+    current order. Read on the engine loop: reading refills buckets and trims
+    breaker windows, and that state belongs to the engine loop.
+    """
+    return _run_sync(_provider_stats())
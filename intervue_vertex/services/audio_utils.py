@@ -1,24 +1,97 @@
-import subprocess
-import tempfile
+"""
+audio_utils.py — ffmpeg transcoding over stdin/stdout pipes.
+
+No temp files: the upload is fed to ffmpeg on stdin and the result is read
+from stdout. Every ffmpeg run goes through one bounded worker pool
+(FFMPEG_WORKERS) so a burst of uploads cannot fork unbounded processes, and
+a non-zero exit status raises TranscodeError instead of returning garbage.
+
+decode_pcm() returns mono float32 PCM as a NumPy array so one decode can be
+shared by STT (via pcm_to_wav) and audio emotion analysis.
+"""
+
+import io
 import os
+import wave
+import asyncio
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+PCM_SAMPLE_RATE = 16000
+FFMPEG_WORKERS = int(os.getenv("FFMPEG_WORKERS", "4"))
+FFMPEG_TIMEOUT = float(os.getenv("FFMPEG_TIMEOUT", "30"))
+
+_pool = ThreadPoolExecutor(max_workers=FFMPEG_WORKERS, thread_name_prefix="ffmpeg")
+
+
+class TranscodeError(RuntimeError):
+    pass
+
+
+def _ffmpeg(audio_bytes: bytes, output_args: list[str]) -> bytes:
+    try:
+        proc = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error",
+             "-i", "pipe:0", *output_args, "pipe:1"],
+            input=audio_bytes,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=FFMPEG_TIMEOUT,
+        )
+    except subprocess.TimeoutExpired:
+        raise TranscodeError(f"ffmpeg timed out after {FFMPEG_TIMEOUT}s")
+
+    if proc.returncode != 0:
+        err = proc.stderr.decode("utf-8", "replace").strip()
+        raise TranscodeError(f"ffmpeg exited with {proc.returncode}: {err[-300:]}")
+    if not proc.stdout:
+        raise TranscodeError("ffmpeg produced no output")
+    return proc.stdout
+
+
+# ─────────────────────────────────────────────
+# Sync API (runs on the worker pool, blocks the caller)
+# ─────────────────────────────────────────────
 
 def webm_to_wav(webm_bytes: bytes) -> bytes:
-    with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as webm:
-        webm.write(webm_bytes)
-        webm_path = webm.name
+    return _pool.submit(
+        _ffmpeg, webm_bytes, ["-f", "wav"]
+    ).result()
 
-    wav_path = webm_path.replace(".webm", ".wav")
 
-    subprocess.run(
-        ["ffmpeg", "-y", "-i", webm_path, wav_path],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-    )
+def decode_pcm(audio_bytes: bytes, sr: int = PCM_SAMPLE_RATE) -> np.ndarray:
+    """Decode any ffmpeg-readable audio to mono float32 PCM at `sr` Hz."""
+    raw = _pool.submit(
+        _ffmpeg, audio_bytes, ["-f", "f32le", "-ac", "1", "-ar", str(sr)]
+    ).result()
+    return np.frombuffer(raw, dtype=np.float32)
 
-    with open(wav_path, "rb") as f:
-        wav_bytes = f.read()
 
-    os.remove(webm_path)
-    os.remove(wav_path)
+def pcm_to_wav(pcm: np.ndarray, sr: int = PCM_SAMPLE_RATE) -> bytes:
+    """Encode mono float PCM as 16-bit WAV in-process (no ffmpeg)."""
+    samples = (np.clip(pcm, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(samples.tobytes())
+    return buffer.getvalue()
 
-    return wav_bytes
+
+# ─────────────────────────────────────────────
+# Async API (awaits the worker pool, never blocks the event loop)
+# ─────────────────────────────────────────────
+
+async def webm_to_wav_async(webm_bytes: bytes) -> bytes:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, _ffmpeg, webm_bytes, ["-f", "wav"])
+
+
+async def decode_pcm_async(audio_bytes: bytes, sr: int = PCM_SAMPLE_RATE) -> np.ndarray:
+    loop = asyncio.get_running_loop()
+    raw = await loop.run_in_executor(
+        _pool, _ffmpeg, audio_bytes, ["-f", "f32le", "-ac", "1", "-ar", str(sr)]
+    )
+    return np.frombuffer(raw, dtype=np.float32)
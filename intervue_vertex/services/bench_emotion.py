@@ -0,0 +1,79 @@
+"""
+bench_emotion.py — Full (pyin) vs fast (shared-STFT) audio features.
+
+Synthesises speech-like clips (harmonic voice with a moving pitch contour,
+syllable-rate amplitude envelope, pauses and background noise), runs both
+extractors and reports the speedup and per-feature deviation against the
+tolerances documented in emotion.py.
+
+Run from intervue_vertex/:
+    python -m services.bench_emotion            # 5 s, 15 s, 30 s clips
+    python -m services.bench_emotion 60 120     # custom durations
+"""
+import sys
+import time
+import numpy as np
+from services.emotion import audio_emotion_pcm
+
+SR = 48000
+
+TOLERANCE = {"rms": 0.05, "zcr": 0.10, "tempo": 0.10, "pitch": 0.08}
+COMPOSITE_TOLERANCE = 0.05
+
+
+def synth_speech(seconds: float, f0: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SR)) / SR
+
+    contour = f0 * (1 + 0.15 * np.sin(2 * np.pi * 0.3 * t) + 0.05 * np.sin(2 * np.pi * 5 * t))
+    phase = 2 * np.pi * np.cumsum(contour) / SR
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    pauses = (np.sin(2 * np.pi * 0.2 * t) > -0.7).astype(float)
+    y = 0.08 * voice * syllables * pauses + 0.003 * rng.standard_normal(len(t))
+    return y.astype(np.float32)
+
+
+def _deviation(name, full, fast):
+    if name == "tempo" and full and fast:
+        # Tempo estimators may land on a different octave of the same beat
+        ratio = fast / full
+        octave = 2.0 ** np.round(np.log2(ratio))
+        return abs(ratio / octave - 1)
+    return abs(fast - full) / full if full else abs(fast)
+
+
+def run(seconds: float, f0: float):
+    y = synth_speech(seconds, f0)
+
+    start = time.perf_counter()
+    full = audio_emotion_pcm(y, SR)
+    full_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast = audio_emotion_pcm(y, SR, fast=True)
+    fast_s = time.perf_counter() - start
+
+    print(f"\n{seconds:>5.0f} s clip, f0≈{f0:.0f} Hz   full {full_s:7.3f} s   "
+          f"fast {fast_s:6.3f} s   speedup ×{full_s / fast_s:5.1f}")
+
+    ok = True
+    for name, tol in TOLERANCE.items():
+        a, b = full["features"][name], fast["features"][name]
+        dev = _deviation(name, a, b)
+        flag = "ok" if dev <= tol else "OUT"
+        ok &= dev <= tol
+        print(f"   {name:<6} full {a:>10.5f}   fast {b:>10.5f}   Δ {dev:6.1%}  (±{tol:.0%}) {flag}")
+
+    d = abs(full["score"] - fast["score"])
+    ok &= d <= COMPOSITE_TOLERANCE
+    print(f"   composite full {full['score']:.2f} fast {fast['score']:.2f} Δ {d:.2f}   "
+          f"emotion {full['emotion']} / {fast['emotion']}")
+    return ok
+
+
+if __name__ == "__main__":
+    durations = [float(a) for a in sys.argv[1:]] or [5, 15, 30]
+    results = [run(d, f0) for d in durations for f0 in (120, 210)]
+    print("\nall within tolerance" if all(results) else "\nSOME FEATURES OUT OF TOLERANCE")
@@ -1,10 +1,57 @@
+"""
+camera.py — Webcam frame metrics (face, eye contact, stillness).
+
+Each session gets a CameraAnalyzer that keeps state between frames:
+  • frames are downscaled to CAMERA_WIDTH before any CV work
+  • the Haar face detector runs every CAMERA_DETECT_EVERY frames (or when
+    tracking is lost); in between the face ROI is tracked by template
+    matching in a small search window around its last position
+  • eyes are searched only in the upper part of the face ROI
+  • stillness comes from motion inside the ROI between consecutive frames
+    (pixel change of the face patch plus displacement of the face box)
+
+All OpenCV work runs on a CAMERA_WORKERS thread pool (OpenCV releases the
+GIL), never on the event loop. JPEGs are decoded straight to grayscale.
+
+analyze_camera_batch() takes a burst of frames in one request: decoding
+(the bulk of the per-frame cost) fans out across the pool, then the
+decoded frames go through the tracker in order, since tracking and
+stillness depend on the previous frame.
+
+Every analysed frame is also written to the session's MetricsRing, a
+fixed-size NumPy array of the last CAMERA_RING_FRAMES frames, so memory per
+session is constant. take_answer_metrics() reduces the frames seen since
+the previous answer to means, percentiles and the no-face fraction.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-import os
 from fastapi import UploadFile
 
 CAMERA_DIR = "camera_frames"
 
+CAMERA_WIDTH        = int(os.getenv("CAMERA_WIDTH", "320"))
+CAMERA_DETECT_EVERY = int(os.getenv("CAMERA_DETECT_EVERY", "10"))
+CAMERA_WORKERS      = int(os.getenv("CAMERA_WORKERS", "4"))
+CAMERA_MAX_SESSIONS = int(os.getenv("CAMERA_MAX_SESSIONS", "1000"))
+CAMERA_RING_FRAMES  = int(os.getenv("CAMERA_RING_FRAMES", "1800"))
+CAMERA_MAX_BATCH    = int(os.getenv("CAMERA_MAX_BATCH", "64"))
+
+_TRACK_MIN_SCORE = 0.6    # template match below this → re-detect
+_PATCH = (48, 48)         # ROI is compared at this size for motion
+_MOTION_FULL = 0.06       # mean pixel change (0–1) that counts as moving
+_SHIFT_FULL = 0.15        # box displacement, in face widths, ditto
+
+_RING_COLUMNS = ("eye_contact", "stillness", "distraction", "face")
+_PERCENTILES = (10, 50, 90)
+
 # Load Haar cascades
 FACE_CASCADE = cv2.CascadeClassifier(
     cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
@@ -13,43 +60,281 @@ EYE_CASCADE = cv2.CascadeClassifier(
     cv2.data.haarcascades + "haarcascade_eye.xml"
 )
 
-async def analyze_camera_frame(frame: UploadFile):
-    data = await frame.read()
+NO_FACE = {
+    "eye_contact": 0.0,
+    "stillness": 0.0,
+    "expression_score": 0.3,
+    "distraction": 1.0,
+    "face": False,
+}
+
+_pool = ThreadPoolExecutor(max_workers=CAMERA_WORKERS, thread_name_prefix="camera")
+
+_analyzers: OrderedDict[str, "CameraAnalyzer"] = OrderedDict()
+_analyzers_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_counters = {"frames": 0, "detections": 0, "tracked": 0, "no_face": 0, "invalid": 0}
+_busy_s = 0.0
+
+
+def _reduce(block: np.ndarray) -> dict:
+    """Aggregate rows of _RING_COLUMNS: means, percentiles, no-face fraction."""
+    means = block.mean(axis=0)
+    pct = np.percentile(block[:, :3], _PERCENTILES, axis=0)
+
+    result = {"frames": len(block), "no_face": round(1.0 - float(means[3]), 2)}
+    for i, name in enumerate(_RING_COLUMNS[:3]):
+        result[name] = round(float(means[i]), 2)
+    result["percentiles"] = {
+        name: {f"p{p}": round(float(pct[j, i]), 2) for j, p in enumerate(_PERCENTILES)}
+        for i, name in enumerate(_RING_COLUMNS[:3])
+    }
+    return result
+
+
+def _row(metrics: dict) -> list[float]:
+    return [float(metrics.get(c, 0.0)) for c in _RING_COLUMNS]
+
+
+class MetricsRing:
+    """Per-frame metrics of the last `capacity` frames, one row per frame."""
+
+    def __init__(self, capacity: int = CAMERA_RING_FRAMES):
+        self.rows = np.zeros((capacity, len(_RING_COLUMNS)), dtype=np.float32)
+        self.written = 0    # frames ever pushed
+        self.mark = 0       # value of `written` at the last take()
+
+    def push(self, metrics: dict):
+        self.rows[self.written % len(self.rows)] = _row(metrics)
+        self.written += 1
+
+    def take(self) -> dict | None:
+        """Aggregate frames pushed since the last take(); None if there are none."""
+        n = min(self.written - self.mark, len(self.rows))
+        self.mark = self.written
+        if n == 0:
+            return None
+
+        return _reduce(self.rows[np.arange(self.written - n, self.written) % len(self.rows)])
+
+
+class CameraAnalyzer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ring = MetricsRing()
+        self.box = None           # (x, y, w, h) in downscaled pixels
+        self.template = None      # gray face patch at self.box
+        self.patch = None         # blurred _PATCH-sized ROI for motion
+        self.since_detect = 0
 
-    np_img = np.frombuffer(data, np.uint8)
-    img = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
+    def _detect(self, gray):
+        min_side = max(24, gray.shape[1] // 10)
+        faces = FACE_CASCADE.detectMultiScale(gray, 1.2, 5, minSize=(min_side, min_side))
+        if len(faces) == 0:
+            return None
+        # Largest face is the candidate
+        return tuple(int(v) for v in max(faces, key=lambda f: f[2] * f[3]))
 
-    if img is None:
-        return {"error": "Invalid image"}
+    def _track(self, gray):
+        x, y, w, h = self.box
+        H, W = gray.shape
+        mx, my = w // 2, h // 2
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(W, x + w + mx), min(H, y + h + my)
+        region = gray[y0:y1, x0:x1]
+        if region.shape[0] < h or region.shape[1] < w:
+            return None
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        scores = cv2.matchTemplate(region, self.template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (bx, by) = cv2.minMaxLoc(scores)
+        if best < _TRACK_MIN_SCORE:
+            return None
+        return (x0 + bx, y0 + by, w, h)
 
-    faces = FACE_CASCADE.detectMultiScale(gray, 1.3, 5)
+    def _stillness(self, box, roi) -> float:
+        patch = cv2.GaussianBlur(cv2.resize(roi, _PATCH), (5, 5), 0)
+        prev_patch, prev_box, self.patch = self.patch, self.box, patch
+        if prev_patch is None or prev_box is None:
+            return 1.0  # nothing to compare against yet
+
+        change = float(np.mean(cv2.absdiff(patch, prev_patch))) / 255.0
+        shift = np.hypot(
+            (box[0] + box[2] / 2) - (prev_box[0] + prev_box[2] / 2),
+            (box[1] + box[3] / 2) - (prev_box[1] + prev_box[3] / 2),
+        ) / max(box[2], 1)
+        motion = max(change / _MOTION_FULL, shift / _SHIFT_FULL)
+        return float(np.clip(1.0 - motion, 0.0, 1.0))
+
+    def analyze(self, gray) -> dict:
+        """Metrics for one frame from _decode(); updates tracking state and ring."""
+        with self.lock:
+            metrics = self._analyze(gray)
+            self.ring.push(metrics)
+            return metrics
+
+    def analyze_sequence(self, grays: list) -> list[dict]:
+        """analyze() over consecutive frames; None entries are invalid images."""
+        with self.lock:
+            results = []
+            for gray in grays:
+                if gray is None:
+                    _count("invalid")
+                    results.append({"error": "Invalid image"})
+                    continue
+                metrics = self._analyze(gray)
+                self.ring.push(metrics)
+                results.append(metrics)
+            return results
+
+    def take(self) -> dict | None:
+        with self.lock:
+            return self.ring.take()
+
+    def _analyze(self, gray) -> dict:
+        box = None
+        tracked = False
+        if self.box is not None and self.since_detect < CAMERA_DETECT_EVERY:
+            box = self._track(gray)
+            tracked = box is not None
+        if box is None:
+            box = self._detect(gray)
+            self.since_detect = 0
+            _count("detections")
+        else:
+            self.since_detect += 1
+            _count("tracked")
+
+        if box is None:
+            self.box = self.template = self.patch = None
+            _count("no_face")
+            return dict(NO_FACE)
+
+        x, y, bw, bh = box
+        roi = gray[y:y + bh, x:x + bw]
+        stillness = self._stillness(box, roi)
+        self.box, self.template = box, roi.copy()
+
+        # Eyes sit in the upper ~60 % of a frontal face
+        upper = roi[: int(bh * 0.6)]
+        min_eye = max(8, bw // 8)
+        eyes = EYE_CASCADE.detectMultiScale(upper, 1.1, 4, minSize=(min_eye, min_eye))
+
+        # 🎯 Metrics
+        eye_contact = 1.0 if len(eyes) >= 1 else 0.3
+        distraction = 0.0 if len(eyes) >= 1 else 0.5
 
-    if len(faces) == 0:
         return {
-            "eye_contact": 0.0,
-            "stillness": 0.0,
-            "expression_score": 0.3,
-            "distraction": 1.0
+            "eye_contact": round(eye_contact, 2),
+            "stillness": round(stillness, 2),
+            "distraction": round(distraction, 2),
+            "face": True,
+            "tracked": tracked,
         }
 
-    (x, y, w, h) = faces[0]
-    face_roi = gray[y:y+h, x:x+w]
 
-    eyes = EYE_CASCADE.detectMultiScale(face_roi)
+def _count(key: str):
+    with _stats_lock:
+        _counters[key] += 1
+
+
+def get_analyzer(session_id: str | None) -> CameraAnalyzer:
+    """Per-session analyzer (LRU-bounded); a fresh one when there is no session."""
+    if not session_id:
+        return CameraAnalyzer()
+    with _analyzers_lock:
+        analyzer = _analyzers.get(session_id)
+        if analyzer is None:
+            analyzer = _analyzers[session_id] = CameraAnalyzer()
+        _analyzers.move_to_end(session_id)
+        while len(_analyzers) > CAMERA_MAX_SESSIONS:
+            _analyzers.popitem(last=False)
+        return analyzer
+
+
+def take_answer_metrics(session_id: str) -> dict | None:
+    """
+    Camera aggregate for the frames seen since the previous answer:
+    {"frames", "no_face", "eye_contact", "stillness", "distraction",
+     "percentiles": {metric: {"p10", "p50", "p90"}}}, or None without frames.
+    """
+    with _analyzers_lock:
+        analyzer = _analyzers.get(session_id)
+    return analyzer.take() if analyzer else None
+
 
-    # 🎯 Metrics
-    eye_contact = 1.0 if len(eyes) >= 1 else 0.3
-    stillness = 0.8   # (phase 2: motion tracking)
-    distraction = 0.0 if len(eyes) >= 1 else 0.5
+def _timed(fn, *args, frames: int = 0):
+    global _busy_s
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        with _stats_lock:
+            _counters["frames"] += frames
+            _busy_s += time.perf_counter() - started
 
-    metrics = {
-        "eye_contact": round(eye_contact, 2),
-        "stillness": round(stillness, 2),
-        "distraction": round(distraction, 2)
+
+def _decode(data: bytes):
+    """Encoded frame → grayscale, at most CAMERA_WIDTH wide; None if invalid."""
+    gray = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    h, w = gray.shape
+    if w > CAMERA_WIDTH:
+        gray = cv2.resize(gray, (CAMERA_WIDTH, round(h * CAMERA_WIDTH / w)),
+                          interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def analyze_frame_bytes(data: bytes, session_id: str | None = None) -> dict:
+    """Decode + analyse one encoded frame (blocking; call from a worker thread)."""
+    def run():
+        gray = _decode(data)
+        if gray is None:
+            _count("invalid")
+            return {"error": "Invalid image"}
+        return get_analyzer(session_id).analyze(gray)
+
+    return _timed(run, frames=1)
+
+
+async def analyze_camera_frame(frame: UploadFile, session_id: str | None = None):
+    data = await frame.read()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, analyze_frame_bytes, data, session_id)
+
+
+async def analyze_camera_batch(frames: list[UploadFile], session_id: str | None = None) -> dict:
+    """
+    Analyse a burst of frames (in capture order) from one request.
+    Returns {"frames": [per-frame metrics], "aggregate": {...} | None},
+    the aggregate having the same shape as take_answer_metrics().
+    """
+    datas = [await frame.read() for frame in frames]
+    loop = asyncio.get_running_loop()
+
+    grays = await asyncio.gather(*(
+        loop.run_in_executor(_pool, _timed, _decode, data) for data in datas
+    ))
+    analyzer = get_analyzer(session_id)
+    results = await loop.run_in_executor(
+        _pool, partial(_timed, analyzer.analyze_sequence, grays, frames=len(grays))
+    )
+
+    valid = [r for r in results if "error" not in r]
+    return {
+        "frames": results,
+        "aggregate": _reduce(np.array([_row(r) for r in valid], dtype=np.float32))
+        if valid else None,
     }
-    print("STATE:", metrics)
 
 
-    return metrics
+def stats() -> dict:
+    with _stats_lock:
+        frames = _counters["frames"]
+        return {
+            "workers": CAMERA_WORKERS,
+            "sessions": len(_analyzers),
+            **_counters,
+            "avg_frame_ms": round(1000 * _busy_s / frames, 2) if frames else 0.0,
+        }
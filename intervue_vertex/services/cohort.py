@@ -0,0 +1,275 @@
+"""
+cohort.py — Batch analytics over many interview sessions.
+
+Sessions are flattened once into a TurnTable: one NumPy column per field,
+one row per candidate answer. Everything after that is vectorized over all
+turns at once:
+
+  • confidence()       — scoring.compute_confidence on every turn
+  • normalized score   — evaluation score / 10 (NaN when not scored)
+  • session_summary()  — per-session mean score / confidence, percentile
+                         rank of each candidate within its skill cohort
+  • skill_distributions(), correlation() — cohort-level numbers
+
+Results export as CSV or as a columnar .npz file (one array per column).
+
+    python -m services.cohort --out reports/cohort     # live sessions (store / WAL)
+    python -m services.cohort sessions.jsonl --out reports/cohort
+"""
+
+import os
+import csv
+import json
+import argparse
+import numpy as np
+from services import scoring
+
+_SCORE_BINS = np.linspace(-0.05, 1.05, 12)   # one bin per 0–10 score
+
+
+class TurnTable:
+    """Columnar view of the candidate turns of many sessions."""
+
+    def __init__(self, sessions):
+        """sessions: iterable of (session_id, session dict)."""
+        sessions = list(sessions)
+        n = sum(
+            1 for _, s in sessions
+            for m in s.get("messages", []) if m.get("role") == "candidate"
+        )
+
+        self.session_ids = np.array([sid for sid, _ in sessions], dtype=object)
+        skills = sorted({s.get("skill") or "unknown" for _, s in sessions})
+        self.skills = np.array(skills, dtype=object)
+        skill_code = {k: i for i, k in enumerate(skills)}
+        self.session_skill = np.array(
+            [skill_code[s.get("skill") or "unknown"] for _, s in sessions], dtype=np.int32
+        )
+
+        self.session = np.empty(n, dtype=np.int32)
+        self.turn = np.empty(n, dtype=np.int32)
+        self.score = np.full(n, np.nan, dtype=np.float64)
+        self.eye = np.zeros(n, dtype=np.float64)
+        self.still = np.zeros(n, dtype=np.float64)
+        self.smile = np.zeros(n, dtype=np.float64)
+        self.distraction = np.zeros(n, dtype=np.float64)
+        self.vocal = np.zeros(n, dtype=np.float64)
+        self.textual = np.zeros(n, dtype=np.float64)
+
+        row = 0
+        for i, (_, s) in enumerate(sessions):
+            turn = 0
+            for m in s.get("messages", []):
+                if m.get("role") != "candidate":
+                    continue
+                cam = m.get("camera_metrics") or {}
+                score = (m.get("evaluation") or {}).get("score")
+
+                self.session[row] = i
+                self.turn[row] = turn
+                if isinstance(score, (int, float)):
+                    self.score[row] = score
+                self.eye[row] = cam.get("eye_contact", 0)
+                self.still[row] = cam.get("stillness", 0)
+                if cam.get("dominant_expression") == "happy":
+                    self.smile[row] = cam.get("expression_score", 0)
+                self.distraction[row] = cam.get("distraction", 0)
+                self.vocal[row] = (m.get("audio_emotion") or {}).get("score", 0)
+                self.textual[row] = scoring.text_weight(m.get("text_emotion"))
+                row += 1
+                turn += 1
+
+    def __len__(self):
+        return len(self.session)
+
+    @property
+    def skill(self) -> np.ndarray:
+        """Skill code of every turn."""
+        return self.session_skill[self.session]
+
+    def normalized_score(self) -> np.ndarray:
+        return self.score / 10  # 0–1, NaN when not scored
+
+    def confidence(self) -> np.ndarray:
+        """
+        scoring.compute_confidence for every turn at once. np.round may land
+        0.01 away from Python's round() on values within float error of a
+        .xx5 tie; everything else is identical.
+        """
+        visual = np.maximum(
+            0.0,
+            (
+                scoring.EYE_WEIGHT * self.eye
+                + scoring.STILL_WEIGHT * self.still
+                + scoring.SMILE_WEIGHT * self.smile
+            ) * (1 - self.distraction),
+        )
+        return np.round(
+            scoring.VISUAL_WEIGHT * visual
+            + scoring.VOCAL_WEIGHT * self.vocal
+            + scoring.TEXTUAL_WEIGHT * self.textual,
+            2,
+        )
+
+
+def _group_mean(values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    ok = ~np.isnan(values)
+    sums = np.bincount(groups[ok], weights=values[ok], minlength=n_groups)
+    counts = np.bincount(groups[ok], minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def _percentile_rank(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """Percent of the same group scoring below (ties count half); NaN stays NaN."""
+    rank = np.full(len(values), np.nan)
+    for g in np.unique(groups):
+        idx = np.nonzero((groups == g) & ~np.isnan(values))[0]
+        if not len(idx):
+            continue
+        ordered = np.sort(values[idx])
+        below = np.searchsorted(ordered, values[idx], side="left")
+        equal = np.searchsorted(ordered, values[idx], side="right") - below
+        rank[idx] = 100.0 * (below + 0.5 * equal) / len(idx)
+    return rank
+
+
+def session_summary(table: TurnTable) -> dict[str, np.ndarray]:
+    """One row per session: mean score / confidence and rank within its skill."""
+    n = len(table.session_ids)
+    avg_score = _group_mean(table.normalized_score(), table.session, n)
+    avg_conf = _group_mean(table.confidence(), table.session, n)
+    return {
+        "session_id": table.session_ids,
+        "skill": table.skills[table.session_skill] if n else table.skills,
+        "turns": np.bincount(table.session, minlength=n),
+        "avg_score": np.round(avg_score, 3),
+        "confidence": np.round(avg_conf, 3),
+        "skill_percentile": np.round(_percentile_rank(avg_score, table.session_skill), 1),
+    }
+
+
+def skill_distributions(table: TurnTable) -> dict[str, dict]:
+    """Per skill: normalized-score histogram (one bin per 0–10 score) and quartiles."""
+    scores = table.normalized_score()
+    skill = table.skill
+    result = {}
+    for code, name in enumerate(table.skills):
+        values = scores[(skill == code) & ~np.isnan(scores)]
+        if not len(values):
+            continue
+        p25, p50, p75 = np.percentile(values, [25, 50, 75])
+        result[name] = {
+            "turns": int(len(values)),
+            "mean": round(float(values.mean()), 3),
+            "p25": round(float(p25), 3),
+            "median": round(float(p50), 3),
+            "p75": round(float(p75), 3),
+            "histogram": np.histogram(values, bins=_SCORE_BINS)[0].tolist(),
+        }
+    return result
+
+
+def correlation(table: TurnTable) -> float | None:
+    """Pearson correlation of confidence vs normalized score over scored turns."""
+    scores = table.normalized_score()
+    ok = ~np.isnan(scores)
+    if ok.sum() < 2:
+        return None
+    conf = table.confidence()[ok]
+    if conf.std() == 0 or scores[ok].std() == 0:
+        return None
+    return round(float(np.corrcoef(conf, scores[ok])[0, 1]), 3)
+
+
+def turn_columns(table: TurnTable) -> dict[str, np.ndarray]:
+    return {
+        "session_id": table.session_ids[table.session] if len(table) else table.session_ids,
+        "skill": table.skills[table.skill] if len(table) else table.skills,
+        "turn": table.turn,
+        "score": table.normalized_score(),
+        "confidence": table.confidence(),
+        "eye_contact": table.eye,
+        "stillness": table.still,
+        "distraction": table.distraction,
+        "vocal": table.vocal,
+        "textual": table.textual,
+    }
+
+
+# ─────────────────────────────────────────────
+# Export
+# ─────────────────────────────────────────────
+
+def to_csv(columns: dict[str, np.ndarray], path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(zip(*(col.tolist() for col in columns.values())))
+
+
+def to_npz(columns: dict[str, np.ndarray], path: str):
+    # Object (string) columns are stored as fixed-width unicode
+    np.savez_compressed(path, **{
+        name: col.astype(str) if col.dtype == object else col
+        for name, col in columns.items()
+    })
+
+
+def export(table: TurnTable, out_prefix: str, fmt: str = "csv") -> list[str]:
+    """Write <prefix>_turns, <prefix>_sessions and <prefix>_cohort.json."""
+    write = to_csv if fmt == "csv" else to_npz
+    paths = []
+    for name, columns in (("turns", turn_columns(table)), ("sessions", session_summary(table))):
+        path = f"{out_prefix}_{name}.{fmt}"
+        write(columns, path)
+        paths.append(path)
+
+    path = f"{out_prefix}_cohort.json"
+    with open(path, "w") as f:
+        json.dump({
+            "sessions": len(table.session_ids),
+            "turns": len(table),
+            "confidence_score_correlation": correlation(table),
+            "skills": skill_distributions(table),
+        }, f, indent=2)
+    paths.append(path)
+    return paths
+
+
+def _load_jsonl(path: str):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record.get("session_id"), record.get("session", record)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cohort analytics export")
+    parser.add_argument("source", nargs="?",
+                        help="JSONL of sessions (default: the configured session store)")
+    parser.add_argument("--out", default="cohort", help="output path prefix")
+    parser.add_argument("--format", choices=["csv", "npz"], default="csv")
+    args = parser.parse_args()
+
+    if args.source:
+        sessions = _load_jsonl(args.source)
+    else:
+        # The memory store lives in the app process; read its write-ahead
+        # log instead, exactly as startup recovery does (without writing)
+        from services import session_manager
+        from services.session_store import MemoryStore
+        if not isinstance(session_manager.store, MemoryStore):
+            sessions = session_manager.store.items()
+        elif session_manager.wal:
+            sessions = session_manager.logged_sessions()
+        else:
+            parser.error("SESSION_STORE=memory with SESSION_WAL=0 keeps sessions only "
+                         "inside the app; pass a JSONL source")
+
+    out_dir = os.path.dirname(args.out)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    for p in export(TurnTable(sessions), args.out, args.format):
+        print(p)
@@ -0,0 +1,118 @@
+"""
+conversation_memory.py — Constant-size interview history for prompts.
+
+The last MEMORY_RECENT_MESSAGES messages are kept verbatim (each clipped to
+MEMORY_MESSAGE_CHARS). Older messages are folded, in the background, into a
+running summary that is rewritten incrementally (old summary + newly aged
+messages → new summary) and held under MEMORY_SUMMARY_TOKENS. The result is
+stored in the session as "memory": {"summary", "folded"}, where "folded" is
+the number of leading messages already in the summary.
+
+render() therefore returns a block whose size does not grow with the length
+of the interview, however many turns it runs.
+"""
+
+import os
+import asyncio
+from services.ai_fallback import ai_generate_async, TEXT_FALLBACK
+from services.session_manager import get_session_async, update_session_async
+
+RECENT_MESSAGES = int(os.getenv("MEMORY_RECENT_MESSAGES", "6"))
+MESSAGE_CHARS   = int(os.getenv("MEMORY_MESSAGE_CHARS", "600"))
+SUMMARY_TOKENS  = int(os.getenv("MEMORY_SUMMARY_TOKENS", "250"))
+
+# Rough English average; good enough for budgeting without a tokenizer
+_CHARS_PER_TOKEN = 4
+
+_folding: dict[str, asyncio.Task] = {}
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def _line(message: dict) -> str:
+    who = "Interviewer" if message.get("role") == "interviewer" else "Candidate"
+    return f"{who}: {_clip(message.get('text', ''), MESSAGE_CHARS)}"
+
+
+def render(session: dict, upto: int | None = None) -> str:
+    """
+    Summary of older turns plus the most recent messages, verbatim.
+    `upto` renders the history as it was before message index `upto`.
+    """
+    messages = (session.get("messages") or [])[:upto]
+    memory = session.get("memory") or {}
+    folded = memory.get("folded", 0)
+
+    # Messages waiting for a lagging fold are still shown, up to one extra window
+    start = max(folded, len(messages) - 2 * RECENT_MESSAGES)
+    recent = "\n".join(_line(m) for m in messages[start:])
+
+    parts = []
+    if memory.get("summary"):
+        parts.append(f"Summary of earlier interview:\n{memory['summary']}")
+    if recent:
+        parts.append(f"Recent conversation:\n{recent}")
+    return "\n\n".join(parts) or "Interview just started."
+
+
+async def _fold(session_id: str):
+    session = await get_session_async(session_id)
+    if not session:
+        return
+
+    messages = session.get("messages") or []
+    memory = session.get("memory") or {"summary": "", "folded": 0}
+    upto = len(messages) - RECENT_MESSAGES
+    if upto <= memory["folded"]:
+        return
+
+    aged = "\n".join(_line(m) for m in messages[memory["folded"]:upto])
+    budget_words = int(SUMMARY_TOKENS * _CHARS_PER_TOKEN / 6)
+    summary = await ai_generate_async(
+        f"""
+Current summary of the interview so far:
+{memory["summary"] or "(empty)"}
+
+New conversation to add:
+{aged}
+
+Rewrite the summary to include the new conversation.
+Keep topics covered, how well the candidate answered, and open threads.
+At most {budget_words} words. Plain text only.
+""",
+        system="You maintain concise running notes of a technical interview.",
+    )
+
+    if summary == TEXT_FALLBACK:
+        return  # providers down; retry on the next answer
+
+    await update_session_async(session_id, memory={
+        "summary": _clip(summary, SUMMARY_TOKENS * _CHARS_PER_TOKEN),
+        "folded": upto,
+    })
+
+
+def schedule_fold(session_id: str, session: dict):
+    """Fold aged messages into the summary in the background, if needed."""
+    messages = session.get("messages") or []
+    folded = (session.get("memory") or {}).get("folded", 0)
+    if len(messages) - RECENT_MESSAGES <= folded:
+        return
+
+    running = _folding.get(session_id)
+    if running and not running.done():
+        return  # the next answer picks up whatever this one leaves
+
+    task = asyncio.create_task(_fold(session_id))
+    _folding[session_id] = task
+
+    def done(t):
+        if _folding.get(session_id) is t:
+            del _folding[session_id]
+        if not t.cancelled() and t.exception():
+            print(f"[Memory] Fold failed for {session_id}: {t.exception()!r}")
+
+    task.add_done_callback(done)
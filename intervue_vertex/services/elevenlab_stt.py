@@ -1,17 +1,16 @@
 import os
+import numpy as np
 from elevenlabs.client import ElevenLabs
-from services.audio_utils import webm_to_wav
+from services.audio_utils import webm_to_wav, pcm_to_wav, PCM_SAMPLE_RATE
 
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
 
 
-def speech_to_text(audio_bytes: bytes) -> str:
+def transcribe_wav(wav_bytes: bytes) -> str:
     try:
-        wav_bytes = webm_to_wav(audio_bytes)
-
         result = client.speech_to_text.convert(
-            file=("audio.wav",wav_bytes),
+            file=("audio.wav", wav_bytes),
             model_id="scribe_v1",
         )
 
@@ -20,3 +19,17 @@ def speech_to_text(audio_bytes: bytes) -> str:
     except Exception as e:
         print("ElevenLabs STT failed:", e)
         return ""
+
+
+def speech_to_text(audio_bytes: bytes) -> str:
+    try:
+        wav_bytes = webm_to_wav(audio_bytes)
+    except Exception as e:
+        print("ElevenLabs STT failed:", e)
+        return ""
+    return transcribe_wav(wav_bytes)
+
+
+def speech_to_text_pcm(pcm: np.ndarray, sr: int = PCM_SAMPLE_RATE) -> str:
+    """Transcribe already-decoded PCM (shares the decode with audio emotion)."""
+    return transcribe_wav(pcm_to_wav(pcm, sr))
@@ -1,47 +1,30 @@
 import os
 import requests
-from io import BytesIO
-from fastapi.responses import StreamingResponse
-
-ELEVEN_API_KEY = os.getenv("ELEVENLABS_API_KEY")
-VOICE_ID = "EXAVITQu4vr4xnSDxMaL"  # Rachel
-
-def text_to_speech(text: str):
-    if not ELEVEN_API_KEY:
-        raise Exception("ELEVENLABS_API_KEY not loaded")
-
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}"
-
-    headers = {
-        "xi-api-key": ELEVEN_API_KEY,
-        "Content-Type": "application/json"
-    }
-
-    payload = {
-        "text": text,
-        "voice_settings": {
-            "stability": 0.5,
-            "similarity_boost": 0.7
-        }
-    }
-
-    response = requests.post(url, json=payload, headers=headers)
-
-    if response.status_code != 200:
-        raise Exception(response.text)
-
-    audio = BytesIO(response.content)
-    audio.seek(0)
-
-    return StreamingResponse(audio, media_type="audio/mpeg")
-
-import os
-import requests
+from services import tts_cache
 
 ELEVEN_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 VOICE_ID = "EXAVITQu4vr4xnSDxMaL"
-
-def stream_tts(text: str):
+MODEL_ID = "eleven_multilingual_v2"
+VOICE_SETTINGS = {
+    "stability": 0.4,
+    "similarity_boost": 0.7
+}
+# (connect, read) seconds; read bounds every gap between streamed chunks too
+TIMEOUT = (
+    float(os.getenv("TTS_CONNECT_TIMEOUT", "3")),
+    float(os.getenv("TTS_READ_TIMEOUT", "15")),
+)
+
+
+class TTSUnavailable(Exception):
+    """ElevenLabs refused or failed the request before any audio was sent."""
+
+
+def _open_upstream(text: str) -> requests.Response:
+    """
+    Start the upstream request and check its status eagerly, so a failure
+    surfaces before the caller commits a 200 audio response.
+    """
     url = f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}/stream"
 
     headers = {
@@ -52,15 +35,49 @@ def stream_tts(text: str):
 
     payload = {
         "text": text,
-        "model_id": "eleven_multilingual_v2",
-        "voice_settings": {
-            "stability": 0.4,
-            "similarity_boost": 0.7
-        }
+        "model_id": MODEL_ID,
+        "voice_settings": VOICE_SETTINGS
     }
 
-    response = requests.post(url, json=payload, headers=headers, stream=True)
+    try:
+        response = requests.post(url, json=payload, headers=headers, stream=True, timeout=TIMEOUT)
+    except requests.RequestException as e:
+        raise TTSUnavailable(f"ElevenLabs unreachable: {e}") from e
+
+    if response.status_code != 200:
+        detail = response.text[:200]
+        response.close()
+        print("ElevenLabs TTS failed:", response.status_code, detail)
+        raise TTSUnavailable(f"ElevenLabs returned {response.status_code}")
+    return response
+
+
+def _stream_upstream(response: requests.Response, writer: tts_cache.Writer):
+    try:
+        for chunk in response.iter_content(chunk_size=4096):
+            if chunk:
+                writer.append(chunk)
+                yield chunk
+    finally:
+        response.close()
+
+    # Only reached when the whole clip was streamed (client did not drop)
+    writer.commit()
+
+
+def open_tts(text: str):
+    """
+    Returns (chunk iterator, cache_hit). Hits come from the TTS cache;
+    misses stream from ElevenLabs and are written through to the cache.
+    Raises TTSUnavailable if ElevenLabs fails before sending audio.
+    """
+    key = tts_cache.cache_key(VOICE_ID, MODEL_ID, VOICE_SETTINGS, text)
+    cached = tts_cache.get(key)
+    if cached is not None:
+        return cached, True
+    return _stream_upstream(_open_upstream(text), tts_cache.Writer(key)), False
+
 
-    for chunk in response.iter_content(chunk_size=4096):
-        if chunk:
-            yield chunk
+def stream_tts(text: str):
+    chunks, _ = open_tts(text)
+    yield from chunks
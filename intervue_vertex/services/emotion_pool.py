@@ -0,0 +1,288 @@
+"""
+emotion_pool.py — Audio emotion analysis on a warm process pool.
+
+Feature extraction is CPU-bound NumPy/librosa work that holds the GIL, so it
+runs in EMOTION_WORKERS separate processes. The pool is started and warmed
+(librosa imported, one dummy clip analysed) at app startup so the first
+answer does not pay the import cost.
+
+Audio is decoded once to 16 kHz PCM through audio_utils' ffmpeg pool and
+only the PCM crosses into the worker, which runs the fast shared-STFT path
+of emotion.audio_emotion_pcm.
+
+At most EMOTION_WORKERS jobs are handed to the pool at once; the rest wait
+here, at most EMOTION_QUEUE of them, after which analyze() raises
+EmotionBusy. Each job gets an EMOTION_TIMEOUT_S deadline from the moment it
+is handed over, so a busy pool is not mistaken for a stuck one. A worker
+process cannot be interrupted, so on timeout the pool is shut down and
+replaced with a fresh one; the caller gets the neutral result, and so does
+any other job the old pool drops.
+
+Workers run emotion.pool_analyze, so they import only services.emotion.
+If the pool cannot be started (warm() fails, e.g. no spawn support in the
+sandbox), analysis falls back to a thread in this process.
+"""
+
+import os
+import math
+import time
+import asyncio
+import weakref
+import threading
+import multiprocessing
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from services.audio_utils import PCM_SAMPLE_RATE, decode_pcm_async
+from services.emotion import pool_analyze, pool_warmup
+from services.session_manager import update_message_async
+
+EMOTION_WORKERS   = int(os.getenv("EMOTION_WORKERS", "2"))
+EMOTION_QUEUE     = int(os.getenv("EMOTION_QUEUE", "8"))
+EMOTION_TIMEOUT_S = float(os.getenv("EMOTION_TIMEOUT_S", "20"))
+EMOTION_PARKED_MAX = int(os.getenv("EMOTION_PARKED_MAX", "256"))
+
+NEUTRAL = {"emotion": "neutral", "score": 0.5}
+
+_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+_in_process = False   # set when the pool could not be started
+_pending = 0
+_counters = {"submitted": 0, "rejected": 0, "completed": 0,
+             "failed": 0, "timed_out": 0, "cancelled": 0, "recycled": 0}
+_services = deque(maxlen=200)
+_attaching: set[asyncio.Task] = set()
+_answer_jobs: OrderedDict[str, asyncio.Task] = OrderedDict()
+_gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class EmotionBusy(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Emotion queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+# ─────────────────────────────────────────────
+# Pool lifecycle
+# ─────────────────────────────────────────────
+
+def _new_pool() -> ProcessPoolExecutor:
+    # spawn: the app process runs threads (AI engine loop, ffmpeg pool)
+    # and forking a threaded process is unsafe
+    return ProcessPoolExecutor(
+        max_workers=EMOTION_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = _new_pool()
+        return _pool
+
+
+def warm():
+    """
+    Start every worker process and pre-import librosa in it (blocking).
+    Never raises: if the pool cannot start, analysis runs in-process.
+    """
+    global _in_process
+    try:
+        pool = _get_pool()
+        for f in [pool.submit(pool_warmup, PCM_SAMPLE_RATE) for _ in range(EMOTION_WORKERS)]:
+            f.result(timeout=EMOTION_TIMEOUT_S * 3)
+    except Exception as e:
+        print(f"[Emotion] Process pool unavailable ({e!r}); analysing in-process")
+        close()
+        _in_process = True
+
+
+def _recycle(stuck: ProcessPoolExecutor):
+    """Replace a pool whose worker overran its deadline."""
+    global _pool
+    with _lock:
+        if _pool is not stuck:
+            return  # another timeout already replaced it
+        _pool = _new_pool()
+        _counters["recycled"] += 1
+        fresh = _pool
+
+    # Re-warm in the background so the next job does not pay the spawn
+    for _ in range(EMOTION_WORKERS):
+        fresh.submit(pool_warmup, PCM_SAMPLE_RATE)
+
+    # The stuck worker exits once its job returns; Python 3.14+ can end it now
+    kill = getattr(stuck, "kill_workers", None)
+    if kill:
+        kill()
+    stuck.shutdown(wait=False, cancel_futures=True)
+
+
+def close():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ─────────────────────────────────────────────
+# Jobs
+# ─────────────────────────────────────────────
+
+def _gate() -> asyncio.Semaphore:
+    """One slot per worker, per event loop (a Semaphore is bound to its loop)."""
+    loop = asyncio.get_running_loop()
+    gate = _gates.get(loop)
+    if gate is None:
+        gate = _gates[loop] = asyncio.Semaphore(EMOTION_WORKERS)
+    return gate
+
+
+def _retry_after() -> int:
+    service = sum(_services) / len(_services) if _services else 2.0
+    return max(1, math.ceil(service * _pending / EMOTION_WORKERS))
+
+
+async def analyze(audio_bytes: bytes) -> dict:
+    """
+    Audio emotion for an uploaded clip (any ffmpeg-readable format).
+    Raises EmotionBusy if the queue is full; any other failure, including
+    a timeout, returns the neutral result with "features": {"error": ...}.
+    """
+    return await _job(audio_bytes)
+
+
+async def analyze_pcm(pcm: np.ndarray) -> dict:
+    """analyze() for PCM already decoded at PCM_SAMPLE_RATE (e.g. by /stt/live)."""
+    return await _job(pcm)
+
+
+async def _job(audio: bytes | np.ndarray) -> dict:
+    global _pending
+    with _lock:
+        if _pending >= EMOTION_WORKERS + EMOTION_QUEUE:
+            _counters["rejected"] += 1
+            raise EmotionBusy(_retry_after())
+        _pending += 1
+        _counters["submitted"] += 1
+
+    started = time.monotonic()
+    outcome = "failed"
+    try:
+        pcm = await decode_pcm_async(audio) if isinstance(audio, bytes) else audio
+        # Queue here rather than in the pool, so the deadline below only
+        # covers the analysis itself
+        async with _gate():
+            pool = None if _in_process else _get_pool()
+            future = (
+                asyncio.to_thread(pool_analyze, pcm, PCM_SAMPLE_RATE) if pool is None
+                else asyncio.wrap_future(pool.submit(pool_analyze, pcm, PCM_SAMPLE_RATE))
+            )
+            try:
+                result = await asyncio.wait_for(future, EMOTION_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                outcome = "timed_out"
+                if pool:
+                    _recycle(pool)
+                return {**NEUTRAL, "features": {"error": f"timed out after {EMOTION_TIMEOUT_S}s"}}
+        outcome = "completed"
+        return result
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            outcome = "cancelled"
+            raise
+        # The pool cancelled our job while being recycled; the caller is live
+        return {**NEUTRAL, "features": {"error": "emotion pool was recycled"}}
+    except Exception as e:
+        return {**NEUTRAL, "features": {"error": str(e)}}
+    finally:
+        with _lock:
+            _pending -= 1
+            _counters[outcome] += 1
+            if outcome == "completed":
+                _services.append(time.monotonic() - started)
+
+
+def _attach(session_id: str, message_index: int, job):
+    async def run():
+        try:
+            result = await job
+        except EmotionBusy:
+            print(f"[Emotion] Queue full, skipped audio for {session_id}")
+            return
+        except asyncio.CancelledError:
+            return
+        await update_message_async(session_id, message_index, audio_emotion=result)
+
+    task = asyncio.create_task(run())
+    _attaching.add(task)
+    task.add_done_callback(_attaching.discard)
+
+
+def schedule_attach(session_id: str, message_index: int, audio_bytes: bytes):
+    """
+    Analyse an uploaded clip in the background and store the result as the
+    "audio_emotion" of message `message_index` once it completes.
+    """
+    _attach(session_id, message_index, analyze(audio_bytes))
+
+
+# ── answers transcribed by /stt/live ──────────
+# /stt/live has already decoded the answer to PCM, so the emotion job is
+# started right there, alongside the transcription, and parked under the
+# session id. /answer then only attaches it to the candidate message: the
+# clip is neither uploaded nor decoded a second time. Per process, so a
+# job started on another worker is simply not found.
+
+def start_for_answer(session_id: str, pcm: np.ndarray):
+    """Start analysing the next answer of `session_id` from decoded PCM."""
+    discard_answer(session_id)  # superseded (e.g. a re-recorded answer)
+    task = asyncio.create_task(analyze_pcm(pcm))
+    task.add_done_callback(_retrieve)
+    _answer_jobs[session_id] = task
+    while len(_answer_jobs) > EMOTION_PARKED_MAX:
+        _, oldest = _answer_jobs.popitem(last=False)
+        oldest.cancel()
+
+
+def discard_answer(session_id: str):
+    task = _answer_jobs.pop(session_id, None)
+    if task:
+        task.cancel()
+
+
+def attach_answer(session_id: str, message_index: int) -> bool:
+    """
+    Store the parked job's result on message `message_index` once it
+    completes. False if no job was started for this session.
+    """
+    task = _answer_jobs.pop(session_id, None)
+    if task is None:
+        return False
+    _attach(session_id, message_index, task)
+    return True
+
+
+def _retrieve(task: asyncio.Task):
+    # Parked jobs may finish (or fail with EmotionBusy) before anyone awaits them
+    if not task.cancelled():
+        task.exception()
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "mode": "in_process" if _in_process else "process_pool",
+            "workers": EMOTION_WORKERS,
+            "queue_limit": EMOTION_QUEUE,
+            "timeout_s": EMOTION_TIMEOUT_S,
+            "pending": _pending,
+            "parked_answers": len(_answer_jobs),
+            **_counters,
+            "avg_service_s": round(sum(_services) / len(_services), 3) if _services else 0.0,
+        }
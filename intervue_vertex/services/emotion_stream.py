@@ -0,0 +1,189 @@
+"""
+emotion_stream.py — Windowed audio emotion for PCM that arrives in chunks.
+
+EmotionStream.feed() takes mono float PCM chunks of any size (resampled to
+16 kHz on the fly with a streaming soxr resampler) and runs the same
+per-frame analysis as the fast path of emotion.audio_emotion_pcm. Every
+EMOTION_HOP_S seconds it emits one point of a time series, scored over the
+last EMOTION_WINDOW_S seconds:
+
+    {"t": seconds, "emotion", "score", "features"}
+
+Memory is O(window) regardless of answer length: the sliding window keeps
+per-frame values only, and the whole-answer aggregate is built from running
+accumulators — RMS / ZCR sums, a pitch histogram (median to within a
+quarter semitone) and an onset autocorrelation over at most
+_TEMPO_LAG_S of lag (the global tempogram). finish() returns that aggregate
+in the same schema as audio_emotion().
+"""
+
+import os
+import math
+from collections import deque
+import numpy as np
+import soxr
+from services.emotion import (
+    FAST_SR, _FAST_FRAME, _FAST_HOP, _FMIN, _FMAX, _frame_features, _score,
+)
+
+WINDOW_S = float(os.getenv("EMOTION_WINDOW_S", "4"))
+HOP_S    = float(os.getenv("EMOTION_HOP_S", "1"))
+
+_TEMPO_LAG_S = 4.0            # longest beat period considered (15 BPM)
+_MAX_BPM = 320.0              # librosa's default max_tempo
+_PITCH_BINS = 241             # quarter-semitone bins over C2..C7
+
+
+def _tempo_from_acf(acf: np.ndarray) -> float:
+    """BPM of the strongest onset periodicity, weighted by a 120 BPM prior
+    (log-normal, one octave wide — the same prior librosa's tempo uses)."""
+    if len(acf) < 2 or acf[0] <= 0:
+        return 0.0
+    lags = np.arange(1, len(acf))
+    bpm = 60.0 * FAST_SR / (_FAST_HOP * lags)
+    prior = np.exp(-0.5 * (np.log2(bpm) - np.log2(120.0)) ** 2)
+    prior[bpm > _MAX_BPM] = 0.0
+    weighted = acf[1:] * prior
+    return float(bpm[np.argmax(weighted)]) if weighted.max() > 0 else 0.0
+
+
+class EmotionStream:
+    def __init__(self, sr: int = FAST_SR, window_s: float = WINDOW_S, hop_s: float = HOP_S):
+        self.resampler = (
+            soxr.ResampleStream(sr, FAST_SR, 1, dtype="float32", quality="MQ")
+            if sr != FAST_SR else None
+        )
+        frames_per_s = FAST_SR / _FAST_HOP
+        self.window = max(1, round(window_s * frames_per_s))
+        self.hop = max(1, round(hop_s * frames_per_s))
+        max_lag = round(_TEMPO_LAG_S * frames_per_s)
+
+        # Centre padding, as in the batch path
+        self.buf = np.zeros(_FAST_FRAME // 2, dtype=np.float32)
+        self.frames = 0
+        self.since_emit = 0
+
+        # Sliding window: per-frame values only
+        self.w_rms = deque(maxlen=self.window)
+        self.w_zcr = deque(maxlen=self.window)
+        self.w_f0 = deque(maxlen=self.window)
+        self.w_onset = deque(maxlen=self.window)
+
+        # Whole-answer running accumulators
+        self.sum_rms = 0.0
+        self.sum_zcr = 0.0
+        self.rms_max = 0.0
+        self.mel_max = 0.0
+        self.prev_db = None
+        self.pitch_edges = np.geomspace(_FMIN, _FMAX, _PITCH_BINS + 1)
+        self.pitch_hist = np.zeros(_PITCH_BINS, dtype=np.int64)
+        self.onset_acf = np.zeros(max_lag + 1)
+        self.onset_hist = np.zeros(max_lag)
+
+    # ── input ───────────────────────────────
+
+    def feed(self, pcm: np.ndarray) -> list[dict]:
+        """Add a chunk; returns the time-series points completed by it."""
+        pcm = np.asarray(pcm, dtype=np.float32)
+        if self.resampler:
+            pcm = self.resampler.resample_chunk(pcm)
+        self.buf = np.concatenate([self.buf, pcm + 1e-8])
+        return self._process()
+
+    def finish(self) -> tuple[list[dict], dict]:
+        """Flush the tail; returns (last points, whole-answer aggregate)."""
+        if self.resampler:
+            self.buf = np.concatenate([self.buf, self.resampler.resample_chunk(
+                np.zeros(0, dtype=np.float32), last=True) + 1e-8])
+        self.buf = np.concatenate([self.buf, np.zeros(_FAST_FRAME // 2, dtype=np.float32)])
+        if self.frames == 0 and len(self.buf) < _FAST_FRAME:
+            self.buf = np.pad(self.buf, (0, _FAST_FRAME - len(self.buf)))
+        points = self._process()
+        if self.since_emit >= self.hop // 2:
+            points.append(self._point())
+        return points, self.aggregate()
+
+    # ── analysis ────────────────────────────
+
+    def _process(self) -> list[dict]:
+        n = (len(self.buf) - _FAST_FRAME) // _FAST_HOP + 1
+        if n <= 0:
+            return []
+        frames = np.lib.stride_tricks.sliding_window_view(
+            self.buf[:(n - 1) * _FAST_HOP + _FAST_FRAME], _FAST_FRAME
+        )[::_FAST_HOP].T
+        self.buf = self.buf[n * _FAST_HOP:]
+
+        frame_rms = np.sqrt(np.mean(frames ** 2, axis=0))
+        self.rms_max = max(self.rms_max, float(frame_rms.max()))
+        rms, zcr, f0, mel = _frame_features(frames, rms_ref=self.rms_max)
+        onset = self._onsets(mel)
+        self._accumulate(rms, zcr, f0, onset)
+
+        points = []
+        for i in range(n):
+            self.w_rms.append(rms[i])
+            self.w_zcr.append(zcr[i])
+            self.w_f0.append(f0[i])
+            self.w_onset.append(onset[i])
+            self.frames += 1
+            self.since_emit += 1
+            if self.since_emit == self.hop:
+                points.append(self._point())
+        return points
+
+    def _onsets(self, mel: np.ndarray) -> np.ndarray:
+        # dB against the running peak, floored 80 dB below it (top_db)
+        self.mel_max = max(self.mel_max, float(mel.max()))
+        db = 10 * np.log10(np.maximum(mel, max(self.mel_max * 1e-8, 1e-10)))
+        prev = db[:, :1] if self.prev_db is None else self.prev_db
+        self.prev_db = db[:, -1:]
+        return np.maximum(0.0, np.diff(np.hstack([prev, db]), axis=1)).mean(axis=0)
+
+    def _accumulate(self, rms, zcr, f0, onset):
+        self.sum_rms += float(rms.sum())
+        self.sum_zcr += float(zcr.sum())
+
+        voiced = f0[~np.isnan(f0)]
+        if len(voiced):
+            idx = np.searchsorted(self.pitch_edges, voiced) - 1
+            np.add.at(self.pitch_hist, np.clip(idx, 0, _PITCH_BINS - 1), 1)
+
+        # acf[k] += onset[t] * onset[t - k], with the last max_lag values as history
+        full = np.concatenate([self.onset_hist, onset])
+        self.onset_acf += np.correlate(full, onset, mode="valid")[::-1]
+        self.onset_hist = full[-len(self.onset_hist):]
+
+    # ── output ──────────────────────────────
+
+    def _point(self) -> dict:
+        self.since_emit = 0
+        onset = np.fromiter(self.w_onset, dtype=float)
+        acf = np.correlate(onset, onset, mode="full")[len(onset) - 1:]
+        f0 = np.fromiter(self.w_f0, dtype=float)
+        f0 = f0[~np.isnan(f0)]
+        result = _score(
+            float(np.mean(self.w_rms)),
+            float(np.mean(self.w_zcr)),
+            _tempo_from_acf(acf),
+            float(np.median(f0)) if len(f0) else 0.0,
+        )
+        return {"t": round(self.frames * _FAST_HOP / FAST_SR, 2), **result}
+
+    def _pitch_median(self) -> float:
+        total = self.pitch_hist.sum()
+        if not total:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.pitch_hist), total / 2))
+        return math.sqrt(self.pitch_edges[i] * self.pitch_edges[i + 1])
+
+    def aggregate(self) -> dict:
+        """Whole-answer result so far, same schema as audio_emotion()."""
+        if not self.frames:
+            return _score(0.0, 0.0, 0.0, 0.0)
+        return _score(
+            self.sum_rms / self.frames,
+            self.sum_zcr / self.frames,
+            _tempo_from_acf(self.onset_acf),
+            self._pitch_median(),
+        )
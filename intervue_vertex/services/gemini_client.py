@@ -2,13 +2,18 @@
 gemini_client.py — Drop-in replacement using the AI fallback chain.
 Function name kept as gemini_generate() so app.py imports still work.
 """
-from services.ai_fallback import ai_generate
+from services.ai_fallback import ai_generate, ai_generate_async
+
+SYSTEM = (
+    "You are a professional technical interviewer. "
+    "Keep your responses concise and conversational. "
+    "Do not give long paragraphs — use short, natural sentences."
+)
 
 
 def gemini_generate(prompt: str) -> str:
-    system = (
-        "You are a professional technical interviewer. "
-        "Keep your responses concise and conversational. "
-        "Do not give long paragraphs — use short, natural sentences."
-    )
-    return ai_generate(prompt, system=system)
+    return ai_generate(prompt, system=SYSTEM)
+
+
+async def gemini_generate_async(prompt: str, memo: bool = False, critical: bool = False) -> str:
+    return await ai_generate_async(prompt, system=SYSTEM, memo=memo, critical=critical)
@@ -1,8 +1,38 @@
+"""
+github_parser.py — GitHub profile signals for the interview context.
+
+Repos are fetched over a pooled async client. All pages are requested
+concurrently once page 1 reveals the page count (Link header), so users
+with more than 100 repos are no longer truncated.
+
+Profiles are cached per username:
+  • younger than GITHUB_CACHE_TTL_S → served without any request
+  • older → every page is revalidated with If-None-Match; a 304 does not
+    count against the GitHub rate limit and reuses the cached page
+  • GitHub unreachable → the stale profile is served
+
+The returned profile carries "source": "cache" | "revalidated" | "network"
+| "stale" so callers can report where it came from.
+
+Only the fields _summarize reads are kept per cached page, not GitHub's
+full repo objects. The app closes the pooled client on shutdown
+(close_clients).
+"""
+
 import os
-import requests
-from collections import defaultdict
+import re
+import time
+import asyncio
+import weakref
+import threading
+import httpx
+from collections import OrderedDict, defaultdict
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+CACHE_TTL_S = float(os.getenv("GITHUB_CACHE_TTL_S", "900"))
+CACHE_MAX = int(os.getenv("GITHUB_CACHE_MAX", "500"))
+MAX_PAGES = int(os.getenv("GITHUB_MAX_PAGES", "10"))
+PER_PAGE = 100
 
 HEADERS = {
     "Accept": "application/vnd.github.mercy-preview+json"
@@ -17,37 +47,168 @@ IMPORTANT_SKILLS = [
     "django", "flask", "fastapi", "three", "gsap",
 ]
 
-def fetch_github_profile(username: str):
-    try:
-        url = f"https://api.github.com/users/{username}/repos?per_page=100"
-        res = requests.get(url, headers=HEADERS, timeout=10)
+# One pooled client per event loop (clients cannot cross loops)
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = \
+    weakref.WeakKeyDictionary()
+
+# username -> {"pages": {n: (etag, [(fork, language, description), ...])},
+#              "last_page": int, "profile": dict, "fetched_at": float}
+_cache: OrderedDict[str, dict] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            base_url="https://api.github.com",
+            headers=HEADERS,
+            timeout=httpx.Timeout(10, connect=3),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_clients():
+    """Close the pooled client of the running loop (call on app shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client:
+        await client.aclose()
+
+
+def _cache_get(key: str) -> dict | None:
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+        return entry
+
+
+def _cache_put(key: str, entry: dict):
+    with _cache_lock:
+        _cache[key] = entry
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX:
+            _cache.popitem(last=False)
+
+
+def _last_page(link_header: str | None) -> int:
+    if not link_header:
+        return 1
+    m = re.search(r'[?&]page=(\d+)[^>]*>;\s*rel="last"', link_header)
+    return min(int(m.group(1)), MAX_PAGES) if m else 1
+
 
-        if res.status_code != 200:
-            return None
+async def _get_page(username: str, page: int, cached: tuple | None):
+    """Returns (etag, repos, response) — repos reused from cache on 304."""
+    headers = {}
+    if cached and cached[0]:
+        headers["If-None-Match"] = cached[0]
 
-        repos = res.json()
+    res = await _client().get(
+        f"/users/{username}/repos",
+        params={"per_page": PER_PAGE, "page": page},
+        headers=headers,
+    )
+    if res.status_code == 304 and cached:
+        return cached[0], cached[1], res
+    if res.status_code != 200:
+        raise httpx.HTTPStatusError(
+            f"GitHub returned {res.status_code}", request=res.request, response=res
+        )
+    return res.headers.get("ETag"), _slim(res.json()), res
 
-        skills = defaultdict(int)
-        languages = defaultdict(int)
 
-        for repo in repos:
-            if repo.get("fork"):
-                continue
+def _slim(repos: list) -> list[tuple]:
+    """The (fork, language, description) of each repo — all _summarize needs."""
+    return [
+        (bool(repo.get("fork")), repo.get("language"), repo.get("description"))
+        for repo in repos
+    ]
 
-            lang = repo.get("language")
-            desc = (repo.get("description") or "").lower()
 
-            if lang:
-                languages[lang.lower()] += 1
+def _summarize(repos: list[tuple]) -> dict:
+    skills = defaultdict(int)
+    languages = defaultdict(int)
 
-            for s in IMPORTANT_SKILLS:
-                if s in desc:
-                    skills[s] += 1
+    for fork, lang, desc in repos:
+        if fork:
+            continue
 
-        return {
-            "languages": sorted(languages, key=languages.get, reverse=True)[:3],
-            "skills": sorted(skills, key=skills.get, reverse=True)[:5]
-        }
+        desc = (desc or "").lower()
 
+        if lang:
+            languages[lang.lower()] += 1
+
+        for s in IMPORTANT_SKILLS:
+            if s in desc:
+                skills[s] += 1
+
+    return {
+        "languages": sorted(languages, key=languages.get, reverse=True)[:3],
+        "skills": sorted(skills, key=skills.get, reverse=True)[:5]
+    }
+
+
+async def fetch_github_profile_async(username: str):
+    key = username.lower()
+    entry = _cache_get(key)
+
+    if entry and time.time() - entry["fetched_at"] < CACHE_TTL_S:
+        return {**entry["profile"], "source": "cache"}
+
+    old_pages = entry["pages"] if entry else {}
+
+    try:
+        etag, repos, first = await _get_page(username, 1, old_pages.get(1))
+        link = first.headers.get("Link")
+        last_page = (
+            _last_page(link)
+            if link or first.status_code == 200 else entry["last_page"]
+        )
+
+        rest = await asyncio.gather(*(
+            _get_page(username, page, old_pages.get(page))
+            for page in range(2, last_page + 1)
+        ))
+
+        pages = {1: (etag, repos)}
+        changed = first.status_code == 200
+        for page, (p_etag, p_repos, res) in enumerate(rest, start=2):
+            pages[page] = (p_etag, p_repos)
+            changed = changed or res.status_code == 200
+
+    except Exception as e:
+        if entry:
+            print(f"[GitHub] Serving stale profile for {username}: {e}")
+            return {**entry["profile"], "source": "stale"}
+        return None
+
+    all_repos = [repo for page in sorted(pages) for repo in pages[page][1]]
+    profile = (
+        entry["profile"] if entry and not changed else _summarize(all_repos)
+    )
+
+    _cache_put(key, {
+        "pages": pages,
+        "last_page": last_page,
+        "profile": profile,
+        "fetched_at": time.time(),
+    })
+    return {**profile, "source": "network" if changed else "revalidated"}
+
+
+def fetch_github_profile(username: str):
+    """Sync wrapper for callers outside an event loop."""
+    async def run():
+        try:
+            return await fetch_github_profile_async(username)
+        finally:
+            await close_clients()
+
+    try:
+        return asyncio.run(run())
     except Exception:
         return None
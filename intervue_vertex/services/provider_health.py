@@ -0,0 +1,195 @@
+"""
+provider_health.py — Circuit breakers and adaptive ordering for AI providers.
+
+Every provider attempt is recorded here with its outcome and latency.
+
+  • Circuit breaker (per provider), fed by the rolling error rate:
+      closed    → calls flow normally
+      open      → calls are skipped instantly until the cooldown expires
+      half_open → a single probe call is let through; success closes the
+                  breaker, failure re-opens it with a doubled cooldown
+
+  • Ordering: providers are ranked by expected cost
+        ewma_latency / ewma_success
+    so a slow or flaky provider drifts down the chain at runtime. Providers
+    without data use their prior latency, which keeps the static order, and
+    an idle provider's success ratio decays back toward 1.0 so it is re-tried.
+
+  • Hedging counters and a window of recent successful latencies, used by
+    ai_fallback to decide when to start a hedge request.
+
+All state is mutated from the AI engine loop only (see ai_fallback.py).
+"""
+
+import os
+import time
+from collections import deque
+
+WINDOW_S     = float(os.getenv("AI_BREAKER_WINDOW_S", "60"))
+MIN_CALLS    = int(os.getenv("AI_BREAKER_MIN_CALLS", "3"))
+ERROR_RATE   = float(os.getenv("AI_BREAKER_ERROR_RATE", "0.5"))
+COOLDOWN_S   = float(os.getenv("AI_BREAKER_COOLDOWN_S", "30"))
+MAX_COOLDOWN = float(os.getenv("AI_BREAKER_MAX_COOLDOWN_S", "300"))
+EWMA_ALPHA   = float(os.getenv("AI_EWMA_ALPHA", "0.2"))
+# Idle providers drift back toward full success so they get re-tried
+RECOVERY_HALF_LIFE_S = float(os.getenv("AI_RECOVERY_HALF_LIFE_S", "120"))
+LATENCY_SAMPLES = int(os.getenv("AI_LATENCY_SAMPLES", "100"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class ProviderHealth:
+    def __init__(self, name: str, prior_latency: float):
+        self.name = name
+        self.latency = prior_latency      # EWMA seconds
+        self.success = 1.0                # EWMA success ratio
+        self.last_seen = time.monotonic()
+        self.outcomes = deque()           # (timestamp, ok)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.cooldown = COOLDOWN_S
+        self.probing = False
+        self.calls = 0
+        self.failures = 0
+        self.recent = deque(maxlen=LATENCY_SAMPLES)
+        self.hedged = 0          # times this provider was overtaken by a hedge
+        self.hedge_launches = 0  # times this provider was started as a hedge
+        self.hedge_wins = 0      # hedged races this provider won
+
+    # ── breaker ─────────────────────────────
+
+    def _trim(self, now: float):
+        while self.outcomes and now - self.outcomes[0][0] > WINDOW_S:
+            self.outcomes.popleft()
+
+    def error_rate(self, now: float | None = None) -> float:
+        self._trim(now or time.monotonic())
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for _, ok in self.outcomes if not ok) / len(self.outcomes)
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def _open(self, now: float):
+        if self.state == HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+        self.state = OPEN
+        self.opened_at = now
+        self.probing = False
+        print(f"[AI] Circuit OPEN for {self.name} ({self.cooldown:.0f}s)")
+
+    def _close(self):
+        self.state = CLOSED
+        self.cooldown = COOLDOWN_S
+        self.probing = False
+        self.outcomes.clear()
+        print(f"[AI] Circuit CLOSED for {self.name}")
+
+    # ── recording ───────────────────────────
+
+    def record(self, ok: bool, latency: float):
+        now = time.monotonic()
+        self.success = self._recovered(now)
+        self.last_seen = now
+        self.calls += 1
+        if not ok:
+            self.failures += 1
+
+        self.success += EWMA_ALPHA * ((1.0 if ok else 0.0) - self.success)
+        if ok:
+            # Failures are often fast rejections; only successes teach latency
+            self.latency += EWMA_ALPHA * (latency - self.latency)
+            self.recent.append(latency)
+
+        self.outcomes.append((now, ok))
+        self._trim(now)
+
+        if self.state == HALF_OPEN:
+            if ok:
+                self._close()
+            else:
+                self._open(now)
+        elif self.state == CLOSED:
+            if len(self.outcomes) >= MIN_CALLS and self.error_rate(now) >= ERROR_RATE:
+                self._open(now)
+
+    def release(self):
+        """Give back a half-open probe slot that ended without an outcome."""
+        self.probing = False
+
+    def latency_percentile(self, pct: float) -> float | None:
+        if not self.recent:
+            return None
+        ranked = sorted(self.recent)
+        idx = min(len(ranked) - 1, int(round(pct / 100 * (len(ranked) - 1))))
+        return ranked[idx]
+
+    def _recovered(self, now: float) -> float:
+        idle = now - self.last_seen
+        return 1.0 - (1.0 - self.success) * 0.5 ** (idle / RECOVERY_HALF_LIFE_S)
+
+    def cost(self) -> float:
+        return self.latency / max(self._recovered(time.monotonic()), 0.05)
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "ewma_latency_s": round(self.latency, 3),
+            "ewma_success": round(self._recovered(time.monotonic()), 3),
+            "error_rate": round(self.error_rate(), 3),
+            "calls": self.calls,
+            "failures": self.failures,
+            "hedged": self.hedged,
+            "hedge_launches": self.hedge_launches,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": round(self.hedged / self.calls, 3) if self.calls else 0.0,
+        }
+
+
+_health: dict[str, ProviderHealth] = {}
+
+
+def register(name: str, prior_latency: float):
+    if name not in _health:
+        _health[name] = ProviderHealth(name, prior_latency)
+
+
+def get(name: str) -> ProviderHealth:
+    return _health[name]
+
+
+def ordered(names: list[str], penalty=None) -> list[str]:
+    """
+    Rank providers by expected cost, multiplied by penalty(name) if given
+    (ai_fallback passes quota pressure); the static order breaks ties.
+    """
+    def key(n):
+        cost = _health[n].cost() * (penalty(n) if penalty else 1.0)
+        return cost, names.index(n)
+    return sorted(names, key=key)
+
+
+def allow(name: str) -> bool:
+    return _health[name].allow()
+
+
+def record(name: str, ok: bool, latency: float):
+    _health[name].record(ok, latency)
+
+
+def release(name: str):
+    _health[name].release()
+
+
+def snapshot() -> dict:
+    return {name: h.snapshot() for name, h in _health.items()}
@@ -0,0 +1,287 @@
+"""
+provider_quota.py — Token-bucket rate limits for AI providers.
+
+Each provider with a known free-tier quota has two token buckets:
+
+  • minute — capacity RPM, refilled at RPM / 60 per second
+  • day    — capacity RPD, refilled at RPD / 86,400 per second
+
+A call takes one token from both. Two priorities share them:
+
+  • critical   — a candidate is waiting on the result (/answer, the greeting,
+                 the first question). May drain the buckets to zero.
+  • background — prefetch, follow-up speculation, memory folds. Refused once
+                 a bucket would drop below AI_QUOTA_RESERVE of its capacity,
+                 so the remaining headroom is kept for critical calls.
+
+pressure() grows as a provider's emptiest bucket drains (1 when full,
+2 at half, 20 when nearly empty). ai_fallback multiplies
+provider_health's cost by it, so traffic shifts to the next provider well
+before the first one is exhausted instead of after it starts failing.
+
+The provider limits are per API key, not per process, so the buckets live
+in a SQLite file (AI_QUOTA_PATH) shared by every uvicorn worker, and
+survive restarts. Each acquire is one BEGIN IMMEDIATE transaction (read,
+refill, take, write), run on a dedicated thread so the AI engine loop never
+waits on the file. If the file stays locked past AI_QUOTA_BUSY_TIMEOUT_S,
+the decision falls back to this process's last view of the buckets.
+With AI_QUOTA_PATH empty the buckets are per process only — correct for a
+single worker. The file is opened by open() at app startup, not on import.
+
+Bucket state is mutated from the AI engine loop only (see ai_fallback.py);
+the quota thread only touches the database.
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+RESERVE = float(os.getenv("AI_QUOTA_RESERVE", "0.2"))
+PATH    = os.getenv("AI_QUOTA_PATH", "ai_quota.db")   # empty → per process
+BUSY_TIMEOUT_S = float(os.getenv("AI_QUOTA_BUSY_TIMEOUT_S", "0.5"))
+
+_MIN_LEVEL = 0.05
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, period_s: float):
+        self.capacity = capacity
+        self.period_s = period_s
+        self.rate = capacity / period_s
+        self.tokens = capacity
+        self.updated = time.time()
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self.updated)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.tokens
+
+    def level(self, now: float) -> float:
+        return self.available(now) / self.capacity
+
+    def wait_s(self, now: float, floor: float = 0.0) -> float:
+        missing = floor + 1 - self.available(now)
+        return max(0.0, missing / self.rate)
+
+
+def _take(buckets: dict[str, TokenBucket], critical: bool, now: float) -> bool:
+    """One token from every bucket, unless that would break this priority's floor."""
+    for bucket in buckets.values():
+        floor = 0.0 if critical else bucket.capacity * RESERVE
+        if bucket.available(now) - 1 < floor:
+            return False
+    for bucket in buckets.values():
+        bucket.tokens -= 1
+    return True
+
+
+class ProviderQuota:
+    def __init__(self, name: str, rpm: int, rpd: int):
+        self.name = name
+        self.buckets = {}
+        if rpm > 0:
+            self.buckets["minute"] = TokenBucket(rpm, 60)
+        if rpd > 0:
+            self.buckets["day"] = TokenBucket(rpd, 86_400)
+        self.granted = {"critical": 0, "background": 0}
+        self.refused = {"critical": 0, "background": 0}
+        self.shared_errors = 0
+
+    def acquire(self, critical: bool) -> bool:
+        return self._count(critical, _take(self.buckets, critical, time.time()))
+
+    def _count(self, critical: bool, granted: bool) -> bool:
+        priority = "critical" if critical else "background"
+        (self.granted if granted else self.refused)[priority] += 1
+        return granted
+
+    def levels(self) -> dict:
+        return {key: (b.tokens, b.updated) for key, b in self.buckets.items()}
+
+    def restore(self, levels: dict):
+        for key, (tokens, updated) in levels.items():
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.tokens = min(bucket.capacity, float(tokens))
+                bucket.updated = float(updated)  # refill catches up lazily
+
+    def pressure(self) -> float:
+        if not self.buckets:
+            return 1.0
+        now = time.time()
+        level = min(bucket.level(now) for bucket in self.buckets.values())
+        return 1.0 / max(level, _MIN_LEVEL)
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        return {
+            **{
+                key: {
+                    "capacity": int(bucket.capacity),
+                    "available": round(bucket.available(now), 1),
+                    "next_background_in_s": round(
+                        bucket.wait_s(now, bucket.capacity * RESERVE), 1
+                    ),
+                }
+                for key, bucket in self.buckets.items()
+            },
+            "pressure": round(self.pressure(), 2),
+            "granted": dict(self.granted),
+            "refused": dict(self.refused),
+            "shared_errors": self.shared_errors,
+        }
+
+
+# ─────────────────────────────────────────────
+# Shared state (SQLite, one connection on one thread)
+# ─────────────────────────────────────────────
+
+class SharedBuckets:
+    def __init__(self, path: str, busy_timeout: float = BUSY_TIMEOUT_S):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._conn: sqlite3.Connection | None = None
+        # Single thread: the connection never crosses threads and
+        # transactions from this process never contend with each other
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-quota")
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " provider TEXT, bucket TEXT, tokens REAL, updated REAL,"
+                " PRIMARY KEY (provider, bucket))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _read(self, conn, name: str) -> dict:
+        rows = conn.execute(
+            "SELECT bucket, tokens, updated FROM buckets WHERE provider = ?", (name,)
+        )
+        return {key: (tokens, updated) for key, tokens, updated in rows}
+
+    def take(self, name: str, specs: dict, critical: bool, now: float) -> tuple[bool, dict]:
+        """
+        Atomically refill and take from the shared buckets of `name`.
+        specs: {key: (capacity, period_s)}. Returns (granted, levels after).
+        """
+        conn = self._db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            saved = self._read(conn, name)
+            buckets = {}
+            for key, (capacity, period_s) in specs.items():
+                bucket = buckets[key] = TokenBucket(capacity, period_s)
+                if key in saved:
+                    bucket.tokens = min(capacity, saved[key][0])
+                    bucket.updated = saved[key][1]
+            granted = _take(buckets, critical, now)
+            levels = {key: (b.tokens, b.updated) for key, b in buckets.items()}
+            conn.executemany(
+                "INSERT OR REPLACE INTO buckets (provider, bucket, tokens, updated)"
+                " VALUES (?, ?, ?, ?)",
+                [(name, key, tokens, updated) for key, (tokens, updated) in levels.items()],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return granted, levels
+
+    def load(self, name: str) -> dict:
+        return self._read(self._db(), name)
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._thread, fn, *args)
+
+    def close(self):
+        self._thread.submit(self._close_conn).result()
+        self._thread.shutdown(wait=True)
+
+    def _close_conn(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_quotas: dict[str, ProviderQuota] = {}
+_shared: SharedBuckets | None = None
+
+
+def register(name: str, rpm: int, rpd: int):
+    """rpm / rpd of 0 mean unlimited."""
+    if name not in _quotas:
+        _quotas[name] = ProviderQuota(name, rpm, rpd)
+
+
+def acquire(name: str, critical: bool) -> bool:
+    """
+    Take a request slot for `name` from this process's buckets only; False
+    when over quota for this priority. The engine uses acquire_async().
+    """
+    quota = _quotas.get(name)
+    if quota is None:
+        return True
+    return quota.acquire(critical)
+
+
+async def acquire_async(name: str, critical: bool) -> bool:
+    """Take a request slot for `name` from the shared buckets, off the loop."""
+    quota = _quotas.get(name)
+    if quota is None or not quota.buckets:
+        return True
+    if _shared is None:
+        return quota.acquire(critical)
+
+    shared = _shared
+    specs = {key: (b.capacity, b.period_s) for key, b in quota.buckets.items()}
+    try:
+        granted, levels = await shared.run(shared.take, name, specs, critical, time.time())
+    except (sqlite3.Error, RuntimeError) as e:  # RuntimeError: closed at shutdown
+        quota.shared_errors += 1
+        print(f"[AI] Shared quota unavailable ({e}), deciding locally")
+        return quota.acquire(critical)
+    quota.restore(levels)
+    return quota._count(critical, granted)
+
+
+def pressure(name: str) -> float:
+    quota = _quotas.get(name)
+    return quota.pressure() if quota else 1.0
+
+
+def snapshot() -> dict:
+    return {name: q.snapshot() for name, q in _quotas.items()}
+
+
+def open():
+    """
+    Attach to the shared buckets at AI_QUOTA_PATH and seed this process's
+    view from them (blocking; call once at app startup).
+    """
+    global _shared
+    if not PATH or _shared is not None:
+        return
+    shared = SharedBuckets(PATH)
+    for name, quota in _quotas.items():
+        try:
+            quota.restore(shared._thread.submit(shared.load, name).result())
+        except sqlite3.Error as e:
+            print(f"[AI] Quota load failed: {e}")
+    _shared = shared
+
+
+def close():
+    global _shared
+    shared, _shared = _shared, None
+    if shared is not None:
+        shared.close()
@@ -0,0 +1,168 @@
+"""
+question_prefetch.py — Interview questions generated ahead of need.
+
+The first technical question is generated from the GitHub context in the
+background while the greeting is being spoken, and stored in the session
+as "first_question". The first /answer then uses it directly instead of
+waiting on an LLM call.
+
+While the candidate answers a question, a few follow-ups are speculated in
+the background ("deeper", "switch", "easier") and stored in the session as
+"followups". /answer then only needs a cheap scoring + selection call
+(vertex_wrapper.select_followup_async) instead of generating from scratch.
+
+In-flight tasks are per process; the finished question lives in the
+session store, so any worker can serve it.
+"""
+
+import os
+import asyncio
+from services.gemini_client import gemini_generate_async
+from services.ai_fallback import ai_generate_json_async
+from services.session_manager import update_session_async
+
+# How long the first /answer may wait for a still-running prefetch
+FIRST_QUESTION_WAIT_S = float(os.getenv("FIRST_QUESTION_WAIT_S", "3"))
+
+FOLLOWUP_KINDS = ("deeper", "switch", "easier")
+
+_tasks: dict[str, asyncio.Task] = {}
+_followup_tasks: dict[str, asyncio.Task] = {}
+
+
+def _track(tasks: dict, session_id: str, task: asyncio.Task):
+    old = tasks.get(session_id)
+    if old and not old.done():
+        old.cancel()  # superseded
+    tasks[session_id] = task
+
+    def done(t):
+        if tasks.get(session_id) is t:
+            del tasks[session_id]
+        if not t.cancelled() and t.exception():
+            print(f"[Prefetch] {session_id} failed: {t.exception()!r}")
+
+    task.add_done_callback(done)
+
+
+async def _first_question(session_id, github_context, skill, project) -> str | None:
+    question = await gemini_generate_async(
+        f"""
+You are a professional technical interviewer.
+
+Candidate GitHub context:
+{github_context}
+
+Skill focus: {skill}
+Project: {project or "N/A"}
+
+Ask the first technical question of the interview.
+Base it on the candidate's own projects or skills.
+Only the question, one or two short sentences.
+""",
+        memo=True,
+        # Ahead of need, but the first /answer waits on it: not sheddable
+        critical=True,
+    )
+    if question:
+        await update_session_async(session_id, first_question=question)
+    return question
+
+
+def schedule_first_question(session_id, github_context, skill, project):
+    _track(_tasks, session_id, asyncio.create_task(
+        _first_question(session_id, github_context, skill, project)
+    ))
+
+
+async def take_first_question(session_id: str, session: dict) -> str | None:
+    """
+    The prefetched first question, if this is the candidate's first answer
+    and the question is ready (or becomes ready within FIRST_QUESTION_WAIT_S).
+    Returns None otherwise, and the caller evaluates normally.
+    """
+    if session.get("count", 0) != 0 or session.get("first_question_used"):
+        return None
+
+    question = session.get("first_question")
+    task = _tasks.get(session_id)
+    if not question and task:
+        try:
+            question = await asyncio.wait_for(
+                asyncio.shield(task), FIRST_QUESTION_WAIT_S
+            )
+        except Exception:
+            question = None
+
+    if question:
+        await update_session_async(session_id, first_question_used=True)
+    return question
+
+
+# ─────────────────────────────────────────────
+# Speculative follow-ups
+# ─────────────────────────────────────────────
+
+async def _followups(session_id, question, last_answer, github_context, skill, project):
+    data = await ai_generate_json_async(
+        f"""
+You are a technical interviewer preparing your next move while the
+candidate answers.
+
+Candidate GitHub context:
+{github_context}
+
+Skill focus: {skill}
+Project: {project or "N/A"}
+
+Previous candidate answer:
+{last_answer or "N/A"}
+
+Question the candidate is answering now:
+{question}
+
+Write three possible next questions, each one concise sentence:
+- "deeper": probes deeper into the current question's topic
+- "switch": moves to a different project or skill of the candidate
+- "easier": a simpler question on the same topic, for a weak answer
+
+Return ONLY this JSON:
+{{"deeper": "<question>", "switch": "<question>", "easier": "<question>"}}
+""",
+        system="You are a senior technical interviewer. Always respond with valid JSON only.",
+    )
+
+    options = {
+        kind: data[kind].strip()
+        for kind in FOLLOWUP_KINDS
+        if isinstance(data.get(kind), str) and data[kind].strip()
+    }
+    if not options:
+        return None  # provider chain fell back; nothing useful to store
+
+    await update_session_async(session_id, followups={"question": question, "options": options})
+    return options
+
+
+def schedule_followups(session_id: str, session: dict, question: str, last_answer: str | None = None):
+    """Start speculating follow-ups for the question just asked."""
+    _track(_followup_tasks, session_id, asyncio.create_task(_followups(
+        session_id, question, last_answer,
+        session.get("github_context"), session.get("skill"), session.get("project"),
+    )))
+
+
+def take_followups(session: dict) -> dict | None:
+    """
+    Speculated options for the question currently being answered, if they
+    are ready. Never waits: a miss just means a normal evaluation.
+    """
+    followups = session.get("followups") or {}
+    current = next(
+        (m["text"] for m in reversed(session.get("messages") or [])
+         if m["role"] == "interviewer"),
+        None,
+    )
+    if current and followups.get("question") == current:
+        return followups.get("options")
+    return None
@@ -1,89 +1,104 @@
 # services/report.py
-import statistics
 import time
 import io
-import base64
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 
 
-def _aggregate_emotions(turns):
-    text_ems = [t.get("text_emotion", {}) for t in turns if t.get("text_emotion")]
-    audio_ems = [t.get("audio_emotion", {}) for t in turns if t.get("audio_emotion")]
-
-    def dominant(items):
-        emos = [i.get("emotion") for i in items if i.get("emotion")]
-        return max(set(emos), key=emos.count) if emos else "neutral"
-
+def _turns(messages):
+    """Candidate answers paired with the question they answered."""
+    turns = []
+    question = None
+    for m in messages:
+        if m.get("role") == "interviewer":
+            question = m.get("text")
+            continue
+        turns.append({
+            "question": question,
+            "answer": m.get("text"),
+            "evaluation": m.get("evaluation") or {},
+            "confidence": m.get("confidence"),
+            "text_emotion": m.get("text_emotion") or {},
+            "audio_emotion": m.get("audio_emotion") or {},
+            "camera_metrics": m.get("camera_metrics") or {},
+        })
+    return turns
+
+
+def _dominant(counts):
+    return max(counts, key=counts.get) if counts else "neutral"
+
+
+def summarize(session):
+    """
+    Live totals from the running aggregates session_manager keeps in
+    session["stats"] — O(1) in the number of turns.
+    """
+    stats = session.get("stats") or {}
+    scores = stats.get("scores", 0)
+    confidences = stats.get("confidences", 0)
     return {
-        "dominant_text_emotion": dominant(text_ems),
-        "dominant_audio_emotion": dominant(audio_ems),
-        "text_scores": [i.get("score", 0) for i in text_ems],
-        "audio_scores": [i.get("score", 0) for i in audio_ems],
+        "total_turns": session.get("count"),
+        "avg_score": round(stats["score_sum"] / scores, 2) if scores else None,
+        "confidence_score": (
+            round(stats["confidence_sum"] / confidences, 2) if confidences else None
+        ),
+        "dominant_text_emotion": _dominant(stats.get("text_emotions")),
+        "dominant_audio_emotion": _dominant(stats.get("audio_emotions")),
+        "text_emotions": stats.get("text_emotions", {}),
+        "audio_emotions": stats.get("audio_emotions", {}),
+        "version": session.get("version", 0),
     }
 
 
-def compute_confidence(camera_metrics, audio_em, text_em):
-    camera_metrics = camera_metrics or {}
-    audio_em = audio_em or {}
-    text_em = text_em or {}
+def _aggregate_camera(turns):
+    # Per-answer server aggregates (camera.take_answer_metrics), frame-weighted
+    cams = [
+        t["camera_metrics"] for t in turns
+        if (t.get("camera_metrics") or {}).get("frames")
+    ]
+    if not cams:
+        return None
 
-    eye = camera_metrics.get("eye_contact", 0)
-    still = camera_metrics.get("stillness", 0)
-    smile = (
-        camera_metrics.get("expression_score", 0)
-        if camera_metrics.get("dominant_expression") == "happy"
-        else 0
-    )
-    distraction = camera_metrics.get("distraction", 0)
+    frames = sum(c["frames"] for c in cams)
 
-    visual = max(0, (0.5 * eye + 0.3 * still + 0.2 * smile) * (1 - distraction))
-    vocal = audio_em.get("score", 0)
+    def avg(key):
+        return round(sum(c.get(key, 0) * c["frames"] for c in cams) / frames, 2)
 
-    text_map = {"happy": 1.0, "neutral": 0.6, "concerned": 0.3}
-    textual = text_map.get(text_em.get("emotion"), 0.6)
-
-    return round(0.5 * visual + 0.35 * vocal + 0.15 * textual, 2)
+    return {
+        "answers": len(cams),
+        "frames": frames,
+        "eye_contact": avg("eye_contact"),
+        "stillness": avg("stillness"),
+        "distraction": avg("distraction"),
+        "no_face": avg("no_face"),
+    }
 
 
 def make_report(session):
+    live = summarize(session)
     report = {
         "username": session.get("username"),
         "skill": session.get("skill"),
         "project": session.get("project"),
         "started_at": session.get("started_at"),
         "ended_at": session.get("ended_at"),
-        "total_turns": session.get("count"),
-        "turns": session.get("turns", []),
+        "total_turns": live["total_turns"],
+        "turns": _turns(session.get("messages", [])),
     }
 
-    agg = _aggregate_emotions(report["turns"])
+    agg = {
+        "dominant_text_emotion": live["dominant_text_emotion"],
+        "dominant_audio_emotion": live["dominant_audio_emotion"],
+        "text_scores": [t["text_emotion"].get("score", 0) for t in report["turns"] if t["text_emotion"]],
+        "audio_scores": [t["audio_emotion"].get("score", 0) for t in report["turns"] if t["audio_emotion"]],
+    }
     report["emotion_summary"] = agg
+    report["camera_summary"] = _aggregate_camera(report["turns"])
 
-    # 📊 Score aggregation (Gemini-compatible)
-    scores = []
-    for t in report["turns"]:
-        ev = t.get("evaluation", {})
-        sc = ev.get("score")
-        if isinstance(sc, (int, float)):
-            scores.append(sc / 10)  # normalize 0–1
-
-    report["avg_score"] = round(statistics.mean(scores), 2) if scores else None
-
-    # 🧠 Confidence score (avg of turns)
-    confidences = []
-    for t in report["turns"]:
-        confidences.append(
-            compute_confidence(
-                t.get("camera_metrics"),
-                t.get("audio_emotion"),
-                t.get("text_emotion"),
-            )
-        )
-
-    report["confidence_score"] = (
-        round(statistics.mean(confidences), 2) if confidences else None
-    )
+    # 📊 Score + 🧠 confidence, from the running aggregates
+    report["avg_score"] = live["avg_score"]
+    report["confidence_score"] = live["confidence_score"]
 
     # 📝 Summary
     if report["avg_score"] is not None:
@@ -100,57 +115,61 @@ def make_report(session):
         f" Dominant text emotion: {agg['dominant_text_emotion']}."
         f" Dominant audio emotion: {agg['dominant_audio_emotion']}."
     )
+    cam = report["camera_summary"]
+    if cam:
+        summary += (
+            f" Eye contact: {cam['eye_contact']:.0%}."
+            f" Stillness: {cam['stillness']:.0%}."
+            f" Face not visible in {cam['no_face']:.0%} of frames."
+        )
 
     report["summary"] = summary
 
-    # 📄 PDF generation (base64)
-    try:
-        buffer = io.BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        w, h = A4
-        y = h - 50
-
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, y, f"Interview Report – {report['username']}")
-        y -= 30
-
-        c.setFont("Helvetica", 10)
-        c.drawString(50, y, f"Skill: {report['skill']} | Project: {report['project']}")
-        y -= 20
-        c.drawString(50, y, f"Started: {time.ctime(report['started_at'])}")
-        y -= 20
-        c.drawString(50, y, f"Ended: {time.ctime(report['ended_at'])}")
-        y -= 30
-
-        c.drawString(50, y, "Summary:")
-        y -= 15
-        for line in report["summary"].split(". "):
-            c.drawString(60, y, line.strip())
-            y -= 14
-
-        y -= 10
-        c.drawString(50, y, "Interview Turns:")
-        y -= 18
+    return report
 
-        for t in report["turns"]:
-            q = (t.get("question") or "")[:90]
-            a = (t.get("answer") or "")[:120]
-            sc = t.get("evaluation", {}).get("score", "N/A")
-            c.drawString(60, y, f"Q: {q}")
-            y -= 12
-            c.drawString(60, y, f"A: {a}")
-            y -= 12
-            c.drawString(60, y, f"Score: {sc}")
-            y -= 18
-            if y < 80:
-                c.showPage()
-                y = h - 50
-
-        c.save()
-        buffer.seek(0)
-        report["pdf_base64"] = base64.b64encode(buffer.read()).decode("utf-8")
-
-    except Exception as e:
-        report["pdf_error"] = str(e)
 
-    return report
+def render_pdf(report) -> bytes:
+    """ReportLab rendering of a make_report() dict (CPU-bound, blocking)."""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    w, h = A4
+    y = h - 50
+
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, y, f"Interview Report – {report['username']}")
+    y -= 30
+
+    c.setFont("Helvetica", 10)
+    c.drawString(50, y, f"Skill: {report['skill']} | Project: {report['project']}")
+    y -= 20
+    c.drawString(50, y, f"Started: {time.ctime(report['started_at'])}")
+    y -= 20
+    c.drawString(50, y, f"Ended: {time.ctime(report['ended_at'])}")
+    y -= 30
+
+    c.drawString(50, y, "Summary:")
+    y -= 15
+    for line in report["summary"].split(". "):
+        c.drawString(60, y, line.strip())
+        y -= 14
+
+    y -= 10
+    c.drawString(50, y, "Interview Turns:")
+    y -= 18
+
+    for t in report["turns"]:
+        q = (t.get("question") or "")[:90]
+        a = (t.get("answer") or "")[:120]
+        sc = t.get("evaluation", {}).get("score", "N/A")
+        c.drawString(60, y, f"Q: {q}")
+        y -= 12
+        c.drawString(60, y, f"A: {a}")
+        y -= 12
+        c.drawString(60, y, f"Score: {sc}")
+        y -= 18
+        if y < 80:
+            c.showPage()
+            y = h - 50
+
+    c.save()
+    return buffer.getvalue()
@@ -0,0 +1,69 @@
+"""
+report_pdf.py — On-demand, cached PDF rendering of interview reports.
+
+The PDF is rendered only when requested, on a worker thread, and cached per
+(session_id, session version): session_manager bumps "version" on every
+mutation, so a cached PDF is reused exactly until the session changes.
+Concurrent requests for the same version share one render.
+
+The report is built on the event loop, where the session cannot change
+underneath it, and only that detached copy is handed to the render thread.
+"""
+
+import os
+import copy
+import asyncio
+import threading
+from collections import OrderedDict
+from services.report import make_report, render_pdf
+
+PDF_CACHE_MAX = int(os.getenv("REPORT_PDF_CACHE_MAX", "64"))
+
+_cache: OrderedDict[tuple, bytes] = OrderedDict()
+_lock = threading.Lock()
+_inflight: dict[tuple, asyncio.Future] = {}
+
+
+def cache_key(session_id: str, session: dict) -> tuple:
+    return (session_id, session.get("version", 0))
+
+
+def _cache_get(key: tuple) -> bytes | None:
+    with _lock:
+        pdf = _cache.get(key)
+        if pdf is not None:
+            _cache.move_to_end(key)
+        return pdf
+
+
+def _cache_put(key: tuple, pdf: bytes):
+    with _lock:
+        # Older versions of the same session can never be served again
+        for stale in [k for k in _cache if k[0] == key[0]]:
+            del _cache[stale]
+        _cache[key] = pdf
+        while len(_cache) > PDF_CACHE_MAX:
+            _cache.popitem(last=False)
+
+
+async def get_pdf(session_id: str, session: dict) -> bytes:
+    key = cache_key(session_id, session)
+    pdf = _cache_get(key)
+    if pdf is not None:
+        return pdf
+
+    running = _inflight.get(key)
+    if running:
+        return await asyncio.shield(running)
+
+    # /answer, folds and prefetch keep mutating the live session on the loop
+    report = copy.deepcopy(make_report(session))
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(None, render_pdf, report)
+    _inflight[key] = future
+    try:
+        pdf = await asyncio.shield(future)
+    finally:
+        _inflight.pop(key, None)
+    _cache_put(key, pdf)
+    return pdf
@@ -0,0 +1,49 @@
+"""
+scoring.py — Per-answer confidence, shared by every layer that scores turns.
+
+session_manager keeps the running totals with it, report renders them and
+cohort vectorizes the same formula, so the weights live here once. Pure
+Python, no imports: safe to pull into the session layer and worker
+processes.
+"""
+
+# Blend of the three channels
+VISUAL_WEIGHT = 0.5
+VOCAL_WEIGHT = 0.35
+TEXTUAL_WEIGHT = 0.15
+
+# Visual channel: eye contact, stillness and smile, scaled down by distraction
+EYE_WEIGHT = 0.5
+STILL_WEIGHT = 0.3
+SMILE_WEIGHT = 0.2
+
+# Text-emotion label → weight in the textual component (unknown labels
+# score as neutral)
+TEXT_WEIGHT = {"happy": 1.0, "neutral": 0.6, "concerned": 0.3}
+DEFAULT_TEXT_WEIGHT = TEXT_WEIGHT["neutral"]
+
+
+def text_weight(text_em) -> float:
+    return TEXT_WEIGHT.get((text_em or {}).get("emotion"), DEFAULT_TEXT_WEIGHT)
+
+
+def compute_confidence(camera_metrics, audio_em, text_em):
+    camera_metrics = camera_metrics or {}
+    audio_em = audio_em or {}
+
+    eye = camera_metrics.get("eye_contact", 0)
+    still = camera_metrics.get("stillness", 0)
+    smile = (
+        camera_metrics.get("expression_score", 0)
+        if camera_metrics.get("dominant_expression") == "happy"
+        else 0
+    )
+    distraction = camera_metrics.get("distraction", 0)
+
+    visual = max(
+        0, (EYE_WEIGHT * eye + STILL_WEIGHT * still + SMILE_WEIGHT * smile) * (1 - distraction)
+    )
+    vocal = audio_em.get("score", 0)
+    textual = text_weight(text_em)
+
+    return round(VISUAL_WEIGHT * visual + VOCAL_WEIGHT * vocal + TEXTUAL_WEIGHT * textual, 2)
@@ -1,9 +1,143 @@
+import os
 import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from services.session_store import make_store, MemoryStore, SESSION_TTL_S
+from services.session_wal import SessionWAL
+from services.scoring import compute_confidence
 
-interview_sessions = {}
+# Backend chosen by SESSION_STORE (memory | sqlite), see session_store.py
+store = make_store()
 
-def start_session(session_id, github_context, skill, project, first_message):
-    interview_sessions[session_id] = {
+# The memory store is lost on restart, so its mutations go through a
+# write-ahead log (session_wal.py); SQLite is durable on its own.
+# SESSION_WAL=0 turns the log off.
+wal = (
+    SessionWAL(store.items)
+    if isinstance(store, MemoryStore) and os.getenv("SESSION_WAL", "1") != "0"
+    else None
+)
+
+# Blocking backends (SQLite) must not run on the event loop: a locked
+# database would stall every SSE stream and websocket with it. Async code
+# uses the *_async variants below, which hop to this pool when needed.
+_io = (
+    ThreadPoolExecutor(
+        max_workers=int(os.getenv("SESSION_IO_THREADS", "4")),
+        thread_name_prefix="session-store",
+    )
+    if store.blocking else None
+)
+
+# Every mutation is a JSON-serialisable op applied by _APPLY[op["op"]], so the
+# exact same code runs live and when replaying the log. Ops carry their own
+# timestamps to replay identically.
+
+def _update(session_id, op):
+    # Every mutation bumps "version", so derived data (e.g. the report PDF)
+    # can be cached per (session_id, version)
+    def apply(session):
+        _APPLY[op["op"]](session, op)
+        session["version"] = session.get("version", 0) + 1
+        if wal:
+            # Inside the store's atomic update, so log order is apply order
+            wal.append(session_id, {**op, "v": session["version"]})
+
+    return store.update(session_id, apply)
+
+# ── running aggregates ───────────────────────
+# session["stats"] is kept in step with every candidate message, so reports
+# and live polls read totals in O(1) instead of rescanning the turns.
+# A candidate message's contribution is retracted before it changes
+# (e.g. audio emotion or evaluation arriving later) and re-applied after.
+
+def _new_stats():
+    return {
+        "text_emotions": {},
+        "audio_emotions": {},
+        "score_sum": 0.0,
+        "scores": 0,
+        "confidence_sum": 0.0,
+        "confidences": 0,
+    }
+
+def _count(counter, emotion, delta):
+    label = (emotion or {}).get("emotion")
+    if label:
+        counter[label] = counter.get(label, 0) + delta
+        if counter[label] <= 0:
+            del counter[label]
+
+def _contribute(stats, message, sign):
+    _count(stats["text_emotions"], message.get("text_emotion"), sign)
+    _count(stats["audio_emotions"], message.get("audio_emotion"), sign)
+
+    score = (message.get("evaluation") or {}).get("score")
+    if isinstance(score, (int, float)):
+        stats["score_sum"] += sign * score / 10  # normalize 0–1
+        stats["scores"] += sign
+
+    stats["confidence_sum"] += sign * message["confidence"]
+    stats["confidences"] += sign
+
+def _turn_confidence(message):
+    message["confidence"] = compute_confidence(
+        message.get("camera_metrics"),
+        message.get("audio_emotion"),
+        message.get("text_emotion"),
+    )
+
+# ── ops ──────────────────────────────────────
+
+def _apply_message(session, op):
+    message = {
+        "role": op["role"],
+        "text": op["text"],
+        "text_emotion": op["text_emotion"] or {},
+        "audio_emotion": op["audio_emotion"] or {},
+        "camera_metrics": op["camera_metrics"] or {},
+        "timestamp": op["ts"]
+    }
+    session["messages"].append(message)
+
+    if message["role"] == "candidate":
+        session["count"] += 1
+        _turn_confidence(message)
+        _contribute(session.setdefault("stats", _new_stats()), message, +1)
+
+def _apply_message_update(session, op):
+    index, fields = op["index"], op["fields"]
+    if index is None or not 0 <= index < len(session["messages"]):
+        return
+    message = session["messages"][index]
+    if message["role"] != "candidate":
+        message.update(fields)
+        return
+
+    stats = session.setdefault("stats", _new_stats())
+    _contribute(stats, message, -1)
+    message.update(fields)
+    _turn_confidence(message)
+    _contribute(stats, message, +1)
+
+def _apply_end(session, op):
+    session["completed"] = True
+    session["ended_at"] = op["ts"]
+
+_APPLY = {
+    "message": _apply_message,
+    "update_message": _apply_message_update,
+    "update": lambda session, op: session.update(op["fields"]),
+    "end": _apply_end,
+}
+
+# ── public API ───────────────────────────────
+
+def start_session(session_id, github_context, skill, project, first_message, username=None):
+    now = time.time()
+    session = {
+        "username": username,
         "github_context": github_context,
         "skill": skill,
         "project": project,
@@ -11,12 +145,19 @@ def start_session(session_id, github_context, skill, project, first_message):
             {
                 "role": "interviewer",
                 "text": first_message,
-                "timestamp": time.time()
+                "timestamp": now
             }
         ],
         "count": 0,
-        "started_at": time.time()
+        "started_at": now,
+        "version": 0,
+        "stats": _new_stats()
     }
+    store.put(session_id, session)
+    if wal:
+        # After the put, so a snapshot racing with it either has the session
+        # or is followed by this record in the next log
+        wal.append(session_id, {"op": "start", "v": 0, "session": session})
 
 def add_message(
     session_id,
@@ -26,27 +167,119 @@ def add_message(
     audio_emotion=None,
     camera_metrics=None
 ):
-    session = interview_sessions.get(session_id)
-    if not session:
-        return
-
-    session["messages"].append({
+    session = _update(session_id, {
+        "op": "message",
         "role": role,
         "text": text,
-        "text_emotion": text_emotion or {},
-        "audio_emotion": audio_emotion or {},
-        "camera_metrics": camera_metrics or {},
-        "timestamp": time.time()
+        "text_emotion": text_emotion,
+        "audio_emotion": audio_emotion,
+        "camera_metrics": camera_metrics,
+        "ts": time.time(),
     })
+    # Index of the new message, for results that arrive later (update_message)
+    return len(session["messages"]) - 1 if session else None
 
-    if role == "candidate":
-        session["count"] += 1
+def update_session(session_id, **fields):
+    _update(session_id, {"op": "update", "fields": fields})
+
+def update_message(session_id, index, **fields):
+    _update(session_id, {"op": "update_message", "index": index, "fields": fields})
 
 def get_session(session_id):
-    return interview_sessions.get(session_id)
+    return store.get(session_id)
 
 def end_session(session_id):
-    session = interview_sessions.get(session_id)
-    if session:
-        session["completed"] = True
-        session["ended_at"] = time.time()
+    _update(session_id, {"op": "end", "ts": time.time()})
+
+# ── async API ────────────────────────────────
+
+def _offloaded(fn):
+    @functools.wraps(fn)
+    async def run(*args, **kwargs):
+        if _io is None:
+            return fn(*args, **kwargs)  # in-memory: just a lock, no hop
+        return await asyncio.get_running_loop().run_in_executor(
+            _io, functools.partial(fn, *args, **kwargs)
+        )
+    return run
+
+start_session_async  = _offloaded(start_session)
+add_message_async    = _offloaded(add_message)
+update_session_async = _offloaded(update_session)
+update_message_async = _offloaded(update_message)
+get_session_async    = _offloaded(get_session)
+end_session_async    = _offloaded(end_session)
+
+# ── recovery ─────────────────────────────────
+
+def _last_active(session):
+    messages = session.get("messages") or []
+    return max(
+        session.get("started_at", 0),
+        session.get("ended_at") or 0,
+        messages[-1].get("timestamp", 0) if messages else 0,
+    )
+
+def _replay(log) -> dict:
+    """session_id -> session, as of the end of the log."""
+    sessions = {}
+    for session_id, record in log.replay():
+        session = sessions.get(session_id)
+        if record["op"] == "start":
+            if session is None or record["v"] > session.get("version", 0):
+                sessions[session_id] = record["session"]
+            continue
+        # Unknown (evicted before the snapshot) or already in the snapshot
+        if session is None or record["v"] <= session.get("version", 0):
+            continue
+        _APPLY[record["op"]](session, record)
+        session["version"] = record["v"]
+    return sessions
+
+def recover():
+    """
+    Rebuild live sessions from the write-ahead log, then start logging.
+    Called once at app startup, before any request is served.
+    """
+    if not wal:
+        return 0
+
+    started = time.monotonic()
+    sessions = _replay(wal)
+    now = time.time()
+    live = sorted(
+        (item for item in sessions.items() if now - _last_active(item[1]) <= SESSION_TTL_S),
+        key=lambda item: _last_active(item[1]),
+    )
+    for session_id, session in live:  # oldest first, so LRU order survives
+        store.put(session_id, session)
+
+    wal.open()
+    print(f"[WAL] Recovered {len(live)} sessions from {wal.counters['replayed']} "
+          f"records in {time.monotonic() - started:.2f}s")
+    return len(live)
+
+def logged_sessions():
+    """
+    Every session the write-ahead log holds, without opening it for writing:
+    for tools running beside the app (e.g. cohort export). A compaction in
+    the app may delete a log mid-read; the replay then restarts from the
+    newer snapshot.
+    """
+    if not wal:
+        return []
+    for attempt in range(3):
+        try:
+            return list(_replay(SessionWAL(None, wal.dir)).items())
+        except FileNotFoundError:
+            if attempt == 2:
+                raise
+
+def close():
+    if wal:
+        wal.close()
+    if _io:
+        _io.shutdown(wait=True)
+
+def wal_stats():
+    return wal.stats() if wal else {"enabled": False}
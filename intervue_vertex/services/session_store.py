@@ -0,0 +1,233 @@
+"""
+session_store.py — Pluggable storage for interview sessions.
+
+Backends (SESSION_STORE env):
+  • memory — per-process LRU with idle TTL, bounded by SESSION_MAX entries
+  • sqlite — shared SQLite file (SESSION_DB_PATH) so several uvicorn workers
+             on one host see the same sessions; idle TTL enforced in SQL
+
+Sessions are plain JSON-serialisable dicts. All mutations go through
+update(session_id, fn), which is an atomic read-modify-write on every
+backend, so callers never rely on mutating a shared dict in place. get()
+returns a private copy on every backend: readers on other threads (sync
+report endpoints) never iterate a dict the event loop is mutating.
+
+Backends with blocking I/O set `blocking = True`; session_manager's *_async
+functions then run their calls on a small thread pool instead of the event
+loop. SQLite waits at most SESSION_DB_BUSY_TIMEOUT_S for another writer's
+lock before failing the call.
+"""
+
+import os
+import copy
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_S", str(2 * 60 * 60)))
+SESSION_MAX   = int(os.getenv("SESSION_MAX", "1000"))
+SESSION_DB_BUSY_TIMEOUT_S = float(os.getenv("SESSION_DB_BUSY_TIMEOUT_S", "1"))
+
+
+class SessionStore:
+    blocking = False  # True when calls may wait on disk or other processes
+
+    def get(self, session_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def put(self, session_id: str, session: dict):
+        raise NotImplementedError
+
+    def update(self, session_id: str, fn) -> dict | None:
+        """Apply fn(session) atomically; returns the updated session or None."""
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def items(self):
+        """Snapshot of live (session_id, session) pairs, for batch jobs."""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+# ─────────────────────────────────────────────
+# In-memory LRU + TTL
+# ─────────────────────────────────────────────
+
+class MemoryStore(SessionStore):
+    def __init__(self, max_entries: int = SESSION_MAX, ttl: float = SESSION_TTL_S):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _expire(self, now: float):
+        # Oldest-touched first, so stop at the first live entry
+        while self._data:
+            sid, (touched, _) = next(iter(self._data.items()))
+            if now - touched <= self.ttl:
+                break
+            del self._data[sid]
+
+    def _touch(self, session_id: str, session: dict, now: float):
+        self._data[session_id] = (now, session)
+        self._data.move_to_end(session_id)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def _get_live(self, session_id, now: float) -> dict | None:
+        self._expire(now)
+        entry = self._data.get(session_id)
+        if entry is None:
+            return None
+        self._touch(session_id, entry[1], now)
+        return entry[1]
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._get_live(session_id, time.time())
+            return copy.deepcopy(session) if session is not None else None
+
+    def put(self, session_id, session):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            self._touch(session_id, session, now)
+
+    def update(self, session_id, fn):
+        with self._lock:
+            session = self._get_live(session_id, time.time())
+            if session is None:
+                return None
+            fn(session)
+            return session
+
+    def delete(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def items(self):
+        with self._lock:
+            self._expire(time.time())
+            # Copies: callers (cohort export, WAL snapshots) read them
+            # outside the lock while requests keep mutating the originals
+            return [(sid, copy.deepcopy(session)) for sid, (_, session) in self._data.items()]
+
+    def __len__(self):
+        with self._lock:
+            self._expire(time.time())
+            return len(self._data)
+
+
+# ─────────────────────────────────────────────
+# Shared SQLite file
+# ─────────────────────────────────────────────
+
+class SQLiteStore(SessionStore):
+    _PURGE_EVERY = 100  # writes between TTL sweeps
+    blocking = True
+
+    def __init__(self, path: str, ttl: float = SESSION_TTL_S):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id TEXT PRIMARY KEY, data TEXT NOT NULL, touched REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_touched ON sessions(touched)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=SESSION_DB_BUSY_TIMEOUT_S, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _maybe_purge(self, conn, now: float):
+        with self._writes_lock:  # writes come from several I/O threads
+            self._writes += 1
+            due = self._writes % self._PURGE_EVERY == 0
+        if due:
+            conn.execute("DELETE FROM sessions WHERE touched < ?", (now - self.ttl,))
+
+    def get(self, session_id):
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE id = ? AND touched >= ?",
+            (session_id, now - self.ttl),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, session_id, session):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (id, data, touched) VALUES (?, ?, ?)",
+            (session_id, json.dumps(session), now),
+        )
+        self._maybe_purge(conn, now)
+
+    def update(self, session_id, fn):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM sessions WHERE id = ? AND touched >= ?",
+                (session_id, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            session = json.loads(row[0])
+            fn(session)
+            conn.execute(
+                "UPDATE sessions SET data = ?, touched = ? WHERE id = ?",
+                (json.dumps(session), now, session_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._maybe_purge(conn, now)
+        return session
+
+    def delete(self, session_id):
+        self._conn().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def items(self):
+        rows = self._conn().execute(
+            "SELECT id, data FROM sessions WHERE touched >= ?",
+            (time.time() - self.ttl,),
+        )
+        for sid, data in rows:
+            yield sid, json.loads(data)
+
+    def __len__(self):
+        row = self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE touched >= ?",
+            (time.time() - self.ttl,),
+        ).fetchone()
+        return row[0]
+
+
+def make_store() -> SessionStore:
+    backend = os.getenv("SESSION_STORE", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteStore(os.getenv("SESSION_DB_PATH", "sessions.db"))
+    if backend != "memory":
+        raise ValueError(f"Unknown SESSION_STORE backend: {backend}")
+    return MemoryStore()
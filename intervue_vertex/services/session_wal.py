@@ -0,0 +1,241 @@
+"""
+session_wal.py — Append-only write-ahead log for the in-memory session store.
+
+With SESSION_STORE=memory a restart would lose every live interview, so
+session_manager appends each mutation (start, message, message update,
+field update, end) to a log in SESSION_WAL_DIR and replays it on startup.
+
+On disk:
+  • log.<gen>       records as [u32 length][u32 crc32][compact JSON], written
+                    with one os.write each — a crashed process loses nothing
+                    the OS already has; fsync is batched every
+                    SESSION_WAL_FSYNC_MS by a background thread
+  • snapshot.<gen>  every live session as of the end of log.<gen> (and
+                    possibly a little after), same framing
+
+Every record carries the session version it produces, so records a snapshot
+already covers are skipped on replay, and a torn tail (short read or bad
+checksum) simply ends that log. Once a log passes SESSION_WAL_COMPACT_RECORDS
+records or SESSION_WAL_COMPACT_BYTES, the background thread rotates to a new
+log, snapshots the store and deletes everything the snapshot supersedes,
+which keeps recovery bounded by the number of live sessions plus one log.
+"""
+
+import os
+import json
+import zlib
+import struct
+import threading
+
+WAL_DIR          = os.getenv("SESSION_WAL_DIR", "session_wal")
+FSYNC_MS         = float(os.getenv("SESSION_WAL_FSYNC_MS", "100"))
+COMPACT_RECORDS  = int(os.getenv("SESSION_WAL_COMPACT_RECORDS", "20000"))
+COMPACT_BYTES    = int(os.getenv("SESSION_WAL_COMPACT_BYTES", str(64 * 1024 * 1024)))
+
+_HEADER = struct.Struct(">II")
+
+
+def _encode(record: dict) -> bytes:
+    payload = json.dumps(record, separators=(",", ":")).encode()
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_records(path: str):
+    """Yield records until EOF or the first torn / corrupt one."""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, crc = _HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                print(f"[WAL] Torn record in {path}, ignoring the tail")
+                return
+            yield json.loads(payload)
+
+
+def _fsync_dir(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SessionWAL:
+    def __init__(self, sessions_fn, directory: str = WAL_DIR):
+        """sessions_fn() -> iterable of live (session_id, session), for snapshots."""
+        self.sessions_fn = sessions_fn
+        self.dir = directory
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._fd: int | None = None
+        self._gen = 0
+        self._records = 0
+        self._bytes = 0
+        self._dirty = False
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self.counters = {"appended": 0, "fsyncs": 0, "compactions": 0, "replayed": 0}
+
+    # ── files ───────────────────────────────
+
+    def _gens(self, prefix: str) -> list[int]:
+        gens = []
+        if not os.path.isdir(self.dir):
+            return gens
+        for name in os.listdir(self.dir):
+            stem, _, gen = name.partition(".")
+            if stem == prefix and gen.isdigit():
+                gens.append(int(gen))
+        return sorted(gens)
+
+    def _path(self, prefix: str, gen: int) -> str:
+        return os.path.join(self.dir, f"{prefix}.{gen}")
+
+    def _open_log(self, gen: int):
+        self._fd = os.open(self._path("log", gen), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._gen = gen
+        self._records = 0
+        self._bytes = 0
+        _fsync_dir(self.dir)
+
+    # ── recovery ────────────────────────────
+
+    def replay(self):
+        """
+        Yield (session_id, record) from the latest snapshot, then from every
+        later log, in write order. Call once, before open().
+        """
+        snapshots = self._gens("snapshot")
+        base = snapshots[-1] if snapshots else -1
+        if snapshots:
+            for record in _read_records(self._path("snapshot", base)):
+                self.counters["replayed"] += 1
+                yield record["id"], record
+        for gen in self._gens("log"):
+            if gen > base:
+                for record in _read_records(self._path("log", gen)):
+                    self.counters["replayed"] += 1
+                    yield record["id"], record
+
+    def open(self):
+        """
+        Start logging. The recovered state is snapshotted straight away so
+        the logs just replayed (possibly with torn tails) can be dropped.
+        """
+        os.makedirs(self.dir, exist_ok=True)
+        existing = self._gens("log") + self._gens("snapshot")
+        gen = max(existing) + 1 if existing else 0
+        self._write_snapshot(gen, self.sessions_fn())
+        with self._lock:
+            self._open_log(gen + 1)
+        self._prune(gen)
+
+        self._thread = threading.Thread(target=self._run, name="session-wal", daemon=True)
+        self._thread.start()
+
+    # ── writing ─────────────────────────────
+
+    def append(self, session_id: str, record: dict):
+        """Log one mutation; `record` must hold "op" and the resulting "v"."""
+        data = _encode({"id": session_id, **record})
+        with self._lock:
+            if self._fd is None:
+                return  # not opened (or closed): nothing to recover into
+            os.write(self._fd, data)
+            self._records += 1
+            self._bytes += len(data)
+            self._dirty = True
+            self.counters["appended"] += 1
+
+    def _sync(self):
+        with self._lock:
+            if not self._dirty or self._fd is None:
+                return
+            fd, self._dirty = self._fd, False
+        os.fsync(fd)
+        self.counters["fsyncs"] += 1
+
+    def _compaction_due(self) -> bool:
+        with self._lock:
+            return self._records >= COMPACT_RECORDS or self._bytes >= COMPACT_BYTES
+
+    def compact(self):
+        """
+        Rotate to a new log, then snapshot sessions_fn() as the state as of
+        the end of the old one. Writes racing with the snapshot land in the
+        new log and are skipped on replay by version if already included.
+        """
+        with self._lock:
+            old_fd, sealed = self._fd, self._gen
+            self._open_log(sealed + 1)
+            self._dirty = False
+        os.fsync(old_fd)
+        os.close(old_fd)
+
+        self._write_snapshot(sealed, self.sessions_fn())
+        self._prune(sealed)
+        self.counters["compactions"] += 1
+
+    def _write_snapshot(self, gen: int, sessions):
+        path = self._path("snapshot", gen)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            for session_id, session in sessions:
+                f.write(_encode({
+                    "id": session_id,
+                    "op": "start",
+                    "v": session.get("version", 0),
+                    "session": session,
+                }))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(self.dir)
+
+    def _prune(self, upto: int):
+        """Delete logs and snapshots superseded by snapshot.<upto>."""
+        for gen in self._gens("log"):
+            if gen <= upto:
+                os.remove(self._path("log", gen))
+        for gen in self._gens("snapshot"):
+            if gen < upto:
+                os.remove(self._path("snapshot", gen))
+
+    # ── background ──────────────────────────
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._wake.wait(FSYNC_MS / 1000)
+                if self._closed:
+                    return
+            try:
+                self._sync()
+                if self._compaction_due():
+                    self.compact()
+            except Exception as e:
+                print(f"[WAL] Background sync failed: {e!r}")
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            fd, self._fd = self._fd, None
+            self._wake.notify_all()
+        if self._thread:
+            self._thread.join()
+        if fd is not None:
+            os.fsync(fd)
+            os.close(fd)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "dir": self.dir,
+                "generation": self._gen,
+                "log_records": self._records,
+                "log_bytes": self._bytes,
+                **self.counters,
+            }
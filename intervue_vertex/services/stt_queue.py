@@ -0,0 +1,100 @@
+"""
+stt_queue.py — Bounded executor for speech-to-text jobs.
+
+STT (the ElevenLabs SDK call, on audio already decoded through the ffmpeg
+pool) is blocking, so it runs on a dedicated thread pool of STT_WORKERS
+threads. At most STT_QUEUE further jobs may wait for a worker; beyond that
+submit() fails fast with STTBusy carrying a retry hint, instead of letting
+latency grow without bound.
+
+stats() exposes queue depth, running jobs and wait / service times so the
+worker count can be sized from real traffic.
+"""
+
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+STT_WORKERS = int(os.getenv("STT_WORKERS", "4"))
+STT_QUEUE   = int(os.getenv("STT_QUEUE", "16"))
+
+_pool = ThreadPoolExecutor(max_workers=STT_WORKERS, thread_name_prefix="stt")
+_lock = threading.Lock()
+
+_queued = 0
+_running = 0
+_counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+_waits = deque(maxlen=200)       # seconds spent queued
+_services = deque(maxlen=200)    # seconds spent running
+
+
+class STTBusy(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"STT queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _avg(values) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def _retry_after() -> int:
+    # Time for the current backlog to drain through the workers
+    service = _avg(_services) or 2.0
+    backlog = _queued + _running
+    return max(1, math.ceil(service * backlog / STT_WORKERS))
+
+
+async def submit(fn, *args):
+    """
+    Run fn(*args) on the STT pool and await the result.
+    Raises STTBusy immediately if the wait queue is full.
+    """
+    global _queued
+    with _lock:
+        if _queued + _running >= STT_WORKERS + STT_QUEUE:
+            _counters["rejected"] += 1
+            raise STTBusy(_retry_after())
+        _queued += 1
+        _counters["submitted"] += 1
+
+    enqueued = time.monotonic()
+
+    def job():
+        global _queued, _running
+        started = time.monotonic()
+        with _lock:
+            _queued -= 1
+            _running += 1
+            _waits.append(started - enqueued)
+        ok = False
+        try:
+            result = fn(*args)
+            ok = True
+            return result
+        finally:
+            with _lock:
+                _running -= 1
+                _services.append(time.monotonic() - started)
+                _counters["completed" if ok else "failed"] += 1
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, job)
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "workers": STT_WORKERS,
+            "queue_limit": STT_QUEUE,
+            "queued": _queued,
+            "running": _running,
+            **_counters,
+            "avg_wait_s": round(_avg(_waits), 3),
+            "max_wait_s": round(max(_waits), 3) if _waits else 0.0,
+            "avg_service_s": round(_avg(_services), 3),
+        }
@@ -0,0 +1,212 @@
+"""
+stt_stream.py — Incremental speech-to-text for audio streamed over a socket.
+
+One long-lived ffmpeg process per stream decodes the browser's webm/opus
+chunks (fed to stdin as they arrive) into 16 kHz mono PCM on stdout. The
+PCM is cut into segments at pauses (or every STT_WS_MAX_SEGMENT seconds),
+and each segment is transcribed through stt_queue as soon as it closes.
+While a segment is still open, every STT_WS_PARTIAL_EVERY seconds of new
+audio is transcribed on its own and appended to the partial transcript, so
+each second of speech is sent for a partial once rather than once per
+partial. The committed segment's transcript replaces those pieces.
+
+When the candidate stops, only the last open segment is left to transcribe,
+so the final transcript is ready moments later. finish() waits at most
+STT_WS_FINISH_TIMEOUT seconds for it and returns the segments that are done
+by then. PCM before the open segment is dropped, keeping memory bounded by
+the segment length.
+
+The same PCM feeds an EmotionStream, so windowed audio-emotion points are
+available while the candidate speaks and the whole-answer aggregate is set
+as `audio_emotion` by finish().
+"""
+
+import os
+import asyncio
+import numpy as np
+from services import stt_queue
+from services.audio_utils import PCM_SAMPLE_RATE
+from services.elevenlab_stt import speech_to_text_pcm
+from services.emotion_stream import EmotionStream
+
+PARTIAL_EVERY = float(os.getenv("STT_WS_PARTIAL_EVERY", "2.5"))
+MIN_SEGMENT   = float(os.getenv("STT_WS_MIN_SEGMENT", "2"))
+MAX_SEGMENT   = float(os.getenv("STT_WS_MAX_SEGMENT", "15"))
+PAUSE         = float(os.getenv("STT_WS_PAUSE", "0.5"))
+SILENCE_RMS   = float(os.getenv("STT_WS_SILENCE_RMS", "0.01"))
+MAX_BYTES     = int(os.getenv("STT_WS_MAX_BYTES", str(50 * 1024 * 1024)))
+FINISH_TIMEOUT = float(os.getenv("STT_WS_FINISH_TIMEOUT", "20"))
+
+_BUSY_RETRIES = 3
+
+
+class StreamTooLarge(Exception):
+    pass
+
+
+class StreamingTranscriber:
+    def __init__(self, on_partial, on_emotion=None, sr: int = PCM_SAMPLE_RATE):
+        """
+        on_partial: async callable receiving the best transcript so far.
+        on_emotion: optional async callable receiving each audio-emotion
+                    time-series point (see emotion_stream).
+        """
+        self.on_partial = on_partial
+        self.on_emotion = on_emotion
+        self.sr = sr
+        self.proc = None
+        self.reader = None
+        self.received = 0
+
+        self.pcm = np.zeros(0, dtype=np.float32)  # open segment only
+        self.pending = b""                         # partial float32 sample
+        self.since_partial = 0
+        self.partial_task = None
+        self.partial_from = 0                      # open PCM already sent for a partial
+        self.partial_texts = []                    # their transcripts, in order
+        self.segments = []                         # tasks, in order
+
+        self.emotion = EmotionStream(sr=sr)
+        self.audio_emotion = None                  # aggregate, set by finish()
+
+    # ── lifecycle ───────────────────────────
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-fflags", "nobuffer", "-i", "pipe:0",
+            "-f", "f32le", "-ac", "1", "-ar", str(self.sr), "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self.reader = asyncio.create_task(self._read_pcm())
+
+    async def feed(self, chunk: bytes):
+        self.received += len(chunk)
+        if self.received > MAX_BYTES:
+            raise StreamTooLarge(f"audio stream exceeded {MAX_BYTES} bytes")
+        self.proc.stdin.write(chunk)
+        await self.proc.stdin.drain()
+
+    async def finish(self) -> str:
+        """
+        Flush the decoder, transcribe the last segment, return the transcript.
+        Bounded by FINISH_TIMEOUT: segments still pending then are left out
+        (close() cancels them).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + FINISH_TIMEOUT
+        self.proc.stdin.close()
+        try:
+            await asyncio.wait_for(self._flush(), FINISH_TIMEOUT)
+        except asyncio.TimeoutError:
+            print("[STT] Decoder flush timed out, transcribing what was decoded")
+
+        if self.partial_task:
+            self.partial_task.cancel()
+        if len(self.pcm) >= 0.2 * self.sr:
+            self._commit(len(self.pcm))
+
+        points, self.audio_emotion = self.emotion.finish()
+        await self._emit_emotion(points)
+
+        if self.segments:
+            _, pending = await asyncio.wait(
+                self.segments, timeout=max(0.0, deadline - loop.time())
+            )
+            if pending:
+                print(f"[STT] {len(pending)} segment(s) unfinished at the deadline")
+        return self._committed_text().strip()
+
+    async def _flush(self):
+        await self.reader
+        await self.proc.wait()
+
+    async def close(self):
+        for task in [self.reader, self.partial_task, *self.segments]:
+            if task and not task.done():
+                task.cancel()
+        if self.proc and self.proc.returncode is None:
+            self.proc.kill()
+            await self.proc.wait()
+
+    # ── decoding + segmentation ─────────────
+
+    async def _read_pcm(self):
+        while True:
+            data = await self.proc.stdout.read(16384)
+            if not data:
+                return
+            data = self.pending + data
+            usable = len(data) - len(data) % 4
+            self.pending = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype=np.float32)
+
+            self.pcm = np.concatenate([self.pcm, samples])
+            self.since_partial += len(samples)
+            self._step()
+            await self._emit_emotion(self.emotion.feed(samples))
+
+    async def _emit_emotion(self, points: list[dict]):
+        if self.on_emotion:
+            for point in points:
+                await self.on_emotion(point)
+
+    def _paused(self) -> bool:
+        tail = self.pcm[-int(PAUSE * self.sr):]
+        return float(np.sqrt(np.mean(tail ** 2))) < SILENCE_RMS
+
+    def _step(self):
+        length = len(self.pcm) / self.sr
+        if length >= MAX_SEGMENT or (length >= MIN_SEGMENT and self._paused()):
+            self._commit(len(self.pcm))
+        elif self.since_partial >= PARTIAL_EVERY * self.sr:
+            if self.partial_task is None or self.partial_task.done():
+                # Only the audio no earlier partial has covered
+                tail = self.pcm[self.partial_from:].copy()
+                self.since_partial = 0
+                self.partial_from = len(self.pcm)
+                self.partial_task = asyncio.create_task(
+                    self._partial(tail, len(self.segments))
+                )
+
+    def _commit(self, end: int):
+        segment, self.pcm = self.pcm[:end], self.pcm[end:]
+        self.since_partial = 0
+        self.partial_from = 0
+        self.partial_texts = []
+        self.segments.append(asyncio.create_task(self._transcribe(segment)))
+
+    # ── transcription ───────────────────────
+
+    async def _transcribe(self, segment: np.ndarray) -> str:
+        for _ in range(_BUSY_RETRIES):
+            try:
+                return await stt_queue.submit(speech_to_text_pcm, segment, self.sr)
+            except stt_queue.STTBusy as e:
+                await asyncio.sleep(e.retry_after)
+        print("[STT] Segment dropped: STT queue stayed full")
+        return ""
+
+    def _committed_text(self) -> str:
+        texts = []
+        for task in self.segments:
+            if not task.done() or task.cancelled():
+                break
+            texts.append(task.result())
+        return " ".join(t for t in texts if t)
+
+    async def _partial(self, tail: np.ndarray, segment_no: int):
+        try:
+            text = await stt_queue.submit(speech_to_text_pcm, tail, self.sr)
+        except stt_queue.STTBusy:
+            if segment_no == len(self.segments):
+                self.partial_from -= len(tail)  # the next partial retries it
+            return  # partials are best-effort
+        if segment_no != len(self.segments):
+            return  # its segment was committed meanwhile; that transcript wins
+        if text:
+            self.partial_texts.append(text)
+        pieces = [self._committed_text(), *self.partial_texts]
+        await self.on_partial(" ".join(p for p in pieces if p))
@@ -0,0 +1,252 @@
+"""
+tts_cache.py — Content-addressed, byte-budgeted cache for TTS audio.
+
+Two tiers:
+  1. Memory — LRU of whole clips, bounded by TTS_CACHE_MEM_BYTES
+  2. Disk   — one <key>.mp3 per clip under TTS_CACHE_DIR, bounded by
+              TTS_CACHE_DISK_BYTES (oldest-used evicted first), served
+              through mmap so large clips are never copied into Python
+
+Keys hash (voice id, model id, voice settings, text), so any change to the
+voice configuration naturally misses. Misses are written through while they
+stream: chunks are collected as they go out and committed only when the
+upstream stream finished cleanly.
+"""
+
+import os
+import json
+import mmap
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+CACHE_DIR       = os.getenv("TTS_CACHE_DIR", "tts_cache")
+MEM_BUDGET      = int(os.getenv("TTS_CACHE_MEM_BYTES", str(32 * 1024 * 1024)))
+DISK_BUDGET     = int(os.getenv("TTS_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+CHUNK_SIZE      = 64 * 1024
+# Clips bigger than this stay on disk only (served via mmap)
+MAX_MEM_ENTRY   = MEM_BUDGET // 8
+# Unfinished writes older than this are leftovers of a crashed process
+PART_MAX_AGE_S  = 600
+
+_lock = threading.Lock()          # counters and the memory tier, never file I/O
+_evict_lock = threading.Lock()
+_mem: OrderedDict[str, bytes] = OrderedDict()
+_mem_bytes = 0
+_disk_bytes: int | None = None   # lazily scanned on first use
+
+
+def cache_key(voice_id: str, model_id: str, voice_settings: dict, text: str) -> str:
+    material = json.dumps(
+        [voice_id, model_id, voice_settings, text],
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.mp3")
+
+
+# ─────────────────────────────────────────────
+# Memory tier
+# ─────────────────────────────────────────────
+
+def _mem_get(key: str) -> bytes | None:
+    with _lock:
+        data = _mem.get(key)
+        if data is not None:
+            _mem.move_to_end(key)
+        return data
+
+
+def _mem_put(key: str, data: bytes):
+    global _mem_bytes
+    if len(data) > MAX_MEM_ENTRY:
+        return
+    with _lock:
+        old = _mem.pop(key, None)
+        if old is not None:
+            _mem_bytes -= len(old)
+        _mem[key] = data
+        _mem_bytes += len(data)
+        while _mem_bytes > MEM_BUDGET and _mem:
+            _, evicted = _mem.popitem(last=False)
+            _mem_bytes -= len(evicted)
+
+
+def _iter_bytes(data: bytes):
+    view = memoryview(data)
+    for i in range(0, len(view), CHUNK_SIZE):
+        yield bytes(view[i:i + CHUNK_SIZE])
+
+
+# ─────────────────────────────────────────────
+# Disk tier
+# ─────────────────────────────────────────────
+
+def _scan_disk() -> int:
+    """Bytes of committed clips; also sweeps .part files a crash left behind."""
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+    total = 0
+    now = time.time()
+    for entry in os.scandir(CACHE_DIR):
+        try:
+            if entry.name.endswith(".mp3"):
+                total += entry.stat().st_size
+            elif entry.name.endswith(".part") and now - entry.stat().st_mtime > PART_MAX_AGE_S:
+                os.remove(entry.path)  # young ones may be another worker's write
+        except OSError:
+            pass
+    return total
+
+
+def _disk_used() -> int:
+    global _disk_bytes
+    with _lock:
+        if _disk_bytes is not None:
+            return _disk_bytes
+    total = _scan_disk()  # first use in this process; no lock held for the I/O
+    with _lock:
+        if _disk_bytes is None:
+            _disk_bytes = total
+        return _disk_bytes
+
+
+def _evict_disk():
+    """Delete oldest-used clips until under budget. File I/O runs unlocked."""
+    global _disk_bytes
+    if not _evict_lock.acquire(blocking=False):
+        return  # another thread is already evicting
+    try:
+        entries = []
+        for entry in os.scandir(CACHE_DIR):
+            if entry.name.endswith(".mp3"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        with _lock:
+            excess = _disk_bytes - DISK_BUDGET
+        victims = []
+        for _, size, path in entries:
+            if excess <= 0:
+                break
+            victims.append((size, path))
+            excess -= size
+
+        removed = 0
+        for size, path in victims:
+            try:
+                os.remove(path)
+                removed += size
+            except OSError:
+                pass
+        with _lock:
+            _disk_bytes -= removed
+    finally:
+        _evict_lock.release()
+
+
+def _disk_put(key: str, data: bytes):
+    global _disk_bytes
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _disk_used()
+    path = _path(key)
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            replaced = os.path.getsize(path)  # overwriting the same key
+        except OSError:
+            replaced = 0
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    with _lock:
+        _disk_bytes += len(data) - replaced
+        over = _disk_bytes > DISK_BUDGET
+    if over:
+        _evict_disk()
+
+
+def _iter_mmap(path: str):
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for i in range(0, len(mm), CHUNK_SIZE):
+                yield mm[i:i + CHUNK_SIZE]
+
+
+# ─────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────
+
+def get(key: str):
+    """
+    Return an iterator of audio chunks for a cached clip, or None on a miss.
+    """
+    data = _mem_get(key)
+    if data is not None:
+        return _iter_bytes(data)
+
+    path = _path(key)
+    try:
+        size = os.path.getsize(path)
+        os.utime(path)  # refresh for oldest-used eviction
+    except OSError:
+        return None
+    if size == 0:
+        return None
+
+    if size <= MAX_MEM_ENTRY:
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                data = mm[:]
+        _mem_put(key, data)
+        return _iter_bytes(data)
+
+    return _iter_mmap(path)
+
+
+class Writer:
+    """Collects streamed chunks; commit() stores them in both tiers."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks = []
+
+    def append(self, chunk: bytes):
+        self.chunks.append(chunk)
+
+    def commit(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        if not data:
+            return
+        _mem_put(self.key, data)
+        try:
+            _disk_put(self.key, data)
+        except OSError as e:
+            print(f"[TTS] Cache write failed: {e}")
+
+
+def stats() -> dict:
+    disk_bytes = _disk_used()
+    with _lock:
+        return {
+            "memory_entries": len(_mem),
+            "memory_bytes": _mem_bytes,
+            "memory_budget": MEM_BUDGET,
+            "disk_bytes": disk_bytes,
+            "disk_budget": DISK_BUDGET,
+        }
@@ -2,11 +2,30 @@
 vertex_wrapper.py — Drop-in replacement using the AI fallback chain.
 Function name kept as evaluate_answer() so app.py imports still work.
 """
+import re
 import json
-from services.ai_fallback import ai_generate_json
+from services.ai_fallback import (
+    ai_generate_json,
+    ai_generate_json_async,
+    ai_stream_async,
+    parse_json_output,
+)
 
+SYSTEM = (
+    "You are a senior technical interviewer with human-like judgment. "
+    "Always respond with valid JSON only — no markdown, no text outside JSON."
+)
 
-def evaluate_answer(
+
+def _compact(value) -> str:
+    if not value:
+        return "Not available"
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _context(
     answer: str,
     skill: str,
     project: str | None,
@@ -14,13 +33,9 @@ def evaluate_answer(
     camera_metrics: dict | None = None,
     audio_emotion: dict | None = None,
     text_emotion: dict | None = None,
-) -> dict:
-    system = (
-        "You are a senior technical interviewer with human-like judgment. "
-        "Always respond with valid JSON only — no markdown, no text outside JSON."
-    )
-
-    prompt = f"""
+    history: str | None = None,
+) -> str:
+    return f"""
 You are evaluating a candidate in a live technical interview.
 
 Candidate Profile:
@@ -28,37 +43,157 @@ Candidate Profile:
 - Project: {project or "N/A"}
 
 GitHub Signals:
-{json.dumps(github_summary, indent=2) if github_summary else "Not available"}
+{_compact(github_summary)}
+
+Interview So Far:
+{history or "Not available"}
 
 Camera Behavior:
-{json.dumps(camera_metrics, indent=2) if camera_metrics else "Not available"}
+{_compact(camera_metrics)}
 
 Audio Emotion:
-{json.dumps(audio_emotion, indent=2) if audio_emotion else "Not available"}
+{_compact(audio_emotion)}
 
 Text Emotion:
-{json.dumps(text_emotion, indent=2) if text_emotion else "Not available"}
+{_compact(text_emotion)}
 
 Candidate Answer:
 {answer}
+"""
+
+
+def build_prompt(*args, **kwargs) -> str:
+    return _context(*args, **kwargs) + """
+TASK:
+1. Decide next best question (keep it concise, one sentence)
+2. Judge technical correctness
+3. Judge confidence & communication
+4. Adapt interviewer tone
+
+Return ONLY this JSON (next_question first):
+
+{
+  "next_question": "<next interview question>",
+  "score": <integer 0-10>,
+  "confidence_level": "low | medium | high",
+  "communication_feedback": "<one sentence>",
+  "technical_feedback": "<one sentence>",
+  "strengths": ["<strength1>"],
+  "weaknesses": ["<weakness1>"],
+  "interviewer_tone": "encouraging | neutral | challenging"
+}
+"""
+
+
+def build_selection_prompt(*args, options: dict, **kwargs) -> str:
+    """
+    Like build_prompt, but the next question is picked from precomputed
+    options instead of generated — a shorter, cheaper completion.
+    """
+    listed = "\n".join(f'- "{key}": {q}' for key, q in options.items())
+    return _context(*args, **kwargs) + f"""
+Prepared next questions:
+{listed}
 
 TASK:
-1. Judge technical correctness
-2. Judge confidence & communication
-3. Adapt interviewer tone
-4. Decide next best question (keep it concise, one sentence)
+1. Pick the prepared question that best fits this answer
+   (go deeper after a strong answer, easier after a weak one,
+   switch topic when this one is exhausted)
+2. Judge technical correctness
+3. Judge confidence & communication
+4. Adapt interviewer tone
 
-Return ONLY this JSON:
+Return ONLY this JSON (next_choice first):
 
 {{
+  "next_choice": "{' | '.join(options)}",
   "score": <integer 0-10>,
   "confidence_level": "low | medium | high",
   "communication_feedback": "<one sentence>",
   "technical_feedback": "<one sentence>",
   "strengths": ["<strength1>"],
   "weaknesses": ["<weakness1>"],
-  "next_question": "<next interview question>",
   "interviewer_tone": "encouraging | neutral | challenging"
 }}
 """
-    return ai_generate_json(prompt, system=system)
+
+
+def _pick(options: dict, choice: str | None) -> str:
+    return options.get(choice or "") or next(iter(options.values()))
+
+
+def evaluate_answer(*args, **kwargs) -> dict:
+    return ai_generate_json(build_prompt(*args, **kwargs), system=SYSTEM)
+
+
+async def evaluate_answer_async(*args, hedge: bool = False, memo: bool = False, **kwargs) -> dict:
+    return await ai_generate_json_async(
+        build_prompt(*args, **kwargs), system=SYSTEM, hedge=hedge, memo=memo
+    )
+
+
+async def select_followup_async(
+    *args, options: dict, hedge: bool = False, memo: bool = False, **kwargs
+) -> dict:
+    """
+    Score the answer and choose the next question from precomputed options.
+    If every provider failed, the first option is used instead of the
+    generic fallback question.
+    """
+    result = await ai_generate_json_async(
+        build_selection_prompt(*args, options=options, **kwargs),
+        system=SYSTEM, hedge=hedge, memo=memo,
+    )
+    result["next_question"] = _pick(options, result.pop("next_choice", None))
+    return result
+
+
+def _completed_field(buffer: str, key: str) -> str | None:
+    """Return a string field from partial JSON once its closing quote arrived."""
+    m = re.search(rf'"{key}"\s*:\s*"((?:[^"\\]|\\.)*)"', buffer)
+    if not m:
+        return None
+    try:
+        return json.loads(f'"{m.group(1)}"')
+    except ValueError:
+        return None
+
+
+async def stream_evaluation(*args, options: dict | None = None, **kwargs):
+    """
+    Stream the evaluation. Yields ("next_question", str) as soon as that
+    field is complete in the partial JSON, then ("evaluation", dict).
+    With precomputed options the selection prompt is used and the question
+    is known as soon as "next_choice" is.
+    Falls back to a regular (hedged) evaluation if the stream is unusable.
+    """
+    if options:
+        prompt = build_selection_prompt(*args, options=options, **kwargs)
+        field = "next_choice"
+    else:
+        prompt = build_prompt(*args, **kwargs)
+        field = "next_question"
+    buffer = ""
+    sent = None
+
+    async for delta in ai_stream_async(prompt, system=SYSTEM, want_json=True):
+        buffer += delta
+        if sent is None:
+            value = _completed_field(buffer, field)
+            if value:
+                sent = _pick(options, value) if options else value
+                yield "next_question", sent
+
+    result = parse_json_output(buffer) if buffer else None
+    if result is None:
+        result = await ai_generate_json_async(prompt, system=SYSTEM, hedge=True)
+    if options:
+        result["next_question"] = _pick(options, result.pop("next_choice", None))
+
+    if sent:
+        # Keep the evaluation consistent with what the candidate already heard
+        result["next_question"] = sent
+    else:
+        yield "next_question", result.get("next_question")
+
+    yield "evaluation", result
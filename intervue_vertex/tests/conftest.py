@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Keep tests hermetic: no provider keys, no state files in the working tree
+os.environ["GROQ_API_KEY"] = ""
+os.environ["GEMINI_API_KEY"] = ""
+os.environ["AI_QUOTA_PATH"] = ""
+os.environ["SESSION_STORE"] = "memory"
+os.environ["SESSION_WAL"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
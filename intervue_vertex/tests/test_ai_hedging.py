@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+
+from services import ai_fallback, provider_health
+
+
+class Provider:
+    def __init__(self, delay, value):
+        self.delay = delay
+        self.value = value
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self, prompt, system, want_json=False):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.value
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    monkeypatch.setattr(provider_health, "_health", {})
+    provider_health.register("a", 0.01)
+    provider_health.register("b", 0.02)
+    monkeypatch.setattr(ai_fallback, "_HEDGE_MIN_DELAY", 0.01)
+
+    def install(a, b):
+        monkeypatch.setitem(ai_fallback._PROVIDERS, "a", a)
+        monkeypatch.setitem(ai_fallback._PROVIDERS, "b", b)
+        return a, b
+
+    return install
+
+
+def _chain(hedge):
+    return ai_fallback._run_chain(["a", "b"], "prompt", "system", False, hedge, hedge)
+
+
+def test_slow_provider_is_hedged_and_the_loser_cancelled(providers):
+    a, b = providers(Provider(5, "from a"), Provider(0, "from b"))
+
+    started = time.monotonic()
+    assert asyncio.run(_chain(hedge=True)) == "from b"
+    assert time.monotonic() - started < 1
+    assert a.cancelled == 1 and b.calls == 1
+    assert provider_health.get("a").hedged == 1
+    assert provider_health.get("b").hedge_launches == 1
+    assert provider_health.get("b").hedge_wins == 1
+
+
+def test_without_hedging_a_slow_provider_is_waited_for(providers):
+    a, b = providers(Provider(0.1, "from a"), Provider(0, "from b"))
+    assert asyncio.run(_chain(hedge=False)) == "from a"
+    assert b.calls == 0
+
+
+def test_failed_provider_falls_through(providers):
+    a, b = providers(Provider(0, None), Provider(0, "from b"))
+    assert asyncio.run(_chain(hedge=False)) == "from b"
+    assert provider_health.get("a").failures == 1
+
+
+def test_every_provider_failing_returns_none(providers):
+    providers(Provider(0, None), Provider(0, ""))
+    assert asyncio.run(_chain(hedge=True)) is None
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from services import ai_fallback
+from services.ai_fallback import _memoized
+
+
+@pytest.fixture(autouse=True)
+def clean_memo(monkeypatch):
+    monkeypatch.setattr(ai_fallback, "_MEMO_DIR", "")
+    ai_fallback._memo.clear()
+    ai_fallback._inflight.clear()
+    yield
+    ai_fallback._memo.clear()
+    ai_fallback._inflight.clear()
+
+
+class Upstream:
+    """produce() stand-in that blocks until released."""
+
+    def __init__(self, value="answer"):
+        self.value = value
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.value
+
+
+def _never_fallback(value):
+    return False
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        upstream = Upstream({"score": 7})
+        callers = [asyncio.create_task(_memoized("k", upstream, _never_fallback)) for _ in range(3)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        results = await asyncio.gather(*callers)
+        return upstream, results
+
+    upstream, results = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert results == [{"score": 7}] * 3
+    assert results[0] is not results[1]  # each caller gets its own copy
+
+
+def test_joiner_survives_first_caller_cancellation():
+    async def scenario():
+        upstream = Upstream()
+        first = asyncio.create_task(_memoized("k", upstream, _never_fallback))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(_memoized("k", upstream, _never_fallback))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        upstream.release.set()
+        return upstream, await joiner
+
+    upstream, value = asyncio.run(scenario())
+    assert value == "answer"
+    assert upstream.calls == 1 and upstream.cancelled == 0
+
+
+def test_call_cancelled_when_every_caller_gives_up():
+    async def scenario():
+        upstream = Upstream()
+        callers = [asyncio.create_task(_memoized("k", upstream, _never_fallback)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for task in callers:
+            task.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert "k" not in ai_fallback._inflight
+
+        # A later caller starts a fresh call instead of joining the dead one
+        upstream.release.set()
+        value = await _memoized("k", upstream, _never_fallback)
+        return upstream, value
+
+    upstream, value = asyncio.run(scenario())
+    assert upstream.cancelled == 1
+    assert upstream.calls == 2
+    assert value == "answer"
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    async def failing():
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    async def scenario():
+        callers = [asyncio.create_task(_memoized("k", failing, _never_fallback)) for _ in range(2)]
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert "k" not in ai_fallback._memo
+
+
+def test_fallback_results_are_not_memoized():
+    async def scenario():
+        upstream = Upstream(ai_fallback.TEXT_FALLBACK)
+        upstream.release.set()
+        is_fallback = lambda v: v == ai_fallback.TEXT_FALLBACK
+        await _memoized("k", upstream, is_fallback)
+        await _memoized("k", upstream, is_fallback)
+        return upstream
+
+    assert asyncio.run(scenario()).calls == 2
@@ -0,0 +1,85 @@
+import re
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from services import vertex_wrapper, session_manager
+
+EVALUATION = {
+    "next_question": "How would you shard that table?",
+    "score": 7,
+    "confidence_level": "high",
+    "communication_feedback": "Clear.",
+    "technical_feedback": "Solid.",
+    "strengths": ["indexing"],
+    "weaknesses": [],
+    "interviewer_tone": "neutral",
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # No background AI work: follow-up speculation and memory folds
+    monkeypatch.setattr(app_module, "schedule_followups", lambda *a, **k: None)
+    monkeypatch.setattr(app_module.conversation_memory, "schedule_fold", lambda *a, **k: None)
+    return TestClient(app_module.app)
+
+
+def test_next_question_event_precedes_evaluation_fields(client, monkeypatch):
+    log = []
+
+    async def fake_stream(prompt, system, want_json):
+        # Emit fields in the order the prompt's schema asks for
+        keys = re.findall(r'^\s*"(\w+)"\s*:', prompt[prompt.rindex("{"):], re.M)
+        yield "{"
+        for i, key in enumerate(keys):
+            log.append(("field", key))
+            yield ("," if i else "") + f'"{key}": {json.dumps(EVALUATION[key])}'
+        yield "}"
+
+    real_sse = app_module._sse
+
+    def recording_sse(event, data):
+        log.append(("sse", event))
+        return real_sse(event, data)
+
+    monkeypatch.setattr(vertex_wrapper, "ai_stream_async", fake_stream)
+    monkeypatch.setattr(app_module, "_sse", recording_sse)
+
+    session_manager.start_session("s-stream", {}, "Databases", None, "Hello!")
+    session_manager.update_session("s-stream", first_question_used=True)
+
+    resp = client.post("/answer/stream", data={
+        "session_id": "s-stream", "answer": "I would add an index.",
+    })
+    assert resp.status_code == 200
+    events = re.findall(r"^event: (\w+)", resp.text, re.M)
+    assert events == ["next_question", "evaluation"]
+
+    first_sse = log.index(("sse", "next_question"))
+    fields_before = [name for kind, name in log[:first_sse] if kind == "field"]
+    assert fields_before == ["next_question"]
+
+
+def test_retry_after_a_dropped_stream_reuses_the_recorded_turn(client, monkeypatch):
+    async def fake_stream(prompt, system, want_json):
+        yield json.dumps(EVALUATION)
+
+    monkeypatch.setattr(vertex_wrapper, "ai_stream_async", fake_stream)
+
+    session_manager.start_session("s-stream-retry", {}, "Databases", None, "Hello!")
+    session_manager.update_session("s-stream-retry", first_question_used=True)
+    # The first submission recorded the answer, then the stream dropped
+    session_manager.add_message("s-stream-retry", "candidate", "I would add an index.")
+
+    resp = client.post("/answer/stream", data={
+        "session_id": "s-stream-retry", "answer": "I would add an index.",
+    })
+    assert re.findall(r"^event: (\w+)", resp.text, re.M) == ["next_question", "evaluation"]
+
+    messages = session_manager.get_session("s-stream-retry")["messages"]
+    assert [m["role"] for m in messages] == ["interviewer", "candidate", "interviewer"]
+    assert messages[1]["evaluation"]["score"] == 7
+    assert messages[2]["text"] == EVALUATION["next_question"]
@@ -0,0 +1,100 @@
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+from services import cohort, scoring
+
+
+def _session(skill, *turns):
+    messages = [{"role": "interviewer", "text": "Hello!"}]
+    for text_em, audio_em, cam, score in turns:
+        messages.append({
+            "role": "candidate",
+            "text_emotion": text_em,
+            "audio_emotion": audio_em,
+            "camera_metrics": cam,
+            "evaluation": {"score": score} if score is not None else {},
+        })
+    return {"skill": skill, "messages": messages}
+
+
+SESSIONS = [
+    ("a", _session(
+        "Databases",
+        ({"emotion": "happy"}, {"score": 0.7}, {"eye_contact": 0.9, "stillness": 0.4}, 8),
+        ({"emotion": "concerned"}, {}, {"dominant_expression": "happy", "expression_score": 0.5}, None),
+    )),
+    ("b", _session(
+        "Python",
+        ({"emotion": "surprised"}, {"score": 0.2}, {"distraction": 0.5, "eye_contact": 0.6}, 3),
+        ({}, None, None, 6),
+    )),
+]
+
+
+def test_vectorized_confidence_matches_the_per_turn_formula():
+    table = cohort.TurnTable(SESSIONS)
+    expected = [
+        scoring.compute_confidence(m["camera_metrics"], m["audio_emotion"], m["text_emotion"])
+        for _, s in SESSIONS for m in s["messages"] if m["role"] == "candidate"
+    ]
+    assert table.confidence().tolist() == pytest.approx(expected, abs=0.011)
+
+
+def test_text_weights_follow_the_shared_table(monkeypatch):
+    monkeypatch.setitem(scoring.TEXT_WEIGHT, "concerned", 0.0)
+    table = cohort.TurnTable(SESSIONS)
+    assert table.textual.tolist() == [1.0, 0.0, 0.6, 0.6]
+
+
+def test_all_weights_are_shared_with_the_per_turn_formula(monkeypatch):
+    monkeypatch.setattr(scoring, "VOCAL_WEIGHT", 0.0)
+    monkeypatch.setattr(scoring, "EYE_WEIGHT", 1.0)
+    table = cohort.TurnTable(SESSIONS)
+    expected = [
+        scoring.compute_confidence(m["camera_metrics"], m["audio_emotion"], m["text_emotion"])
+        for _, s in SESSIONS for m in s["messages"] if m["role"] == "candidate"
+    ]
+    assert table.confidence().tolist() == pytest.approx(expected, abs=0.011)
+
+
+def _cli(tmp_path, **env):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.run(
+        [sys.executable, "-m", "services.cohort", "--out", str(tmp_path / "out" / "cohort")],
+        cwd=root, capture_output=True, text=True,
+        env={**os.environ, "SESSION_STORE": "memory", **env},
+    )
+
+
+def test_cli_exports_sessions_from_the_write_ahead_log(tmp_path, monkeypatch):
+    from services import session_manager
+    from services.session_store import MemoryStore
+    from services.session_wal import SessionWAL
+
+    store = MemoryStore()
+    wal = SessionWAL(store.items, directory=str(tmp_path / "wal"))
+    monkeypatch.setattr(session_manager, "store", store)
+    monkeypatch.setattr(session_manager, "wal", wal)
+    session_manager.recover()
+    for session_id, skill in (("s-cohort-a", "Databases"), ("s-cohort-b", "Python")):
+        session_manager.start_session(session_id, {}, skill, None, "Hello!")
+        index = session_manager.add_message(session_id, "candidate", "An answer.")
+        session_manager.update_message(session_id, index, evaluation={"score": 7})
+    wal.close()
+
+    out = _cli(tmp_path, SESSION_WAL="1", SESSION_WAL_DIR=str(tmp_path / "wal"))
+    assert out.returncode == 0, out.stderr
+    [turns] = [p for p in out.stdout.split() if p.endswith("turns.csv")]
+    with open(turns) as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 2
+
+
+def test_cli_refuses_a_memory_store_without_a_log(tmp_path):
+    out = _cli(tmp_path, SESSION_WAL="0")
+    assert out.returncode == 2
+    assert "JSONL" in out.stderr
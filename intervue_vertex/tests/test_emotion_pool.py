@@ -0,0 +1,176 @@
+import asyncio
+import subprocess
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from services import emotion_pool
+
+
+class FakePool:
+    """Executor stand-in whose jobs never finish unless told to."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.submitted = []
+        self.futures = []
+        self.shutdown_args = None
+
+    def submit(self, fn, *args):
+        if self.fail:
+            raise RuntimeError("cannot spawn")
+        self.submitted.append(fn)
+        self.futures.append(Future())
+        return self.futures[-1]
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdown_args = (wait, cancel_futures)
+
+
+@pytest.fixture(autouse=True)
+def reset_pool(monkeypatch):
+    monkeypatch.setattr(emotion_pool, "_pool", None)
+    monkeypatch.setattr(emotion_pool, "_in_process", False)
+    monkeypatch.setattr(emotion_pool, "_pending", 0)
+
+    async def decode(audio_bytes):
+        return np.zeros(16000, dtype=np.float32)
+
+    monkeypatch.setattr(emotion_pool, "decode_pcm_async", decode)
+
+
+def test_worker_module_does_not_import_session_or_report_layers():
+    code = (
+        "import sys; import services.emotion; "
+        "print(sorted(m for m in ('services.session_manager', 'services.report', 'reportlab') "
+        "if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         cwd=emotion_pool.__file__.rsplit("/services/", 1)[0], check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_warm_failure_falls_back_to_in_process(monkeypatch):
+    monkeypatch.setattr(emotion_pool, "_new_pool", lambda: FakePool(fail=True))
+    emotion_pool.warm()  # must not raise
+    assert emotion_pool.stats()["mode"] == "in_process"
+
+    result = asyncio.run(emotion_pool.analyze(b"audio"))
+    assert result["emotion"] in {"happy", "neutral", "concerned"}
+    assert "error" not in result["features"]
+
+
+def test_timeout_replaces_pool_through_public_api(monkeypatch):
+    stuck, fresh = FakePool(), FakePool()
+    pools = iter([stuck, fresh])
+    monkeypatch.setattr(emotion_pool, "_new_pool", lambda: next(pools))
+    monkeypatch.setattr(emotion_pool, "EMOTION_TIMEOUT_S", 0.05)
+
+    result = asyncio.run(emotion_pool.analyze(b"audio"))
+
+    assert "timed out" in result["features"]["error"]
+    assert stuck.shutdown_args == (False, True)
+    assert emotion_pool._pool is fresh
+    assert fresh.submitted  # re-warmed in the background
+    assert emotion_pool.stats()["recycled"] >= 1
+
+
+def test_parked_answer_job_attaches_without_decoding(monkeypatch):
+    monkeypatch.setattr(emotion_pool, "_in_process", True)
+    monkeypatch.setattr(emotion_pool, "pool_analyze", lambda pcm, sr: {"emotion": "happy", "score": 0.8})
+
+    async def no_decode(audio_bytes):
+        raise AssertionError("PCM from /stt/live must not be decoded again")
+
+    monkeypatch.setattr(emotion_pool, "decode_pcm_async", no_decode)
+    attached = []
+
+    async def update_message_async(session_id, index, **fields):
+        attached.append((session_id, index, fields))
+
+    monkeypatch.setattr(emotion_pool, "update_message_async", update_message_async)
+
+    async def scenario():
+        emotion_pool.start_for_answer("s1", np.zeros(1600, dtype=np.float32))
+        assert emotion_pool.attach_answer("s1", 3)
+        assert not emotion_pool.attach_answer("s1", 3)  # consumed
+        await asyncio.gather(*emotion_pool._attaching)
+
+    asyncio.run(scenario())
+    assert attached == [("s1", 3, {"audio_emotion": {"emotion": "happy", "score": 0.8}})]
+
+
+def test_newer_answer_supersedes_parked_job(monkeypatch):
+    monkeypatch.setattr(emotion_pool, "_in_process", True)
+
+    async def scenario():
+        emotion_pool.start_for_answer("s1", np.zeros(16, dtype=np.float32))
+        first = emotion_pool._answer_jobs["s1"]
+        emotion_pool.start_for_answer("s1", np.zeros(16, dtype=np.float32))
+        await asyncio.sleep(0)
+        assert first.cancelled()
+        emotion_pool.discard_answer("s1")
+        assert "s1" not in emotion_pool._answer_jobs
+
+    asyncio.run(scenario())
+
+
+def test_deadline_does_not_count_time_queued_behind_other_jobs(monkeypatch):
+    busy = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(emotion_pool, "_new_pool", lambda: busy)
+    monkeypatch.setattr(emotion_pool, "EMOTION_WORKERS", 1)
+    monkeypatch.setattr(emotion_pool, "EMOTION_TIMEOUT_S", 0.3)
+
+    def slow_analyze(pcm, sr):
+        time.sleep(0.15)
+        return {"emotion": "happy", "score": 0.8, "features": {}}
+
+    monkeypatch.setattr(emotion_pool, "pool_analyze", slow_analyze)
+    recycled = emotion_pool.stats()["recycled"]
+
+    async def scenario():
+        pcm = np.zeros(16, dtype=np.float32)
+        return await asyncio.gather(*(emotion_pool.analyze_pcm(pcm) for _ in range(4)))
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        busy.shutdown()
+    assert [r["emotion"] for r in results] == ["happy"] * 4
+    assert emotion_pool.stats()["recycled"] == recycled
+
+
+def test_job_dropped_by_a_recycle_returns_neutral(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(emotion_pool, "_new_pool", lambda: pool)
+
+    async def scenario():
+        task = asyncio.create_task(emotion_pool.analyze(b"audio"))
+        while not pool.futures:
+            await asyncio.sleep(0)
+        pool.futures[0].cancel()  # what shutdown(cancel_futures=True) does
+        return await task
+
+    result = asyncio.run(scenario())
+    assert result["emotion"] == "neutral"
+    assert "recycled" in result["features"]["error"]
+
+
+def test_caller_cancellation_still_propagates(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(emotion_pool, "_new_pool", lambda: pool)
+    cancelled = emotion_pool.stats()["cancelled"]
+
+    async def scenario():
+        task = asyncio.create_task(emotion_pool.analyze(b"audio"))
+        while not pool.futures:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert emotion_pool.stats()["cancelled"] == cancelled + 1
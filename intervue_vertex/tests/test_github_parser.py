@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services import github_parser
+
+REPOS = [
+    {"name": "api", "fork": False, "language": "Python",
+     "description": "FastAPI service", "owner": {"login": "ana"}, "topics": ["x"] * 50},
+    {"name": "fork", "fork": True, "language": "Go", "description": "react fork"},
+    {"name": "ui", "fork": False, "language": "TypeScript", "description": "React + Tailwind"},
+]
+
+
+@pytest.fixture
+def github(monkeypatch):
+    github_parser._cache.clear()
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=REPOS, headers={"ETag": '"v1"'})
+
+    def client():
+        loop = asyncio.get_running_loop()
+        if loop not in github_parser._clients:
+            github_parser._clients[loop] = httpx.AsyncClient(
+                base_url="https://api.github.com", transport=httpx.MockTransport(handler)
+            )
+        return github_parser._clients[loop]
+
+    monkeypatch.setattr(github_parser, "_client", client)
+    yield requests
+    github_parser._cache.clear()
+
+
+def test_pages_cache_only_what_the_summary_reads(github):
+    profile = asyncio.run(github_parser.fetch_github_profile_async("Ana"))
+    assert profile["source"] == "network"
+    assert profile["languages"] == ["python", "typescript"]
+    assert set(profile["skills"]) == {"fastapi", "react", "tailwind"}
+
+    etag, repos = github_parser._cache["ana"]["pages"][1]
+    assert etag == '"v1"'
+    assert repos == [
+        (False, "Python", "FastAPI service"),
+        (True, "Go", "react fork"),
+        (False, "TypeScript", "React + Tailwind"),
+    ]
+
+
+def test_expired_profile_is_revalidated_with_the_etag(github, monkeypatch):
+    first = asyncio.run(github_parser.fetch_github_profile_async("ana"))
+    monkeypatch.setattr(github_parser, "CACHE_TTL_S", 0)
+    again = asyncio.run(github_parser.fetch_github_profile_async("ana"))
+    assert again["source"] == "revalidated"
+    assert {k: v for k, v in again.items() if k != "source"} == \
+        {k: v for k, v in first.items() if k != "source"}
+    assert github[-1].headers["If-None-Match"] == '"v1"'
+
+
+def test_close_clients_closes_the_loop_client(github):
+    async def scenario():
+        await github_parser.fetch_github_profile_async("ana")
+        client = github_parser._clients[asyncio.get_running_loop()]
+        await github_parser.close_clients()
+        return client
+
+    client = asyncio.run(scenario())
+    assert client.is_closed
+    assert not len(github_parser._clients)
@@ -0,0 +1,99 @@
+import pytest
+
+from services import provider_health
+from services.provider_health import CLOSED, HALF_OPEN, OPEN, ProviderHealth
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(provider_health, "time", clock)
+    monkeypatch.setattr(provider_health, "MIN_CALLS", 3)
+    monkeypatch.setattr(provider_health, "ERROR_RATE", 0.5)
+    monkeypatch.setattr(provider_health, "COOLDOWN_S", 30)
+    monkeypatch.setattr(provider_health, "MAX_COOLDOWN", 100)
+    return clock
+
+
+def _tripped(clock):
+    health = ProviderHealth("p", 1.0)
+    for ok in (True, False, False):
+        health.record(ok, 0.5)
+    return health
+
+
+def test_breaker_opens_on_error_rate_and_skips_calls(clock):
+    health = ProviderHealth("p", 1.0)
+    health.record(False, 0.1)
+    health.record(False, 0.1)
+    assert health.state == CLOSED  # below MIN_CALLS
+    health.record(False, 0.1)
+    assert health.state == OPEN
+    assert not health.allow()
+
+
+def test_half_open_lets_one_probe_through(clock):
+    health = _tripped(clock)
+    clock.now += 30
+    assert health.allow()
+    assert health.state == HALF_OPEN
+    assert not health.allow()  # probe slot taken
+    health.release()           # probe cancelled without an outcome
+    assert health.allow()
+
+
+def test_probe_success_closes_and_failure_doubles_the_cooldown(clock):
+    health = _tripped(clock)
+    clock.now += 30
+    assert health.allow()
+    health.record(False, 0.1)
+    assert health.state == OPEN and health.cooldown == 60
+
+    clock.now += 59
+    assert not health.allow()
+    clock.now += 1
+    assert health.allow()
+    health.record(False, 0.1)
+    assert health.cooldown == 100  # capped
+
+    clock.now += 100
+    assert health.allow()
+    health.record(True, 0.2)
+    assert health.state == CLOSED and health.cooldown == 30
+    assert health.allow()
+
+
+def test_old_outcomes_leave_the_window(clock, monkeypatch):
+    monkeypatch.setattr(provider_health, "WINDOW_S", 60)
+    health = ProviderHealth("p", 1.0)
+    health.record(False, 0.1)
+    health.record(False, 0.1)
+    clock.now += 61
+    health.record(False, 0.1)
+    assert health.state == CLOSED
+    assert health.error_rate() == 1.0 and len(health.outcomes) == 1
+
+
+def test_slow_or_flaky_providers_drift_down_and_recover(clock, monkeypatch):
+    monkeypatch.setattr(provider_health, "_health", {})
+    provider_health.register("fast", 1.0)
+    provider_health.register("slow", 2.0)
+    assert provider_health.ordered(["fast", "slow"]) == ["fast", "slow"]
+
+    for _ in range(4):
+        provider_health.record("fast", False, 0.1)
+    assert provider_health.ordered(["fast", "slow"]) == ["slow", "fast"]
+
+    # Idle long enough, the failures decay and the static order returns
+    clock.now += 20 * provider_health.RECOVERY_HALF_LIFE_S
+    assert provider_health.ordered(["fast", "slow"]) == ["fast", "slow"]
+    # A penalty (quota pressure) multiplies the cost
+    assert provider_health.ordered(["fast", "slow"], {"fast": 3.0, "slow": 1.0}.get) == ["slow", "fast"]
@@ -0,0 +1,186 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from services import provider_quota
+from services.provider_quota import ProviderQuota, SharedBuckets, TokenBucket, _take
+
+
+def test_bucket_refills_at_its_rate_up_to_capacity():
+    bucket = TokenBucket(60, 60)  # one token per second
+    bucket.tokens, bucket.updated = 0.0, 1000.0
+    assert bucket.available(1030.0) == pytest.approx(30)
+    assert bucket.available(1010.0) == pytest.approx(30)  # clock going back adds nothing
+    assert bucket.available(5000.0) == 60
+    assert bucket.wait_s(5000.0, floor=60) == pytest.approx(1)
+
+
+def test_background_is_shed_at_the_reserve_and_critical_drains_it(monkeypatch):
+    monkeypatch.setattr(provider_quota, "RESERVE", 0.2)
+    now = 1000.0
+    buckets = {"minute": TokenBucket(10, 60)}
+    buckets["minute"].updated = now
+
+    background = sum(_take(buckets, False, now) for _ in range(20))
+    assert background == 8  # the last 20% stays for critical calls
+    critical = sum(_take(buckets, True, now) for _ in range(20))
+    assert critical == 2
+    assert buckets["minute"].tokens == 0
+
+
+def test_tightest_bucket_decides_and_nothing_is_taken_on_refusal():
+    now = 1000.0
+    buckets = {"minute": TokenBucket(10, 60), "day": TokenBucket(3, 86_400)}
+    for bucket in buckets.values():
+        bucket.updated = now
+    assert sum(_take(buckets, True, now) for _ in range(5)) == 3
+    assert buckets["minute"].tokens == 7
+
+
+def test_counters_and_pressure():
+    quota = ProviderQuota("p", rpm=10, rpd=0)
+    assert quota.pressure() == pytest.approx(1.0)
+    while quota.acquire(critical=False):
+        pass
+    assert quota.acquire(critical=True)
+    snap = quota.snapshot()
+    assert snap["granted"] == {"critical": 1, "background": 8}
+    assert snap["refused"] == {"critical": 0, "background": 1}
+    assert quota.pressure() > 5
+
+
+def test_workers_share_one_quota(tmp_path):
+    path = str(tmp_path / "quota.db")
+    workers = [SharedBuckets(path, busy_timeout=5) for _ in range(3)]
+    specs = {"minute": (10, 60), "day": (1000, 86_400)}
+    granted = []
+
+    def worker(shared):
+        for _ in range(10):
+            ok, _ = shared._thread.submit(shared.take, "p", specs, True, 1000.0).result()
+            granted.append(ok)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for w in workers:
+        w.close()
+
+    assert sum(granted) == 10  # not 10 per worker
+    later = SharedBuckets(path)
+    levels = later._thread.submit(later.load, "p").result()
+    later.close()
+    assert levels["minute"] == (0.0, 1000.0)
+    assert levels["day"] == (990.0, 1000.0)
+
+
+def test_acquire_async_uses_shared_levels_off_the_loop(tmp_path, monkeypatch):
+    shared = SharedBuckets(str(tmp_path / "quota.db"))
+    monkeypatch.setattr(provider_quota, "_shared", shared)
+    monkeypatch.setitem(provider_quota._quotas, "p", ProviderQuota("p", rpm=5, rpd=0))
+    seen = []
+    real_take = shared.take
+
+    def recording_take(*args):
+        seen.append(threading.current_thread().name)
+        return real_take(*args)
+
+    monkeypatch.setattr(shared, "take", recording_take)
+
+    async def main():
+        return [await provider_quota.acquire_async("p", True) for _ in range(6)]
+
+    try:
+        assert asyncio.run(main()) == [True] * 5 + [False]
+    finally:
+        shared.close()
+    assert all(name.startswith("ai-quota") for name in seen)
+    quota = provider_quota._quotas["p"]
+    assert quota.buckets["minute"].tokens < 1
+    assert quota.granted["critical"] == 5 and quota.refused["critical"] == 1
+
+
+def test_locked_database_falls_back_to_the_local_view(tmp_path, monkeypatch):
+    path = str(tmp_path / "quota.db")
+    shared = SharedBuckets(path, busy_timeout=0.05)
+    shared._thread.submit(shared._db).result()
+    monkeypatch.setattr(provider_quota, "_shared", shared)
+    monkeypatch.setitem(provider_quota._quotas, "p", ProviderQuota("p", rpm=5, rpd=0))
+
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        assert asyncio.run(provider_quota.acquire_async("p", False))
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+        shared.close()
+    assert provider_quota._quotas["p"].shared_errors == 1
+
+
+def test_first_question_is_not_background_traffic(monkeypatch):
+    from services import question_prefetch
+
+    calls = []
+
+    async def fake_generate(prompt, **kwargs):
+        calls.append(kwargs)
+        return None
+
+    monkeypatch.setattr(question_prefetch, "gemini_generate_async", fake_generate)
+    asyncio.run(question_prefetch._first_question("s-quota", {}, "Databases", None))
+    assert calls and calls[0]["critical"] is True
+
+
+def test_importing_the_engine_has_no_side_effects(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    probe = (
+        "import threading, services.ai_fallback; "
+        "print(sorted(t.name.split('_')[0] for t in threading.enumerate()))"
+    )
+    env = {k: v for k, v in os.environ.items() if k != "AI_QUOTA_PATH"}
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", probe], cwd=tmp_path, env=env,
+                         capture_output=True, text=True, check=True)
+    assert "ai-quota" not in out.stdout
+    assert not list(tmp_path.glob("ai_quota.db*"))
+
+
+def test_close_releases_the_store_even_if_the_engine_never_ran(tmp_path, monkeypatch):
+    from services import ai_fallback
+
+    monkeypatch.setattr(provider_quota, "PATH", str(tmp_path / "quota.db"))
+    monkeypatch.setattr(provider_quota, "_shared", None)
+    monkeypatch.setattr(ai_fallback, "_loop", None)
+
+    ai_fallback.open_quotas()
+    shared = provider_quota._shared
+    assert shared is not None and (tmp_path / "quota.db").exists()
+
+    ai_fallback.close_clients()
+    assert provider_quota._shared is None
+    assert shared._conn is None
+    with pytest.raises(RuntimeError):
+        shared._thread.submit(lambda: None)
+
+
+def test_provider_stats_reads_quota_on_the_engine_loop(monkeypatch):
+    from services import ai_fallback
+
+    threads = []
+    real_snapshot = provider_quota.snapshot
+
+    def recording_snapshot():
+        threads.append(threading.current_thread().name)
+        return real_snapshot()
+
+    monkeypatch.setattr(provider_quota, "snapshot", recording_snapshot)
+    stats = ai_fallback.provider_stats()
+    assert "quota" in stats and threads == ["ai-engine"]
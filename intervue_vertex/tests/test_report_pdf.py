@@ -0,0 +1,85 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from services import report_pdf, session_manager
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+
+    def fake_render(report):
+        calls.append(report)
+        return b"%PDF-" + str(len(calls)).encode()
+
+    report_pdf._cache.clear()
+    monkeypatch.setattr(report_pdf, "render_pdf", fake_render)
+    return calls
+
+
+@pytest.fixture
+def client():
+    return TestClient(app_module.app)
+
+
+def test_etag_304_and_cache_follow_the_session_version(client, renders):
+    session_manager.start_session("s-pdf", {}, "Databases", None, "Hello!")
+
+    first = client.get("/report/s-pdf/pdf")
+    assert first.status_code == 200
+    assert first.content == b"%PDF-1"
+    etag = first.headers["etag"]
+
+    cached = client.get("/report/s-pdf/pdf")
+    assert cached.content == b"%PDF-1"
+    assert cached.headers["etag"] == etag
+
+    unchanged = client.get("/report/s-pdf/pdf", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert len(renders) == 1
+
+    session_manager.add_message("s-pdf", "candidate", "An index on user_id.")
+    changed = client.get("/report/s-pdf/pdf", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.content == b"%PDF-2"
+    assert len(renders) == 2
+
+
+def test_unknown_session_is_404(client, renders):
+    assert client.get("/report/nope/pdf").status_code == 404
+    assert renders == []
+
+
+def test_report_is_built_on_the_loop_and_detached(monkeypatch):
+    report_pdf._cache.clear()
+    real_make_report = report_pdf.make_report
+    built_on, rendered = [], []
+
+    def recording_make_report(session):
+        built_on.append(threading.current_thread())
+        return real_make_report(session)
+
+    def fake_render(report):
+        rendered.append(report)
+        return b"%PDF-"
+
+    monkeypatch.setattr(report_pdf, "make_report", recording_make_report)
+    monkeypatch.setattr(report_pdf, "render_pdf", fake_render)
+    session_manager.start_session("s-pdf-copy", {}, "Databases", None, "Hello!")
+    session_manager.add_message(
+        "s-pdf-copy", "candidate", "An index.", text_emotion={"emotion": "neutral"}
+    )
+    session = session_manager.get_session("s-pdf-copy")
+
+    assert asyncio.run(report_pdf.get_pdf("s-pdf-copy", session)) == b"%PDF-"
+    assert built_on == [threading.main_thread()]
+    # The loop keeps mutating the live session while the render thread runs
+    [turn] = rendered[0]["turns"]
+    assert turn["text_emotion"] == {"emotion": "neutral"}
+    assert turn["text_emotion"] is not session["messages"][-1]["text_emotion"]
@@ -0,0 +1,93 @@
+import os
+import sys
+import subprocess
+
+from services import session_manager
+from services.scoring import compute_confidence
+
+
+def _recount(session):
+    """session["stats"] rebuilt from scratch over every candidate message."""
+    stats = session_manager._new_stats()
+    for message in session["messages"]:
+        if message["role"] == "candidate":
+            session_manager._contribute(stats, message, +1)
+    return stats
+
+
+def _start(session_id):
+    session_manager.start_session(session_id, {}, "Databases", None, "Hello!")
+    first = session_manager.add_message(
+        session_id, "candidate", "An index.",
+        text_emotion={"emotion": "happy", "score": 0.9},
+        camera_metrics={"eye_contact": 0.8, "stillness": 0.5},
+    )
+    second = session_manager.add_message(
+        session_id, "candidate", "Shard by tenant.",
+        text_emotion={"emotion": "concerned", "score": 0.4},
+    )
+    return first, second
+
+
+def test_reapplying_an_update_is_idempotent():
+    first, _ = _start("s-stats-idem")
+    session_manager.update_message("s-stats-idem", first, audio_emotion={"emotion": "calm", "score": 0.7})
+    session_manager.update_message("s-stats-idem", first, evaluation={"score": 8})
+    once = session_manager.get_session("s-stats-idem")["stats"].copy()
+
+    for _ in range(3):
+        session_manager.update_message("s-stats-idem", first, audio_emotion={"emotion": "calm", "score": 0.7})
+        session_manager.update_message("s-stats-idem", first, evaluation={"score": 8})
+
+    session = session_manager.get_session("s-stats-idem")
+    assert session["stats"] == once
+    assert session["stats"]["scores"] == 1
+    assert session["stats"]["audio_emotions"] == {"calm": 1}
+
+
+def test_retract_then_revert_restores_the_totals():
+    first, second = _start("s-stats-revert")
+    before = session_manager.get_session("s-stats-revert")["stats"].copy()
+
+    session_manager.update_message("s-stats-revert", second, text_emotion={"emotion": "happy", "score": 0.8})
+    assert session_manager.get_session("s-stats-revert")["stats"]["text_emotions"] == {"happy": 2}
+
+    session_manager.update_message("s-stats-revert", second, text_emotion={"emotion": "concerned", "score": 0.4})
+    after = session_manager.get_session("s-stats-revert")["stats"]
+    assert after["text_emotions"] == before["text_emotions"]
+    assert abs(after["confidence_sum"] - before["confidence_sum"]) < 1e-9
+    assert after["confidences"] == before["confidences"]
+
+
+def test_running_stats_match_a_full_recount():
+    first, second = _start("s-stats-recount")
+    session_manager.update_message("s-stats-recount", first, evaluation={"score": 6})
+    session_manager.update_message("s-stats-recount", second, evaluation={"score": 9})
+    session_manager.update_message("s-stats-recount", second, evaluation={"score": 4})
+    session_manager.update_message("s-stats-recount", first, camera_metrics={"eye_contact": 0.2})
+    # Non-candidate messages never touch the totals
+    session_manager.add_message("s-stats-recount", "interviewer", "Why?")
+    session_manager.update_message("s-stats-recount", 0, text="Welcome!")
+
+    session = session_manager.get_session("s-stats-recount")
+    stats, recount = session["stats"], _recount(session)
+    assert stats["scores"] == recount["scores"] == 2
+    assert abs(stats["score_sum"] - recount["score_sum"]) < 1e-9
+    assert abs(stats["confidence_sum"] - recount["confidence_sum"]) < 1e-9
+    assert stats["text_emotions"] == recount["text_emotions"]
+    assert session["messages"][1]["confidence"] == compute_confidence(
+        {"eye_contact": 0.2}, {}, {"emotion": "happy", "score": 0.9}
+    )
+
+
+def test_session_layer_does_not_import_the_pdf_report():
+    # emotion_pool workers and the store import the session layer; it must
+    # not drag report / reportlab along
+    probe = "import sys, services.session_manager; print('reportlab' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=os.path.dirname(os.path.dirname(__file__)),
+        env={**os.environ, "SESSION_STORE": "memory", "SESSION_WAL": "0"},
+        capture_output=True, text=True, check=True,
+    )
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,90 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import session_manager
+from services.session_store import MemoryStore, SQLiteStore
+
+
+@pytest.fixture
+def sqlite_manager(monkeypatch, tmp_path):
+    store = SQLiteStore(str(tmp_path / "sessions.db"))
+    io = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(session_manager, "store", store)
+    monkeypatch.setattr(session_manager, "_io", io)
+    yield store
+    io.shutdown(wait=True)
+
+
+def test_memory_store_items_are_copies():
+    store = MemoryStore()
+    store.put("a", {"messages": []})
+    (_, copy), = store.items()
+    copy["messages"].append("x")
+    assert store.get("a") == {"messages": []}
+
+
+def test_sqlite_update_roundtrip(sqlite_manager):
+    session_manager.start_session("s1", {}, "Python", None, "Hi")
+    index = session_manager.add_message("s1", "candidate", "An answer")
+    session_manager.update_message("s1", index, evaluation={"score": 8})
+    session = session_manager.get_session("s1")
+    assert session["messages"][index]["evaluation"] == {"score": 8}
+    assert session["version"] == 2
+
+
+def test_locked_sqlite_does_not_block_event_loop(sqlite_manager):
+    session_manager.start_session("s1", {}, "Python", None, "Hi")
+
+    # Another writer holds the database lock
+    other = sqlite3.connect(sqlite_manager.path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        update = asyncio.create_task(
+            session_manager.update_session_async("s1", note="written")
+        )
+        ticks = 0
+        started = time.monotonic()
+        while time.monotonic() - started < 0.3:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert not update.done()  # still waiting on the lock, off the loop
+        other.execute("COMMIT")
+        await update
+        return ticks
+
+    ticks = asyncio.run(scenario())
+    other.close()
+    assert ticks >= 10
+    assert session_manager.get_session("s1")["note"] == "written"
+
+
+def test_memory_get_returns_a_private_copy():
+    store = MemoryStore()
+    store.put("s", {"messages": [{"text": "hi"}], "stats": {"count": 1}})
+    snapshot = store.get("s")
+    store.update("s", lambda s: (s["messages"].append({"text": "more"}), s["stats"].update(x=1)))
+    assert snapshot == {"messages": [{"text": "hi"}], "stats": {"count": 1}}
+    snapshot["messages"].clear()
+    assert len(store.get("s")["messages"]) == 2
+
+
+def test_sqlite_write_counter_is_exact_across_threads(tmp_path):
+    store = SQLiteStore(str(tmp_path / "sessions.db"))
+    store._PURGE_EVERY = 10 ** 9
+
+    def writer(n):
+        for i in range(50):
+            store.put(f"s{n}-{i}", {"n": i})
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert store._writes == 200
@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from services import session_manager, session_wal
+from services.session_store import MemoryStore
+from services.session_wal import SessionWAL
+
+
+@pytest.fixture
+def fresh_process(tmp_path, monkeypatch):
+    """Swap in an empty memory store logging to tmp_path; call again to "restart"."""
+    opened = []
+
+    def start():
+        store = MemoryStore()
+        wal = SessionWAL(store.items, directory=str(tmp_path))
+        monkeypatch.setattr(session_manager, "store", store)
+        monkeypatch.setattr(session_manager, "wal", wal)
+        opened.append(wal)
+        return store, wal
+
+    yield start
+    for wal in opened:
+        wal.close()
+
+
+def _interview(session_id):
+    session_manager.start_session(session_id, {"repos": ["db"]}, "Databases", "kv", "Hello!", "ana")
+    first = session_manager.add_message(
+        session_id, "candidate", "An index.",
+        text_emotion={"emotion": "happy", "score": 0.9},
+        camera_metrics={"eye_contact": 0.7},
+    )
+    session_manager.add_message(session_id, "interviewer", "How would you shard it?")
+    second = session_manager.add_message(session_id, "candidate", "By tenant.")
+    session_manager.update_message(session_id, first, evaluation={"score": 8})
+    session_manager.update_message(session_id, second, audio_emotion={"emotion": "calm", "score": 0.6})
+    session_manager.update_session(session_id, memory="Knows indexing.", first_question_used=True)
+
+
+def _state(store):
+    return dict(store.items())
+
+
+def test_replay_equals_the_live_state(fresh_process):
+    store, wal = fresh_process()
+    session_manager.recover()
+    _interview("s-wal-a")
+    _interview("s-wal-b")
+    session_manager.end_session("s-wal-b")
+    live = _state(store)
+    wal.close()
+
+    store, wal = fresh_process()
+    assert session_manager.recover() == 2
+    assert _state(store) == live
+
+
+def test_replay_after_compaction_and_restart(fresh_process):
+    store, wal = fresh_process()
+    session_manager.recover()
+    _interview("s-wal-c")
+    wal.compact()  # snapshot mid-interview, later ops in the new log
+    session_manager.add_message("s-wal-c", "candidate", "And replicas.")
+    session_manager.update_message("s-wal-c", 4, evaluation={"score": 5})
+    live = _state(store)
+    wal.close()
+
+    store, wal = fresh_process()
+    session_manager.recover()
+    assert _state(store) == live
+    session_manager.end_session("s-wal-c")  # recovered state keeps logging
+    live = _state(store)
+    wal.close()
+
+    store, _ = fresh_process()
+    session_manager.recover()
+    assert _state(store) == live
+    assert store.get("s-wal-c")["completed"] is True
+
+
+def test_torn_tail_is_ignored(fresh_process, tmp_path):
+    store, wal = fresh_process()
+    session_manager.recover()
+    _interview("s-wal-d")
+    live = _state(store)
+    session_manager.add_message("s-wal-d", "candidate", "Lost in the crash.")
+    wal.close()
+
+    [log] = [n for n in os.listdir(tmp_path) if n.startswith("log.")]
+    path = tmp_path / log
+    path.write_bytes(path.read_bytes()[:-5])
+
+    store, _ = fresh_process()
+    session_manager.recover()
+    assert _state(store) == live
+
+
+def test_records_encode_and_decode(tmp_path):
+    path = tmp_path / "log.0"
+    records = [{"id": "s", "op": "end", "v": i, "ts": 1.5} for i in range(3)]
+    path.write_bytes(b"".join(session_wal._encode(r) for r in records))
+    assert list(session_wal._read_records(str(path))) == records
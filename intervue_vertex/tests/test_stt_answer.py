@@ -0,0 +1,55 @@
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from services import emotion_pool, session_manager
+
+
+@pytest.fixture
+def client(monkeypatch):
+    decoded = []
+
+    async def decode(audio_bytes, sr=16000):
+        decoded.append(audio_bytes)
+        return np.zeros(sr, dtype=np.float32)
+
+    async def submit(fn, *args):
+        return "I would add an index."
+
+    monkeypatch.setattr(app_module, "decode_pcm_async", decode)
+    monkeypatch.setattr(emotion_pool, "decode_pcm_async", decode)
+    monkeypatch.setattr(app_module.stt_queue, "submit", submit)
+    monkeypatch.setattr(emotion_pool, "warm", lambda: None)
+    monkeypatch.setattr(emotion_pool, "_in_process", True)
+    monkeypatch.setattr(emotion_pool, "pool_analyze",
+                        lambda pcm, sr: {"emotion": "neutral", "score": 0.55})
+    # First answer: hand back the prefetched question, no AI call needed
+    session_manager.start_session("s-audio", {}, "Databases", None, "Hello!")
+    session_manager.update_session("s-audio", first_question="What is an index?")
+
+    with TestClient(app_module.app) as c:
+        c.decoded = decoded
+        yield c
+
+
+def test_answer_audio_is_decoded_once(client):
+    stt = client.post("/stt/live", files={"audio": ("a.webm", b"webm-bytes")},
+                      data={"session_id": "s-audio"})
+    assert stt.json() == {"text": "I would add an index."}
+
+    answer = client.post("/answer", data={"session_id": "s-audio", "answer": stt.json()["text"]})
+    assert answer.json()["next_question"] == "What is an index?"
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        message = session_manager.get_session("s-audio")["messages"][1]
+        if message["audio_emotion"]:
+            break
+        time.sleep(0.02)
+
+    assert message["role"] == "candidate"
+    assert message["audio_emotion"] == {"emotion": "neutral", "score": 0.55}
+    assert client.decoded == [b"webm-bytes"]
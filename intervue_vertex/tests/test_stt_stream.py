@@ -0,0 +1,105 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from services import stt_stream
+from services.stt_stream import StreamingTranscriber
+
+SR = 16000
+
+
+class FakeProc:
+    """ffmpeg stand-in: float32 PCM written to stdout, EOF when stdin closes."""
+
+    def __init__(self):
+        self.stdout = asyncio.StreamReader()
+        self.stdin = self
+        self.returncode = None
+
+    def close(self):
+        self.stdout.feed_eof()
+
+    async def wait(self):
+        self.returncode = 0
+        return 0
+
+    def kill(self):
+        self.returncode = -9
+
+
+def _speech(seconds):
+    rng = np.random.default_rng(0)
+    return (0.3 * rng.standard_normal(int(seconds * SR))).astype(np.float32).tobytes()
+
+
+async def _started(transcriber):
+    transcriber.proc = FakeProc()
+    transcriber.reader = asyncio.create_task(transcriber._read_pcm())
+    return transcriber.proc
+
+
+@pytest.fixture
+def segments(monkeypatch):
+    monkeypatch.setattr(stt_stream, "PARTIAL_EVERY", 1)
+    monkeypatch.setattr(stt_stream, "MIN_SEGMENT", 2)
+    monkeypatch.setattr(stt_stream, "MAX_SEGMENT", 60)
+
+
+def test_partials_transcribe_only_new_audio(segments, monkeypatch):
+    sent = []
+
+    async def submit(fn, pcm, sr):
+        sent.append(len(pcm))
+        return f"part{len(sent)}"
+
+    monkeypatch.setattr(stt_stream.stt_queue, "submit", submit)
+    partials = []
+
+    async def on_partial(text):
+        partials.append(text)
+
+    async def run():
+        transcriber = StreamingTranscriber(on_partial, sr=SR)
+        proc = await _started(transcriber)
+        for _ in range(3):
+            proc.stdout.feed_data(_speech(1))
+            while transcriber.partial_task is None or not transcriber.partial_task.done():
+                await asyncio.sleep(0.01)
+            transcriber.partial_task = None
+        await transcriber.close()
+
+    asyncio.run(run())
+    assert sent == [SR, SR, SR]
+    assert partials == ["part1", "part1 part2", "part1 part2 part3"]
+
+
+def test_finish_returns_what_is_done_at_the_deadline(segments, monkeypatch):
+    monkeypatch.setattr(stt_stream, "FINISH_TIMEOUT", 0.2)
+    monkeypatch.setattr(stt_stream, "PARTIAL_EVERY", 60)
+
+    async def submit(fn, pcm, sr):
+        if len(pcm) < SR:  # the short tail hangs upstream
+            await asyncio.sleep(60)
+        return "committed"
+
+    monkeypatch.setattr(stt_stream.stt_queue, "submit", submit)
+
+    async def on_partial(text):
+        pass
+
+    async def run():
+        transcriber = StreamingTranscriber(on_partial, sr=SR)
+        proc = await _started(transcriber)
+        # Two seconds of speech, a pause (commits), then a short tail
+        proc.stdout.feed_data(_speech(2) + bytes(4 * SR) + _speech(0.5))
+        started = asyncio.get_running_loop().time()
+        text = await transcriber.finish()
+        elapsed = asyncio.get_running_loop().time() - started
+        await transcriber.close()
+        return text, elapsed, transcriber.segments
+
+    text, elapsed, tasks = asyncio.run(run())
+    assert text == "committed"
+    assert elapsed < 1
+    assert len(tasks) == 2 and tasks[1].cancelled()
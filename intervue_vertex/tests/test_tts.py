@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from services import elevenlab_tts, tts_cache
+
+
+class FakeResponse:
+    def __init__(self, status_code, chunks=(), text=""):
+        self.status_code = status_code
+        self.chunks = list(chunks)
+        self.text = text
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        yield from self.chunks
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(tts_cache, "get", lambda key: None)
+    monkeypatch.setattr(tts_cache.Writer, "commit", lambda self: None)
+    state = {}
+
+    def post(url, json, headers, stream, timeout):
+        state["timeout"] = timeout
+        return state["response"]
+
+    monkeypatch.setattr(elevenlab_tts.requests, "post", post)
+    return state
+
+
+def test_upstream_error_is_502_not_empty_audio(upstream):
+    upstream["response"] = FakeResponse(401, text="invalid api key")
+    resp = TestClient(app_module.app).get("/tts", params={"text": "hello"})
+    assert resp.status_code == 502
+    assert upstream["response"].closed
+
+
+def test_upstream_success_streams_audio(upstream):
+    upstream["response"] = FakeResponse(200, [b"ID3", b"data"])
+    resp = TestClient(app_module.app).get("/tts", params={"text": "hello"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "audio/mpeg"
+    assert resp.content == b"ID3data"
+    assert resp.headers["x-tts-cache"] == "miss"
+
+
+def test_upstream_request_has_a_timeout(upstream):
+    upstream["response"] = FakeResponse(200, chunks=[b"ID3"])
+    resp = TestClient(app_module.app).get("/tts", params={"text": "hello"})
+    assert resp.status_code == 200
+    assert upstream["timeout"] == elevenlab_tts.TIMEOUT and all(upstream["timeout"])
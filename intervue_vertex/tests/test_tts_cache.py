@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from services import tts_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(tts_cache, "_disk_bytes", None)
+    monkeypatch.setattr(tts_cache, "_mem", tts_cache.OrderedDict())
+    monkeypatch.setattr(tts_cache, "_mem_bytes", 0)
+    return tmp_path
+
+
+def _on_disk(path):
+    return sum(p.stat().st_size for p in path.glob("*.mp3"))
+
+
+def test_overwriting_a_key_does_not_inflate_the_byte_count(cache_dir):
+    for _ in range(5):
+        tts_cache._disk_put("k", b"x" * 1000)
+    tts_cache._disk_put("other", b"y" * 10)
+    assert tts_cache._disk_bytes == _on_disk(cache_dir) == 1010
+
+
+def test_eviction_drops_oldest_clips_to_the_budget(cache_dir, monkeypatch):
+    monkeypatch.setattr(tts_cache, "DISK_BUDGET", 2500)
+    for i in range(3):
+        tts_cache._disk_put(f"k{i}", b"x" * 1000)
+        os.utime(cache_dir / f"k{i}.mp3", (1000 + i, 1000 + i))
+    tts_cache._disk_put("k3", b"x" * 1000)
+
+    assert sorted(p.name for p in cache_dir.glob("*.mp3")) == ["k2.mp3", "k3.mp3"]
+    assert tts_cache._disk_bytes == _on_disk(cache_dir) == 2000
+
+
+def test_eviction_does_not_hold_the_cache_lock_during_file_io(cache_dir, monkeypatch):
+    monkeypatch.setattr(tts_cache, "DISK_BUDGET", 1500)
+    tts_cache._disk_put("old", b"x" * 1000)
+    os.utime(cache_dir / "old.mp3", (1000, 1000))
+    tts_cache._mem_put("hot", b"clip")
+    served_during_unlink = []
+    real_remove = os.remove
+
+    def slow_remove(path):
+        # A memory-tier hit from another thread while the file is unlinked
+        reader = threading.Thread(target=tts_cache._mem_get, args=("hot",))
+        reader.start()
+        reader.join(0.5)
+        served_during_unlink.append(not reader.is_alive())
+        real_remove(path)
+
+    monkeypatch.setattr(tts_cache.os, "remove", slow_remove)
+    tts_cache._disk_put("new", b"x" * 1000)
+    assert served_during_unlink == [True]
+
+
+def test_stale_part_files_are_swept(cache_dir):
+    stale, fresh = cache_dir / "a.part", cache_dir / "b.part"
+    stale.write_bytes(b"x")
+    fresh.write_bytes(b"x")
+    old = time.time() - tts_cache.PART_MAX_AGE_S - 1
+    os.utime(stale, (old, old))
+
+    tts_cache._disk_put("k", b"x" * 10)
+    assert not stale.exists() and fresh.exists()
+
+
+def test_stats_endpoint(cache_dir):
+    tts_cache.Writer("k").commit()  # empty clip: nothing stored
+    writer = tts_cache.Writer("k")
+    writer.append(b"x" * 100)
+    writer.commit()
+    stats = TestClient(app_module.app).get("/tts/stats").json()
+    assert stats["memory_entries"] == 1
+    assert stats["disk_bytes"] == 100
@@ -0,0 +1,77 @@
+import re
+import json
+import asyncio
+
+from services import vertex_wrapper
+from services.vertex_wrapper import _completed_field, build_prompt, stream_evaluation
+
+EVALUATION = {
+    "next_question": "How would you shard that table?",
+    "score": 7,
+    "confidence_level": "high",
+    "communication_feedback": "Clear.",
+    "technical_feedback": "Solid.",
+    "strengths": ["indexing"],
+    "weaknesses": [],
+    "interviewer_tone": "neutral",
+}
+
+PROMPT_ARGS = dict(answer="I would add an index.", skill="Databases", project=None)
+
+
+def _schema_keys(prompt: str) -> list[str]:
+    schema = prompt[prompt.rindex("{"):]
+    return re.findall(r'^\s*"(\w+)"\s*:', schema, re.M)
+
+
+def _chunks_in_schema_order(prompt: str):
+    """Serialize like a model following the schema: field by field, in small pieces."""
+    keys = _schema_keys(prompt)
+    text = "{" + ", ".join(f'"{k}": {json.dumps(EVALUATION[k])}' for k in keys) + "}"
+    return [text[i:i + 7] for i in range(0, len(text), 7)]
+
+
+def test_completed_field_waits_for_closing_quote():
+    text = '{"next_question": "What is a \\"B-tree\\"?", "score": 7}'
+    for end in range(len(text)):
+        partial = text[:end]
+        value = _completed_field(partial, "next_question")
+        if end < text.index('?"') + 2:
+            assert value is None, partial
+        else:
+            assert value == 'What is a "B-tree"?'
+
+
+def test_completed_field_missing_or_invalid():
+    assert _completed_field("", "next_question") is None
+    assert _completed_field('{"score": 7', "next_question") is None
+    assert _completed_field('{"next_question": "bad \\x escape"', "next_question") is None
+
+
+def test_next_question_is_first_in_schema():
+    keys = _schema_keys(build_prompt(**PROMPT_ARGS))
+    assert keys[0] == "next_question"
+    assert set(keys) == set(EVALUATION)
+
+
+def test_next_question_yielded_before_evaluation_fields(monkeypatch):
+    sent = []
+
+    async def fake_stream(prompt, system, want_json):
+        for chunk in _chunks_in_schema_order(prompt):
+            sent.append(chunk)
+            yield chunk
+
+    monkeypatch.setattr(vertex_wrapper, "ai_stream_async", fake_stream)
+
+    async def collect():
+        events = []
+        async for kind, payload in stream_evaluation(**PROMPT_ARGS):
+            events.append((kind, payload, "".join(sent)))
+        return events
+
+    events = asyncio.run(collect())
+    (kind, question, streamed), (last_kind, evaluation, _) = events
+    assert kind == "next_question" and question == EVALUATION["next_question"]
+    assert '"score"' not in streamed
+    assert last_kind == "evaluation" and evaluation == EVALUATION